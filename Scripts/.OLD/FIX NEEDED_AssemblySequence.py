@@ -7,18 +7,44 @@ import numpy as np
 import itertools
 from itertools import combinations
 
+try:
+    from strut_bvh import StrutBVH  # Scripts/RobotProgramming, needs to be on the GhPython path
+except ImportError:  # without it the clearance of the new struts is not tracked
+    StrutBVH = None
+
 class Trussemble:
-    def __init__(self, lines, rigid_points, start_point):
+    def __init__(self, lines, rigid_points, start_point, sequencing_mode="geometric",
+                 axial_stiffness=1.0, strut_weight=1.0, strut_radius=0.0, clearance_trim=0.1):
         ## inputs
         self.lines = lines
         self.points, self.connection_tree = self.__get_line_connectivity()
+        self.point_indices = {pt: idx for idx, pt in enumerate(self.points)}
         self.rigid_points = rigid_points
         self.rigid_indices = self.__get_rigid_point_indices()
         self.start_point = start_point
+        # "geometric" keeps the distance/area support ranking, "stability" ranks
+        # frontier candidates by the maximum displacement after placement
+        self.sequencing_mode = sequencing_mode
+        self.axial_stiffness = axial_stiffness  # EA of every strut
+        self.strut_weight = strut_weight  # self-weight per unit length, acting along -Z
+        ## partial structure state (stability mode), free DOFs only
+        self.node_dofs = {}
+        self.compliance = np.zeros((0, 0))
+        self.loads = np.zeros(0)
+        self.displacements = np.zeros(0)
+        ## placed struts (BVH), grows with every step
+        self.strut_index = StrutBVH() if StrutBVH is not None else None
+        self.strut_radius = strut_radius
+        # Fraction of a new strut's length cut off at both ends before its clearance is measured,
+        # so the struts it shares a node with do not count as touching it
+        self.clearance_trim = clearance_trim
+        self.strut_nodes = []  # (node, node) per strut in the index
         ## outputs
         self.graph = self.__turn_tree_to_graph(self.connection_tree)
         self.assembly_steps = gh.DataTree[object]()
         self.processed_nodes = []
+        self.max_displacements = []
+        self.step_clearances = []  # smallest gap between a step's new struts and the struts placed before
 
     def __average_point(self, pt1, pt2, pt3):
         # Calculate the average of the x, y, and z coordinates
@@ -253,6 +279,136 @@ class Trussemble:
 
         return result_support
 
+    def __get_strut_terms(self, node, support_nodes):
+        points = self.points
+        node_coords = np.array([points[node].X, points[node].Y, points[node].Z])
+        support_coords = np.array([[points[x].X, points[x].Y, points[x].Z] for x in support_nodes])
+
+        # Unit directions from each support towards the new node, and their axial stiffness k = EA / L
+        vectors = node_coords - support_coords
+        lengths = np.linalg.norm(vectors, axis=1)
+        directions = vectors / lengths[:, np.newaxis]
+        stiffness = self.axial_stiffness / lengths
+
+        # Self-weight of each strut, lumped half to each end
+        half_weights = 0.5 * self.strut_weight * lengths
+        return directions, stiffness, half_weights
+
+    def __solve_placement(self, node, support_nodes):
+        """
+        Solve the partial structure after connecting node to support_nodes, without refactoring K.
+
+        The new struts only touch the DOFs of their supports, so the stiffness change on the
+        existing structure is a rank-r update (r = number of struts). It is applied to the stored
+        compliance (K^-1) with the Woodbury identity and the new node is condensed with a 3x3
+        Schur complement. Only the compliance columns of the support DOFs are read, so scoring a
+        candidate costs O(n * r) instead of a full O(n^3) solve.
+        """
+        directions, stiffness, half_weights = self.__get_strut_terms(node, support_nodes)
+        compliance = self.compliance
+        num_dofs = compliance.shape[0]
+        num_struts = len(support_nodes)
+
+        # S has one column per strut, its direction in the rows of the free support's DOFs;
+        # FS = compliance.dot(S) is assembled from the support columns without forming S
+        loads = self.loads.copy()
+        base_displacements = self.displacements.copy()  # compliance.dot(self.loads) of the last commit
+        FS = np.zeros((num_dofs, num_struts))
+        StFS = np.zeros((num_struts, num_struts))
+        free = []
+        for i, support in enumerate(support_nodes):
+            if support in self.node_dofs:
+                dofs = self.node_dofs[support]
+                # Half strut weight carried by the free support
+                loads[dofs + 2] -= half_weights[i]
+                base_displacements -= half_weights[i] * compliance[:, dofs + 2]
+                FS[:, i] = compliance[:, dofs:dofs + 3].dot(directions[i])
+                free.append((i, dofs))
+        for i, dofs in free:
+            StFS[i] = directions[i].dot(FS[dofs:dofs + 3])
+
+        M = np.diag(1.0 / stiffness) + StFS
+        M_inv = np.linalg.inv(M)
+        StU = np.zeros(num_struts)
+        for i, dofs in free:
+            StU[i] = directions[i].dot(base_displacements[dofs:dofs + 3])
+
+        if node in self.rigid_indices:
+            # The node is a fixed support: only the existing free DOFs get stiffer
+            displacements = base_displacements - FS.dot(M_inv.dot(StU))
+            return displacements, None, (FS, M_inv, None, None, loads, None)
+
+        E = directions.T  # 3 x r
+        schur = E.dot(M_inv).dot(E.T)
+        if np.linalg.cond(schur) > 1e12:
+            return None, None, None  # the new node is a mechanism (coplanar supports)
+        schur_inv = np.linalg.inv(schur)
+
+        node_load = np.array([0.0, 0.0, -np.sum(half_weights)])
+        node_displacement = schur_inv.dot(node_load + E.dot(M_inv.dot(StU)))
+        displacements = base_displacements - FS.dot(M_inv.dot(StU - E.T.dot(node_displacement)))
+        return displacements, node_displacement, (FS, M_inv, E, schur_inv, loads, node_load)
+
+    def __get_max_displacement(self, displacements, node_displacement):
+        magnitudes = np.linalg.norm(displacements.reshape(-1, 3), axis=1) if displacements.size else np.zeros(0)
+        if node_displacement is not None:
+            magnitudes = np.append(magnitudes, np.linalg.norm(node_displacement))
+        return float(magnitudes.max()) if magnitudes.size else 0.0
+
+    def __score_stability(self, node, support_nodes):
+        displacements, node_displacement, _ = self.__solve_placement(node, support_nodes)
+        if displacements is None:
+            return float('inf')
+        return self.__get_max_displacement(displacements, node_displacement)
+
+    def __commit_placement(self, node, support_nodes):
+        displacements, node_displacement, terms = self.__solve_placement(node, support_nodes)
+        if displacements is None:
+            # Without its DOFs the node would act as a fixed support for every later strut
+            raise ValueError(f"Node {node} is a mechanism on supports {list(support_nodes)}; "
+                             "the stability model cannot take it.")
+        FS, M_inv, E, schur_inv, loads, node_load = terms
+
+        # Compliance of the stiffened existing structure (Woodbury, a dense O(n^2 * r) update once per step)
+        compliance = self.compliance - FS.dot(M_inv).dot(FS.T)
+
+        if node_displacement is not None:
+            # Grow the compliance by the new node's 3 DOFs (block inverse with the Schur complement)
+            FSE = FS.dot(M_inv).dot(E.T)
+            coupling = FSE.dot(schur_inv)
+            num_dofs = compliance.shape[0]
+            grown = np.zeros((num_dofs + 3, num_dofs + 3))
+            grown[:num_dofs, :num_dofs] = compliance + coupling.dot(FSE.T)
+            grown[:num_dofs, num_dofs:] = coupling
+            grown[num_dofs:, :num_dofs] = coupling.T
+            grown[num_dofs:, num_dofs:] = schur_inv
+            compliance = grown
+
+            self.node_dofs[node] = num_dofs
+            loads = np.append(loads, node_load)
+            displacements = np.append(displacements, node_displacement)
+
+        self.compliance = compliance
+        self.loads = loads
+        self.displacements = displacements
+        self.max_displacements.append(self.__get_max_displacement(displacements, None))
+
+    def __index_struts(self, node_pairs):
+        if self.strut_index is None:
+            return
+        points = self.points
+        starts = np.array([[points[a].X, points[a].Y, points[a].Z] for a, b in node_pairs])
+        ends = np.array([[points[b].X, points[b].Y, points[b].Z] for a, b in node_pairs])
+
+        if len(self.strut_index):
+            trim = self.clearance_trim * (ends - starts)
+            _, distances = self.strut_index.nearest(starts + trim, ends - trim, self.strut_radius)
+            self.step_clearances.append(float(distances.min()))
+        else:
+            self.step_clearances.append(float('inf'))
+        self.strut_index.insert(starts, ends, self.strut_radius)
+        self.strut_nodes.extend(node_pairs)
+
     def __check_if_door(self, support_nodes, load_node):
         support_points = [self.points[x] for x in support_nodes]
         load_point = self.points[load_node]
@@ -307,6 +463,9 @@ class Trussemble:
         while True:
             if len(self.processed_nodes) == 0:
                 first_supports, first_neighbour = self.__get_first_move()
+                if self.sequencing_mode == "stability" and not np.isfinite(
+                        self.__score_stability(first_neighbour, first_supports)):
+                    return assembly_steps  # The first node would be a mechanism on its supports
                 lines_to_add = []
 
                 for support in first_supports:
@@ -324,14 +483,18 @@ class Trussemble:
 
                 path = GH_Path(0)
                 assembly_steps.AddRange(lines_to_add, path)
+                self.__index_struts([(support, first_neighbour) for support in first_supports] + missing_edges)
+
+                if self.sequencing_mode == "stability":
+                    self.__commit_placement(first_neighbour, first_supports)
 
             elif len(self.processed_nodes) < len(points):
                 non_rigid_candidates = self.__find_unprocessed_neighbors_subgraphs()
                 rigid_candidates = [candidate for candidate in non_rigid_candidates if self.__can_node_be_rigid(candidate)]
                 sorted_rigid_candidates = self.__sort_rigid_candidates(rigid_candidates)
 
+                placements = []
                 for candidate in sorted_rigid_candidates:
-                    lines_to_add = []
                     nodes_to_connect_to = self.__get_possible_connections(candidate)
                     supports = [points[x] for x in nodes_to_connect_to]
                     nodes_sorted_indices = self.__get_sorted_supports(points[candidate], supports)
@@ -343,23 +506,50 @@ class Trussemble:
                     else:
                         sorted_support_points = door_check
 
-                    for point in sorted_support_points:
-                        line = rg.LineCurve(points[candidate], point)
-                        lines_to_add.append(line)
+                    placements.append((candidate, sorted_support_points))
+                    if self.sequencing_mode != "stability":
+                        break  # Geometric mode takes the closest valid candidate
 
-                    self.processed_nodes.append(candidate)
-                    path = GH_Path(assembly_steps.BranchCount)
-                    assembly_steps.AddRange(lines_to_add, path)
-                    break  # Proceed to the next candidate
-                else:
+                if not placements:
                     return assembly_steps  # No valid candidates found; exit the loop
+
+                if self.sequencing_mode == "stability":
+                    # Rank every valid frontier candidate by the max displacement after placement
+                    scores = [self.__score_stability(candidate, [self.point_indices[pt] for pt in support_points])
+                              for candidate, support_points in placements]
+                    if not np.isfinite(scores).any():
+                        return assembly_steps  # Every candidate would be a mechanism; exit the loop
+                    candidate, sorted_support_points = placements[int(np.argmin(scores))]
+                else:
+                    candidate, sorted_support_points = placements[0]
+
+                lines_to_add = []
+                for point in sorted_support_points:
+                    line = rg.LineCurve(points[candidate], point)
+                    lines_to_add.append(line)
+
+                if self.sequencing_mode == "stability":
+                    self.__commit_placement(candidate, [self.point_indices[pt] for pt in sorted_support_points])
+
+                self.processed_nodes.append(candidate)
+                path = GH_Path(assembly_steps.BranchCount)
+                assembly_steps.AddRange(lines_to_add, path)
+                self.__index_struts([(candidate, self.point_indices[pt]) for pt in sorted_support_points])
             else:
                 return assembly_steps  # All nodes have been processed
 
+# Optional input: "geometric" (default) or "stability"
+sequencing_mode = in_sequencing_mode if 'in_sequencing_mode' in globals() and in_sequencing_mode else "geometric"
+
+# Optional input: strut radius for the clearance between each step's struts and the placed ones (default 0)
+strut_radius = in_strut_radius if 'in_strut_radius' in globals() and in_strut_radius else 0.0
+
 # Instantiate the class with your inputs
-my_truss = Trussemble(in_lines, in_rigid_points, in_start_point)
+my_truss = Trussemble(in_lines, in_rigid_points, in_start_point, sequencing_mode, strut_radius=strut_radius)
 assembly_steps = my_truss.assemble()
 processed_nodes = my_truss.processed_nodes
 nodes = my_truss.points
 processed_points = nodes
 ordered_nodes = processed_points
+max_displacements = my_truss.max_displacements
+step_clearances = my_truss.step_clearances
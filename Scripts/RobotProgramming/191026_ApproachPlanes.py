@@ -0,0 +1,80 @@
+import Rhino.Geometry as rg  # Import Rhino.Geometry module as rg
+import math
+import numpy as np
+from approach_planner import GripperEnvelope, GRIPPER_STL, plan_approaches  # Approach cones per strut
+
+# === Inputs ===
+# StrutLines: List of Lines or LineCurves in placement order (e.g. the flattened assembly_steps of Trussemble)
+# ExistingStruts: Optional list of Lines standing before the first strut (fixtures, supports)
+# GripperFile: Optional STL of the gripper with its fingertips at the top, closing along Y (default .OLD/CustomGripper.stl)
+# StrutRadius: Optional strut radius in millimeters (default 10)
+# ApproachDistance: Optional distance in millimeters of the approach plane before the placement (default 100)
+# RetreatDistance: Optional distance in millimeters of the retreat plane after the release (default ApproachDistance)
+# MaxTilt: Optional largest angle in degrees between the motion and the gripper axis (default 30)
+# Directions: Optional number of sampled approach directions (default 256)
+# FloorHeight: Optional height in millimeters of the build plate, the gripper stays above it (default: no floor)
+
+# Initialize outputs
+SuccessMessage = ""
+AssemblyPlanes = []  # TCP plane holding each strut in place (None if no approach is free)
+ApproachPlanes = []  # Plane before each placement, offset against the approach direction
+RetreatPlanes = []  # Plane after releasing each strut
+ConeAngles = []  # Half-angle in degrees of the free cone around each chosen direction
+ProgramPlanes = []  # Approach, assembly and retreat plane of every feasible strut, ready for PlanesList
+ProgramStruts = []  # Strut index of every plane in ProgramPlanes
+Infeasible = []  # Indices of the struts without a free approach
+
+
+def line_ends(line):
+    """Start and end point of a Line or LineCurve as coordinate lists."""
+    start, end = (line.From, line.To) if isinstance(line, rg.Line) else (line.PointAtStart, line.PointAtEnd)
+    return [start.X, start.Y, start.Z], [end.X, end.Y, end.Z]
+
+
+def pose_to_plane(pose):
+    """Rhino plane of a 4x4 pose (origin, X and Y axes)."""
+    origin, x_axis, y_axis = pose[:3, 3].tolist(), pose[:3, 0].tolist(), pose[:3, 1].tolist()
+    return rg.Plane(rg.Point3d(*origin), rg.Vector3d(*x_axis), rg.Vector3d(*y_axis))
+
+
+# Check required inputs before proceeding
+if not StrutLines or not isinstance(StrutLines, list):
+    SuccessMessage = "Error: StrutLines must be a list of Lines in placement order."
+else:
+    ends = np.array([line_ends(line) for line in StrutLines], dtype=float)
+    existing = None
+    if 'ExistingStruts' in globals() and ExistingStruts:
+        existing = np.array([line_ends(line) for line in ExistingStruts], dtype=float)
+
+    gripper_file = GripperFile if 'GripperFile' in globals() and GripperFile else GRIPPER_STL
+    gripper = GripperEnvelope.from_stl(gripper_file)  # Cached until the file changes
+    SuccessMessage = f"Gripper envelope: {gripper.summary()}."
+
+    approach_distance = ApproachDistance if 'ApproachDistance' in globals() and ApproachDistance else 100.0
+    plan = plan_approaches(ends[:, 0], ends[:, 1], gripper,
+                           existing[:, 0] if existing is not None else None,
+                           existing[:, 1] if existing is not None else None,
+                           strut_radius=StrutRadius if 'StrutRadius' in globals() and StrutRadius else 10.0,
+                           directions=int(Directions) if 'Directions' in globals() and Directions else 256,
+                           max_tilt=math.radians(MaxTilt if 'MaxTilt' in globals() and MaxTilt else 30.0),
+                           approach_distance=approach_distance,
+                           retreat_distance=RetreatDistance if 'RetreatDistance' in globals() and RetreatDistance else None,
+                           floor=FloorHeight if 'FloorHeight' in globals() and FloorHeight is not None else None)
+    SuccessMessage += f"\n{plan.summary()}."
+
+    for i, feasible in enumerate(plan.feasible):
+        if not feasible:
+            AssemblyPlanes.append(None)
+            ApproachPlanes.append(None)
+            RetreatPlanes.append(None)
+            ConeAngles.append(0.0)
+            Infeasible.append(i)
+            SuccessMessage += f"\nStrut {i+1}: no free approach direction."
+            continue
+        planes = [pose_to_plane(pose) for pose in (plan.approach_poses[i], plan.poses[i], plan.retreat_poses[i])]
+        ApproachPlanes.append(planes[0])
+        AssemblyPlanes.append(planes[1])
+        RetreatPlanes.append(planes[2])
+        ConeAngles.append(math.degrees(plan.cone_angles[i]))
+        ProgramPlanes.extend(planes)
+        ProgramStruts.extend([i] * 3)
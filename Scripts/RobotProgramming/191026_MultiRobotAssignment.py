@@ -0,0 +1,99 @@
+import robolink as rl    # RoboDK API for controlling and communicating with RoboDK
+import Rhino.Geometry as rg  # Import Rhino.Geometry module as rg
+import numpy as np
+from robot_models import get_model  # Robot model registry (robot_models.json)
+from robodk_session import get_session  # Shared RoboDK link and item handles
+from program_builder import build_program  # Bulk program creation
+from pose_pipeline import PoseArray  # Batched plane/pose conversion
+from move_planner import plan_moves  # Local MoveL/MoveJ decisions
+from robot_assignment import RobotCell, assign_targets  # Plane distribution over the robots
+
+# === Inputs ===
+# RobotNames: List of robot names in RoboDK (e.g., ["UR5", "COMAU NJ 60-2.2"]); each needs a local kinematic model
+# UpdateRoboDK: Boolean toggle to execute the script and update RoboDK when True
+# PlanesList: List of Rhino Plane objects (each plane contains both target point and orientation)
+# MaxLoad: Optional largest number of planes per robot, one value for all robots or one per robot
+# Balance: Optional extra cost in seconds of every further plane on the same robot (default 0.1, 0 = cheapest robot)
+
+# Initialize outputs
+SuccessMessage = ""
+Programs = []  # Name of the program created for each robot ("" if it got no planes)
+PlaneRobot = []  # Name of the robot assigned to each plane (None if no robot can take it)
+PlaneExtra = []  # Planes no robot can reach
+
+# Check required inputs before proceeding
+if not RobotNames or not isinstance(RobotNames, list):
+    SuccessMessage = "Error: RobotNames must be a list of robot names."
+elif not PlanesList or not isinstance(PlanesList, list):
+    SuccessMessage = "Error: PlanesList must be a list of Rhino Plane objects."
+elif any(not isinstance(plane, rg.Plane) for plane in PlanesList):
+    SuccessMessage = "Error: All elements in PlanesList must be Rhino Plane objects."
+elif UpdateRoboDK is None:
+    SuccessMessage = "Error: UpdateRoboDK toggle is required."
+elif not UpdateRoboDK:
+    SuccessMessage = "UpdateRoboDK is set to False. No action taken."
+else:
+    # Connect to RoboDK only if UpdateRoboDK is True
+    session = get_session()
+    RDK = session.link()  # Reuse the shared RoboDK connection
+    SuccessMessage = "Connected to RoboDK."
+
+    # Load limit per robot
+    if 'MaxLoad' in globals() and MaxLoad:
+        max_loads = list(MaxLoad) if isinstance(MaxLoad, list) else [MaxLoad] * len(RobotNames)
+    else:
+        max_loads = [None] * len(RobotNames)
+    balance = Balance if 'Balance' in globals() and Balance is not None else 0.1
+
+    # Collect every robot with its base, tool and kinematic model
+    cells = []
+    items = []  # (robot, base, tool) per cell
+    for name, max_load in zip(RobotNames, max_loads):
+        robot = session.item(name, rl.ITEM_TYPE_ROBOT)  # Cached handle between solves
+        if not robot.Valid():
+            SuccessMessage += f"\nError: Could not find {name} in RoboDK, skipping it."
+            continue
+        robot_base = robot.Parent()
+        tool = robot.getLink(rl.ITEM_TYPE_TOOL)
+        model = get_model(robot.Name())
+        if not robot_base.Valid() or not tool.Valid():
+            SuccessMessage += f"\nError: Base or tool of '{robot.Name()}' not found, skipping it."
+        elif model is None:
+            SuccessMessage += f"\nNo local kinematic model for '{robot.Name()}', skipping it."
+        else:
+            cells.append(RobotCell(robot.Name(), model, np.array(robot_base.Pose().rows),
+                                   np.array(tool.PoseTool().rows), np.radians(robot.JointsHome().list()),
+                                   int(max_load) if max_load else None))
+            items.append((robot, robot_base, tool))
+            SuccessMessage += f"\nFound robot '{robot.Name()}' on base '{robot_base.Name()}' with tool '{tool.Name()}'."
+
+    if not cells:
+        SuccessMessage += "\nNo usable robot, cannot proceed."
+    else:
+        # Reachability of every plane for every robot, then the balanced assignment
+        station_poses = PoseArray.from_planes(PlanesList)
+        assignment = assign_targets(station_poses, cells, balance)
+        SuccessMessage += f"\n{assignment.summary()}."
+        PlaneRobot = [cells[r].name if r >= 0 else None for r in assignment.assignment]
+        PlaneExtra = [PlanesList[i] for i in assignment.unassigned]
+
+        # One program per robot with its planes in input order
+        for r, (cell, (robot, robot_base, tool)) in enumerate(zip(cells, items)):
+            indices = assignment.targets_of(r)
+            if not indices.size:
+                Programs.append("")
+                continue
+            relative_poses = station_poses[indices].transformed(base=cell.base)
+            plan = plan_moves(relative_poses.transformed(tool=cell.tool), cell.model, cell.home, tool=cell.tool)
+            kept = np.flatnonzero(plan.reachable)
+            # Planes the program cannot take go back to PlaneExtra instead of silently missing
+            for i in np.flatnonzero(~plan.reachable):
+                PlaneRobot[indices[i]] = None
+                PlaneExtra.append(PlanesList[indices[i]])
+                SuccessMessage += f"\nPlane {indices[i]+1} has no joint solution on '{cell.name}', moved to PlaneExtra."
+            program = build_program(RDK, robot, robot_base, tool, f"MoveThroughPlanesProgram_{cell.name}",
+                                    relative_poses[kept], [plan.move_types[i] for i in kept],
+                                    [f"{cell.name}_Plane_{indices[i]+1}" for i in kept])
+            Programs.append(program.Name())
+            SuccessMessage += f"\nProgram '{program.Name()}' created for '{cell.name}' ({plan.summary()})."
+        SuccessMessage += f"\nRoboDK: {session.stats()}."
@@ -3,6 +3,9 @@ import robodk as rdk
 import Rhino.Geometry as rg
 import math
 import numpy as np
+from robot_models import get_model  # Robot model registry (Scripts/RobotProgramming)
+from kinematics_cache import default_cache  # FK results and joint geometry shared across solves
+from robodk_session import get_session  # Shared RoboDK link and item handles
 
 # === Inputs ===
 # RobotName: Name of the robot in RoboDK (e.g., "COMAU NJ 60-2.2")
@@ -16,11 +19,12 @@ JointPoints = []
 JointLines = []
 SuccessMessage = ""
 
-# Initialize RoboDK connection
-RDK = rl.Robolink()
+# Reuse the shared RoboDK connection
+session = get_session()
+RDK = session.link()
 
-# Get the robot by name
-robot = RDK.Item(RobotName, rl.ITEM_TYPE_ROBOT)
+# Get the robot by name (cached handle between solves)
+robot = session.item(RobotName, rl.ITEM_TYPE_ROBOT)
 
 if not robot.Valid():
     SuccessMessage = f"Error: Could not find {RobotName} in RoboDK."
@@ -39,86 +43,25 @@ else:
     # Convert joint angles to radians
     joints_rad = [math.radians(angle) for angle in joints_deg]
 
-    # COMAU NJ 60-2.2 DH parameters (in millimeters and radians)
-    d1 = 740
-    a2 = 600
-    a3 = 1200
-    d4 = 1350
-    d6 = 260
-
-    # DH parameters for COMAU NJ 60-2.2
-    alpha = [math.pi/2, 0, 0, math.pi/2, -math.pi/2, 0]
-    a = [0, a2, a3, 0, 0, 0]
-    d = [d1, 0, 0, d4, 0, d6]
-    theta = [
-        joints_rad[0],
-        joints_rad[1],
-        joints_rad[2],
-        joints_rad[3],
-        joints_rad[4],
-        joints_rad[5],
-    ]
-
     # Initialize the base transformation matrix
     T_base = np.array(base_pose.rows)
     # Ensure T_base is a 4x4 matrix
     if T_base.shape != (4, 4):
         SuccessMessage += " Error: Base pose matrix is not 4x4."
     else:
-        # Initialize the transformation matrix
-        T = T_base
-
-        # Initialize joint positions list
-        JointPoints = []
-
-        # Store transformation matrices for each joint
-        T_matrices = []
-
-        for i in range(6):  # Six joints
-            # DH parameters for current joint
-            ai = a[i]
-            alphai = alpha[i]
-            di = d[i]
-            thetai = theta[i]
-
-            # Compute transformation matrix using DH parameters
-            cos_theta = math.cos(thetai)
-            sin_theta = math.sin(thetai)
-            cos_alpha = math.cos(alphai)
-            sin_alpha = math.sin(alphai)
-
-            T_joint = np.array([
-                [cos_theta, -sin_theta * cos_alpha,  sin_theta * sin_alpha, ai * cos_theta],
-                [sin_theta,  cos_theta * cos_alpha, -cos_theta * sin_alpha, ai * sin_theta],
-                [0,          sin_alpha,              cos_alpha,             di],
-                [0,          0,                      0,                     1]
-            ])
-
-            # Update the overall transformation matrix
-            T = np.dot(T, T_joint)
-
-            # Save the transformation matrix for this joint
-            T_matrices.append(T.copy())
-
-            # Extract the position of the current joint
-            position = T[:3, 3]
-
-            # No conversion needed since we're working in millimeters
-            joint_point = rg.Point3d(position[0], position[1], position[2])
-            JointPoints.append(joint_point)
-
-        # Create lines connecting the joints
-        JointLines = []
-        for i in range(1, len(JointPoints)):
-            line = rg.Line(JointPoints[i - 1], JointPoints[i])
-            JointLines.append(line)
-
-        # Optionally, connect the base to the first joint
-        if JointPoints:
-            base_position = T_base[:3, 3]
-            base_point = rg.Point3d(base_position[0], base_position[1], base_position[2])
-            line = rg.Line(base_point, JointPoints[0])
-            JointLines.insert(0, line)
+        # Joint points and link lines of the current configuration (COMAU NJ 60-2.2 DH model), built once and reused
+        # while the joints and the base do not move
+        def joint_geometry(frames):
+            points = [rg.Point3d(T[0, 3], T[1, 3], T[2, 3]) for T in frames[1:]]
+            base_point = rg.Point3d(frames[0][0, 3], frames[0][1, 3], frames[0][2, 3])
+            return points, [rg.Line(start, end) for start, end in zip([base_point] + points[:-1], points)]
+
+        points, lines = default_cache.derived("joint geometry", joints_rad, get_model("COMAU NJ 60-2.2"), joint_geometry,
+                                              T_base)
+        JointPoints = list(points)
+        JointLines = list(lines)  # Copied, the line to the TCP is appended below
+        SuccessMessage += f" FK cache: {default_cache.stats()}."
+        SuccessMessage += f" RoboDK: {session.stats()}."
 
         # Fetch the robot's pose relative to its base
         robot_pose = robot.Pose()
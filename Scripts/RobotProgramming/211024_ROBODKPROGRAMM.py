@@ -2,11 +2,27 @@ import robolink as rl    # RoboDK API for controlling and communicating with Rob
 import robodk as rdk     # RoboDK tools, such as matrix operations and other utilities
 import Rhino.Geometry as rg  # Import Rhino.Geometry module as rg
 import math
+import numpy as np
+from robot_models import get_model  # Robot model registry (robot_models.json)
+from kinematics_cache import default_cache  # IK results shared across solves
+from robodk_session import get_session  # Shared RoboDK link and item handles
+from reachability_map import ReachabilityMap, classify_targets, REACHABLE  # Precomputed reachability maps
+from program_builder import build_program, sync_program, render_suspended  # Bulk program creation and updates
+from robodk_async import run_pooled  # Concurrent RoboDK requests over several connections
+from pose_pipeline import PoseArray  # Batched plane/pose conversion
+from sequencing import order_targets  # Travel-time ordering inside precedence groups
 
 # === Inputs ===
 # RobotName: Name of the robot in RoboDK (e.g., "UR5")
 # UpdateRoboDK: Boolean toggle to execute the script and update RoboDK when True
 # PlanesList: List of Rhino Plane objects (each plane contains both target point and orientation)
+# LocalIK: Optional boolean, check reachability with the local IK (UR5, COMAU NJ 60-2.2) instead of simulated RoboDK moves
+# ReachabilityMapFile: Optional path of a map built with reachability_map.py, used to pre-classify planes
+# ProgramFile: Optional .script path; UR programs are written there and loaded with a single AddFile call
+# OptimizeOrder: Optional boolean, reorder planes inside their precedence groups to shorten the joint travel (local IK)
+# PrecedenceGroups: One label per plane (e.g. the Trussemble step); only consecutive planes with the same label are reordered
+# Incremental: Optional boolean, update the existing program and its targets in place, touching only changed planes (fastest with LocalIK; targets are named by plane index, so inserting or removing a plane updates every later target)
+# Connections: Optional number of parallel RoboDK API connections for the IK queries of planes without a local check and the target creation (default 1)
 
 # Initialize outputs
 SuccessMessage = ""
@@ -15,17 +31,7 @@ Program = ""
 TCPOrientations = []
 TargetPointCoordinates = []
 PlaneExtra = []  # Unreachable planes for other robots to attempt
-
-# Function to convert Rhino Plane to RoboDK Pose (4x4 matrix)
-def plane_to_pose(plane):
-    """Converts a Rhino plane to a RoboDK pose (4x4 matrix)."""
-    pose = rdk.Mat([
-        [plane.XAxis.X, plane.YAxis.X, plane.ZAxis.X, plane.OriginX],
-        [plane.XAxis.Y, plane.YAxis.Y, plane.ZAxis.Y, plane.OriginY],
-        [plane.XAxis.Z, plane.YAxis.Z, plane.ZAxis.Z, plane.OriginZ],
-        [0, 0, 0, 1]
-    ])
-    return pose
+PlaneOrder = []  # Indices of the programmed planes in visiting order
 
 # Function to format the orientation of the TCP as strings for easy reporting
 def format_tcp_orientation(plane, milestone):
@@ -53,11 +59,12 @@ elif not UpdateRoboDK:
     SuccessMessage = "UpdateRoboDK is set to False. No action taken."
 else:
     # Connect to RoboDK only if UpdateRoboDK is True
-    RDK = rl.Robolink()  # Initialize RoboDK connection
+    session = get_session()
+    RDK = session.link()  # Reuse the shared RoboDK connection
     SuccessMessage = "Connected to RoboDK."
     
     # Retrieve the robot by name
-    robot = RDK.Item(RobotName, rl.ITEM_TYPE_ROBOT)
+    robot = session.item(RobotName, rl.ITEM_TYPE_ROBOT)  # Cached handle between solves
     
     if not robot.Valid():
         SuccessMessage += f"\nError: Could not find {RobotName} in RoboDK."
@@ -91,49 +98,139 @@ else:
             # Get the robot base frame pose
             base_pose = robot_base.Pose()
 
-            # Create a new program
+            # All plane poses relative to the robot base frame in one batch
+            relative_poses = PoseArray.from_planes(PlanesList).transformed(base=base_pose)
+
+            # Pre-classify every plane locally (True/False), None where RoboDK still has to check it
+            plane_status = [None] * len(PlanesList)
+            robot_model = get_model(robot.Name())
+            use_local_ik = 'LocalIK' in globals() and bool(LocalIK) and robot_model is not None
+            if 'LocalIK' in globals() and LocalIK and robot_model is None:
+                SuccessMessage += f"\nNo local kinematic model for '{robot.Name()}', using RoboDK checks."
+            reach_map = None
+            if 'ReachabilityMapFile' in globals() and ReachabilityMapFile:
+                reach_map = ReachabilityMap.load(ReachabilityMapFile)
+                if robot_model is None or robot_model.name != reach_map.model_name:
+                    SuccessMessage += f"\nReachability map was built for '{reach_map.model_name}', ignoring it."
+                    reach_map = None
+
+            if use_local_ik or reach_map is not None:
+                flange_poses = relative_poses.transformed(tool=tool.PoseTool())
+
+                # The map settles the planes outside the reached region (lookup only) and the borderline ones
+                # (exact IK); a REACHABLE cell is an estimate, so those planes keep the usual check
+                if reach_map is not None:
+                    _, reachable_local, classes = classify_targets(reach_map, flange_poses, robot_model, cache=default_cache)
+                    plane_status = [None if cls == REACHABLE else bool(reachable)
+                                    for reachable, cls in zip(reachable_local, classes)]
+                    estimated = np.flatnonzero(classes == REACHABLE)
+                    if use_local_ik and estimated.size:
+                        _, reachable_local, _ = robot_model.solve(flange_poses[estimated], cache=default_cache)
+                        for i, reachable in zip(estimated, reachable_local):
+                            plane_status[i] = bool(reachable)
+                elif use_local_ik:
+                    _, reachable_local, _ = robot_model.solve(flange_poses, cache=default_cache)
+                    plane_status = [bool(reachable) for reachable in reachable_local]
+
+            # Planes left to RoboDK: with several connections, query its IK for all of them at once instead of
+            # simulating one move after the other (no collision check, like the local IK)
+            connections = int(Connections) if 'Connections' in globals() and Connections else 1
+            check_label = ["local check"] * len(PlanesList)
+            undecided = np.array([i for i, status in enumerate(plane_status) if status is None], dtype=int)
+            if connections > 1 and len(undecided):
+                undecided_flanges = relative_poses[undecided].transformed(tool=tool.PoseTool()).to_mats()
+                solutions = run_pooled(session.link_factory, connections,
+                                       lambda client: client.solve_ik(robot, undecided_flanges))
+                for i, joints in zip(undecided, solutions):
+                    plane_status[i] = len(joints) >= 6
+                    check_label[i] = "RoboDK IK"
+
+            # Check every plane without rendering in between
+            kept_indices = []
+            move_types = []
+            target_names = []
+            with render_suspended(RDK):
+                # Process each plane in PlanesList independently
+                for idx, plane in enumerate(PlanesList):
+                    # Target pose with respect to the robot's base frame (computed in the batch above)
+                    target_pose_relative = relative_poses.mat(idx)
+
+                    # Check if the target is reachable
+                    if plane_status[idx] is not None:
+                        if plane_status[idx]:
+                            SuccessMessage += f"\nPlane {idx+1} reachable ({check_label[idx]})."
+                        else:
+                            SuccessMessage += f"\nPlane {idx+1} unreachable ({check_label[idx]})."
+                            PlaneExtra.append(plane)  # Add unreachable plane to PlaneExtra for another robot
+                            continue  # Skip this plane and move to the next one
+                    else:
+                        try:
+                            # Check if robot can reach the target pose (simulating this step)
+                            robot.MoveJ(target_pose_relative, False)  # Simulation mode, does not execute actual motion
+                            SuccessMessage += f"\nPlane {idx+1} reachable."
+                        except Exception as e:
+                            # If an error occurs, consider the target unreachable
+                            SuccessMessage += f"\nPlane {idx+1} unreachable. Error: {str(e)}"
+                            PlaneExtra.append(plane)  # Add unreachable plane to PlaneExtra for another robot
+                            continue  # Skip this plane and move to the next one
+
+                    # Store the pose
+                    TargetPoses.append(target_pose_relative)
+
+                    # Format TCP orientation and coordinates for reporting
+                    milestone = f"Plane {idx+1}"
+                    TCPOrientations.append(format_tcp_orientation(plane, milestone))
+                    TargetPointCoordinates.append(format_target_coordinates(plane, milestone))
+
+                    # Collect the target, the program is created in bulk after the checks
+                    kept_indices.append(idx)
+                    move_types.append("MoveJ")
+                    target_names.append(f"Plane_{idx+1}")
+
+            # Reorder precedence-free planes to shorten the joint travel
+            if 'OptimizeOrder' in globals() and OptimizeOrder:
+                if robot_model is None:
+                    SuccessMessage += f"\nNo local kinematic model for '{robot.Name()}', keeping the input order."
+                elif 'PrecedenceGroups' not in globals() or not PrecedenceGroups or len(PrecedenceGroups) != len(PlanesList):
+                    SuccessMessage += "\nPrecedenceGroups needs one label per plane to reorder planes, keeping the input order."
+                else:
+                    home_joints = np.radians(robot.JointsHome().list())
+                    kept = np.array(kept_indices, dtype=int)
+                    kept_flanges = relative_poses[kept].transformed(tool=tool.PoseTool())
+                    kept_joints, kept_reachable, _ = robot_model.solve(kept_flanges, reference=home_joints, cache=default_cache)
+                    if not kept_reachable.all():
+                        SuccessMessage += "\nSome planes have no local IK solution, keeping the input order."
+                    else:
+                        sequencing = order_targets(kept_joints, [PrecedenceGroups[i] for i in kept], home_joints,
+                                                   robot_model.joint_speeds)
+                        kept_indices = [kept_indices[i] for i in sequencing.order]
+                        move_types = [move_types[i] for i in sequencing.order]
+                        target_names = [target_names[i] for i in sequencing.order]
+                        TargetPoses = [TargetPoses[i] for i in sequencing.order]
+                        TCPOrientations = [TCPOrientations[i] for i in sequencing.order]
+                        TargetPointCoordinates = [TargetPointCoordinates[i] for i in sequencing.order]
+                        SuccessMessage += f"\n{sequencing.summary()}"
+            PlaneOrder = list(kept_indices)
+
+            # Create the program with all targets in one bulk step
+            program_poses = relative_poses[np.array(kept_indices, dtype=int)]
             SuccessMessage += "\nCreating program in RoboDK..."
             program_name = "MoveThroughPlanesProgram"
-            program = RDK.AddProgram(program_name, robot)
-            program.setFrame(robot_base)  # Set the base frame of the robot
-            program.setTool(tool)  # Set the tool of the robot
-
-            # Process each plane in PlanesList independently
-            for idx, plane in enumerate(PlanesList):
-                # Convert plane to RoboDK pose
-                target_pose_robot = plane_to_pose(plane)
-
-                # Adjust the target pose with respect to the robot's base frame
-                base_pose_inv = base_pose.inv()
-                target_pose_relative = base_pose_inv * target_pose_robot
-
-                # Check if the target is reachable
-                try:
-                    # Check if robot can reach the target pose (simulating this step)
-                    robot.MoveJ(target_pose_relative, False)  # Simulation mode, does not execute actual motion
-                    SuccessMessage += f"\nPlane {idx+1} reachable."
-                except Exception as e:
-                    # If an error occurs, consider the target unreachable
-                    SuccessMessage += f"\nPlane {idx+1} unreachable. Error: {str(e)}"
-                    PlaneExtra.append(plane)  # Add unreachable plane to PlaneExtra for another robot
-                    continue  # Skip this plane and move to the next one
-
-                # Store the pose
-                TargetPoses.append(target_pose_relative)
-
-                # Format TCP orientation and coordinates for reporting
-                milestone = f"Plane {idx+1}"
-                TCPOrientations.append(format_tcp_orientation(plane, milestone))
-                TargetPointCoordinates.append(format_target_coordinates(plane, milestone))
-
-                # Add the movement target in RoboDK
-                target_name = f"Plane_{idx+1}"
-                target = RDK.AddTarget(target_name, robot_base, robot)
-                target.setAsCartesianTarget()
-                target.setPose(target_pose_relative)
-
-                # Add movements to the program independently
-                program.MoveJ(target)  # Move to the target
-
-            Program = program_name  # Assign the created program's name to the output
-            SuccessMessage += f"\nProgram '{program_name}' created successfully."
\ No newline at end of file
+            script_path = None
+            if 'ProgramFile' in globals() and ProgramFile:
+                if robot_model is not None and robot_model.ik_solver == "ur":
+                    script_path = ProgramFile
+                else:
+                    SuccessMessage += "\nProgramFile is only supported for UR robots, adding targets instead."
+            if 'Incremental' in globals() and Incremental and not script_path:
+                sync = sync_program(RDK, robot, robot_base, tool, program_name, program_poses, move_types,
+                                    target_names, session.item, forget=session.invalidate)
+                program = sync.program
+                SuccessMessage += f"\nIncremental update: {sync.summary()}."
+            else:
+                program = build_program(RDK, robot, robot_base, tool, program_name, program_poses, move_types,
+                                        target_names, script_path, session.link_factory, connections)
+
+            Program = program.Name()  # Assign the created program's name to the output
+            SuccessMessage += f"\nProgram '{Program}' created successfully ({len(program_poses)} targets)."
+            SuccessMessage += f"\nRoboDK: {session.stats()}."
\ No newline at end of file
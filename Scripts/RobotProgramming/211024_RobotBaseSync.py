@@ -2,15 +2,30 @@ import robolink as rl        # RoboDK API for communication
 import robodk as rdk         # RoboDK robotic simulation environment
 import Rhino.Geometry as rg  # Rhino geometry for working with 3D points
 import math                  # Math module for calculations
-
-# Initialize RoboDK link
-RDK = rl.Robolink()
+import numpy as np
+from robot_models import get_model                   # Robot model registry (Scripts/RobotProgramming)
+from base_placement import optimize_base_placement, select_base_poses  # Base placement search
+from pose_pipeline import planes_to_poses            # Batched plane/pose conversion
+from robodk_session import get_session              # Shared RoboDK link and item handles
+
+# Optional inputs:
+# OptimizeBase: Boolean, choose PointIndex and RotationZ by scoring all TablePoints x rotations
+# PlanesList: Rhino planes of the assembly targets used to score the base candidates
+# RotationStep: Rotation grid step in degrees (default 15)
+# NumRobots: Number of robots to place (default 1); the first one is the robot set by this component
+BaseScores = []
+BasePointIndices = []  # Table point index of each robot's base, chosen together to cover the most planes
+BaseRotations = []  # Rotation around Z in degrees of each robot's base
+
+# Reuse the shared RoboDK link
+session = get_session()
+RDK = session.link()
 # Ensure that RobotName is defined correctly from Grasshopper
 if 'RobotName' not in globals() or not RobotName:
     raise NameError("RobotName is not defined or empty.")
 
-# Fetch robot item by name
-robot = RDK.Item(RobotName, rl.ITEM_TYPE_ROBOT)
+# Fetch robot item by name (cached handle between solves)
+robot = session.item(RobotName, rl.ITEM_TYPE_ROBOT)
 
 # Ensure the robot is found in RoboDK
 if not robot.Valid():
@@ -24,7 +39,7 @@ def connect_to_robot(robot_name) -> str:
     :param robot_name: The name of the robot in RoboDK.
     :return: A message indicating success or error.
     """
-    robot = RDK.Item(robot_name, rl.ITEM_TYPE_ROBOT)
+    robot = session.item(robot_name, rl.ITEM_TYPE_ROBOT)  # Served from the handle cache
     if not robot.Valid():
         return f"Error: Could not find robot '{robot_name}' in RoboDK."
     else:
@@ -100,6 +115,34 @@ def rhino_to_robodk_coordinates(point):
 
 # Main script logic
 SuccessMessage = connect_to_robot(RobotName)  # Connect to the robot
+
+# Replace the hand-picked PointIndex/RotationZ with the best scored base pose
+if "Error" not in SuccessMessage and 'OptimizeBase' in globals() and OptimizeBase:
+    robot_model = get_model(RobotName)
+    if robot_model is None:
+        SuccessMessage = f"Error: No kinematic model for robot '{RobotName}'."
+    elif 'PlanesList' not in globals() or not PlanesList:
+        SuccessMessage = "Error: PlanesList is required to optimize the base."
+    else:
+        targets = planes_to_poses(PlanesList)
+        tool = robot.getLink(rl.ITEM_TYPE_TOOL)
+        tool_pose = np.array(tool.PoseTool().rows) if tool.Valid() else None
+        step = RotationStep if 'RotationStep' in globals() and RotationStep else 15
+        candidate_points = [rhino_to_robodk_coordinates(point) for point in TablePoints]
+        placements = optimize_base_placement(targets, candidate_points, robot_model, tool_pose,
+                                             rotations=np.arange(0, 360, step))
+        num_robots = int(NumRobots) if 'NumRobots' in globals() and NumRobots else 1
+        selected = select_base_poses(placements, num_robots)
+        BasePointIndices = [placement.point_index for placement in selected]
+        BaseRotations = [float(placement.rotation_z) for placement in selected]
+        PointIndex = BasePointIndices[0] if selected else placements[0].point_index
+        RotationZ = BaseRotations[0] if selected else float(placements[0].rotation_z)
+        BaseScores = [str(placement) for placement in placements[:10]]
+        if num_robots > 1:
+            covered = np.any([placement.reachable for placement in selected], axis=0) if selected else []
+            BaseScores.insert(0, f"{len(selected)} base pose(s) for {num_robots} robots reach "
+                                 f"{int(np.count_nonzero(covered))} of {len(targets)} planes")
+
 if "Error" not in SuccessMessage:
     # Validate the point index
     if not validate_point_index(PointIndex, TablePoints):
@@ -2,11 +2,39 @@ import robolink as rl    # RoboDK API for controlling and communicating with Rob
 import robodk as rdk     # RoboDK tools, such as matrix operations and other utilities
 import Rhino.Geometry as rg  # Import Rhino.Geometry module as rg
 import math
+import numpy as np
+from robot_models import get_model  # Robot model registry (robot_models.json)
+from kinematics_cache import default_cache  # IK results shared across solves
+from robodk_session import get_session  # Shared RoboDK link and item handles
+from reachability_map import ReachabilityMap, classify_targets, REACHABLE  # Precomputed reachability maps
+from program_builder import build_program, render_suspended  # Bulk program creation
+from robodk_async import run_pooled  # Concurrent RoboDK requests over several connections
+from pose_pipeline import PoseArray  # Batched plane/pose conversion
+from target_screening import screen_targets  # Jacobian conditioning screen
+from move_planner import chain_joints, plan_moves, ISSUE_NAMES  # Local MoveL/MoveJ decisions
+from ur_script import write_ur_script, blend_radii  # Offline URScript output
+from ur_script import DEFAULT_JOINT_SPEED, DEFAULT_JOINT_ACCELERATION, DEFAULT_LINEAR_SPEED, DEFAULT_LINEAR_ACCELERATION
+from cycle_time import MotionLimits, estimate_cycle_time  # Local cycle-time estimate
+from capsule_collision import check_clearance, CLEAR, COLLIDING  # Capsule collision screen
+from robot_kinematics import invert_poses
 
 # === Inputs ===
 # RobotName: Name of the robot in RoboDK (e.g., "UR5")
 # UpdateRoboDK: Boolean toggle to execute the script and update RoboDK when True
 # PlanesList: List of Rhino Plane objects (each plane contains both target point and orientation)
+# LocalIK: Optional boolean, check reachability and linear paths with the local IK (UR5, COMAU NJ 60-2.2) instead of simulated RoboDK moves
+# ReachabilityMapFile: Optional path of a map built with reachability_map.py, used to pre-classify planes
+# ProgramFile: Optional .script path; UR programs are written there and loaded with a single AddFile call
+# ScreenSingularities: Optional boolean, rank planes by Jacobian conditioning and use MoveJ for near-singular ones
+# SingularityThreshold: Optional inverse condition number below which a plane counts as near singular (default 0.005)
+# URScriptFile: Optional .script path; the program is also written there as URScript with local IK joint moves (UR robots)
+# BlendRadius: Optional blend radius in millimeters for the URScript moves (default 0)
+# Struts: Optional list of Rhino Lines, axes of the struts already placed; planes are screened locally, and with LocalIK RoboDK's mesh collision check is skipped where the plane and the move into it are clear
+# AssemblyOrder: Optional boolean, the last len(PlanesList) Struts are the struts placed at the planes, in the same order; each plane is then screened only against the struts placed before it
+# StrutRadius: Optional strut radius in millimeters (default 10)
+# ToolRadius: Optional radius in millimeters of the capsule from the flange to the TCP (default 30)
+# CollisionMargin: Optional clearance in millimeters below which a plane still gets the mesh check (default 20)
+# Connections: Optional number of parallel RoboDK API connections for the IK queries of planes without a local check and the target creation (default 1)
 
 # Initialize outputs
 SuccessMessage = ""
@@ -15,17 +43,8 @@ Program = ""
 TCPOrientations = []
 TargetPointCoordinates = []
 PlaneExtra = []  # Unreachable planes for other robots to attempt
-
-# Function to convert Rhino Plane to RoboDK Pose (4x4 matrix)
-def plane_to_pose(plane):
-    """Converts a Rhino plane to a RoboDK pose (4x4 matrix)."""
-    pose = rdk.Mat([
-        [plane.XAxis.X, plane.YAxis.X, plane.ZAxis.X, plane.OriginX],
-        [plane.XAxis.Y, plane.YAxis.Y, plane.ZAxis.Y, plane.OriginY],
-        [plane.XAxis.Z, plane.YAxis.Z, plane.ZAxis.Z, plane.OriginZ],
-        [0, 0, 0, 1]
-    ])
-    return pose
+PlaneConditioning = []  # Inverse condition number per plane (None if unreachable)
+PlaneRanking = []  # Plane indices, worst conditioned first
 
 # Function to format the orientation of the TCP as strings for easy reporting
 def format_tcp_orientation(plane, milestone):
@@ -53,11 +72,12 @@ elif not UpdateRoboDK:
     SuccessMessage = "UpdateRoboDK is set to False. No action taken."
 else:
     # Connect to RoboDK only if UpdateRoboDK is True
-    RDK = rl.Robolink()  # Initialize RoboDK connection
+    session = get_session()
+    RDK = session.link()  # Reuse the shared RoboDK connection
     SuccessMessage = "Connected to RoboDK."
     
     # Retrieve the robot by name
-    robot = RDK.Item(RobotName, rl.ITEM_TYPE_ROBOT)
+    robot = session.item(RobotName, rl.ITEM_TYPE_ROBOT)  # Cached handle between solves
     
     if not robot.Valid():
         SuccessMessage += f"\nError: Could not find {RobotName} in RoboDK."
@@ -81,6 +101,7 @@ else:
 
         # Enable collision detection in RoboDK
         RDK.setCollisionActive(1)
+        collision_active = 1
 
         if not robot_base.Valid() or not tool.Valid():
             SuccessMessage += "\nCannot proceed without valid base and tool."
@@ -91,59 +112,251 @@ else:
             # Get the robot base frame pose
             base_pose = robot_base.Pose()
 
-            # Create a new program
-            SuccessMessage += "\nCreating program in RoboDK..."
-            program_name = "MoveThroughPlanesProgram"
-            program = RDK.AddProgram(program_name, robot)
-            program.setFrame(robot_base)  # Set the base frame of the robot
-            program.setTool(tool)  # Set the tool of the robot
-
-            # Process each plane in PlanesList independently
-            for idx, plane in enumerate(PlanesList):
-                # Convert plane to RoboDK pose
-                target_pose_robot = plane_to_pose(plane)
-
-                # Adjust the target pose with respect to the robot's base frame
-                base_pose_inv = base_pose.inv()
-                target_pose_relative = base_pose_inv * target_pose_robot
-
-                # Try a linear movement first
-                linear_movement_success = False
-                try:
-                    robot.MoveL(target_pose_relative, False)  # Simulation mode, does not execute actual motion
-                    linear_movement_success = True
-                    SuccessMessage += f"\nPlane {idx+1} reachable with linear movement."
-                except Exception as e:
-                    SuccessMessage += f"\nPlane {idx+1} unreachable with linear movement. Error: {str(e)}"
-                    
-                    # Attempt a joint movement if linear movement fails
-                    try:
-                        robot.MoveJ(target_pose_relative, False)  # Simulation mode, does not execute actual motion
-                        SuccessMessage += f"\nPlane {idx+1} reachable with joint movement."
-                    except Exception as e:
-                        SuccessMessage += f"\nPlane {idx+1} unreachable with both linear and joint movements. Error: {str(e)}"
+            # All plane poses relative to the robot base frame in one batch
+            relative_poses = PoseArray.from_planes(PlanesList).transformed(base=base_pose)
+
+            # Pre-classify every plane locally (True/False), None where RoboDK still has to check it
+            plane_status = [None] * len(PlanesList)
+            robot_model = get_model(robot.Name())
+            use_local_ik = 'LocalIK' in globals() and bool(LocalIK) and robot_model is not None
+            if 'LocalIK' in globals() and LocalIK and robot_model is None:
+                SuccessMessage += f"\nNo local kinematic model for '{robot.Name()}', using RoboDK checks."
+            reach_map = None
+            if 'ReachabilityMapFile' in globals() and ReachabilityMapFile:
+                reach_map = ReachabilityMap.load(ReachabilityMapFile)
+                if robot_model is None or robot_model.name != reach_map.model_name:
+                    SuccessMessage += f"\nReachability map was built for '{reach_map.model_name}', ignoring it."
+                    reach_map = None
+
+            screen = 'ScreenSingularities' in globals() and bool(ScreenSingularities) and robot_model is not None
+            near_singular = [False] * len(PlanesList)
+            linear_plan = [None] * len(PlanesList)  # (linear move feasible, reason) from the local check
+            collide = 'Struts' in globals() and bool(Struts) and robot_model is not None
+            collision_status = [None] * len(PlanesList)  # CLEAR, NEAR or COLLIDING from the capsule check
+            mesh_check = np.ones(len(PlanesList), dtype=bool)  # False where the capsules cleared the move into the plane
+
+            if use_local_ik or reach_map is not None or screen or collide:
+                flange_poses = relative_poses.transformed(tool=tool.PoseTool())
+
+                # The map settles the planes outside the reached region (lookup only) and the borderline ones
+                # (exact IK); a REACHABLE cell is an estimate, so those planes keep the usual check
+                if reach_map is not None:
+                    _, reachable_local, classes = classify_targets(reach_map, flange_poses, robot_model, cache=default_cache)
+                    plane_status = [None if cls == REACHABLE else bool(reachable)
+                                    for reachable, cls in zip(reachable_local, classes)]
+                    estimated = np.flatnonzero(classes == REACHABLE)
+                    if use_local_ik and estimated.size:
+                        _, reachable_local, _ = robot_model.solve(flange_poses[estimated], cache=default_cache)
+                        for i, reachable in zip(estimated, reachable_local):
+                            plane_status[i] = bool(reachable)
+                elif use_local_ik:
+                    _, reachable_local, _ = robot_model.solve(flange_poses, cache=default_cache)
+                    plane_status = [bool(reachable) for reachable in reachable_local]
+
+                # Configurations the program will use, each plane closest to the one before it (NaN if unreachable)
+                candidates = np.array([i for i, status in enumerate(plane_status) if status is not False], dtype=int)
+                home_joints = np.radians(robot.JointsHome().list())
+                plane_joints = np.full((len(PlanesList), 6), np.nan)
+                plane_joints[candidates] = chain_joints(flange_poses[candidates], robot_model, home_joints)[0]
+
+                # Capsule distances between the robot at every plane and the placed struts (robot base frame)
+                if collide:
+                    to_base = invert_poses(np.array(base_pose.rows))
+                    ends = np.array([[[p.X, p.Y, p.Z] for p in (line.From, line.To)] for line in Struts], dtype=float)
+                    ends = ends @ to_base[:3, :3].T + to_base[:3, 3]
+                    clearance_options = dict(strut_starts=ends[:, 0], strut_ends=ends[:, 1],
+                                             strut_radii=StrutRadius if 'StrutRadius' in globals() and StrutRadius else 10.0,
+                                             tool=np.array(tool.PoseTool().rows),
+                                             tool_radius=ToolRadius if 'ToolRadius' in globals() and ToolRadius else 30.0,
+                                             margin=CollisionMargin if 'CollisionMargin' in globals() and CollisionMargin else 20.0)
+                    # Struts in place at each plane: all of them, or in assembly order the ones before its own
+                    placed = np.full(len(PlanesList), len(Struts))
+                    if 'AssemblyOrder' in globals() and AssemblyOrder:
+                        if len(Struts) < len(PlanesList):
+                            SuccessMessage += "\nAssemblyOrder needs one strut per plane, screening against all Struts."
+                        else:
+                            placed = np.arange(len(PlanesList)) + len(Struts) - len(PlanesList)
+                    solved = np.flatnonzero(~np.isnan(plane_joints).any(axis=1))
+                    clearance = check_clearance(plane_joints[solved], robot_model, placed=placed[solved], **clearance_options)
+                    for i, status in zip(solved, clearance.status):
+                        collision_status[i] = status
+                    SuccessMessage += f"\nLocal collision check: {clearance.summary()}."
+
+                    # Colliding planes are skipped, so the planes after them are chained without them
+                    candidates = np.array([i for i in candidates if collision_status[i] != COLLIDING], dtype=int)
+                    plane_joints[:] = np.nan
+                    plane_joints[candidates] = chain_joints(flange_poses[candidates], robot_model, home_joints)[0]
+
+                # Conditioning of all planes in one pass
+                if screen:
+                    threshold = SingularityThreshold if 'SingularityThreshold' in globals() and SingularityThreshold else 0.005
+                    screening = screen_targets(flange_poses, robot_model, threshold=threshold, joints=plane_joints)
+                    near_singular = list(screening.near_singular)
+                    PlaneConditioning = [None if np.isnan(c) else float(c) for c in screening.inverse_condition]
+                    PlaneRanking = [int(i) for i in screening.ranking()]
+                    SuccessMessage += f"\n{sum(near_singular)} plane(s) near a singularity."
+
+                # Linear paths between consecutive candidate planes, all checked in one pass
+                if use_local_ik:
+                    plan = plan_moves(flange_poses[candidates], robot_model, home_joints,
+                                      np.array(near_singular, dtype=bool)[candidates], tool=np.array(tool.PoseTool().rows))
+                    for i, move_type, issue in zip(candidates, plan.move_types, plan.issues):
+                        linear_plan[i] = (move_type == "MoveL", ISSUE_NAMES[issue])
+                        plane_status[i] = move_type is not None
+
+                # The mesh check can only be skipped where the whole planned move into a plane is clear: the
+                # capsules are checked at the samples of the linear path, or of the joint interpolation of a MoveJ
+                if collide and use_local_ik:
+                    reached = np.flatnonzero(plan.reachable)
+                    starts = np.vstack([home_joints[None], plan.joints[reached[:-1]]])
+                    fractions = np.linspace(0.0, 1.0, plan.paths.shape[1] + 1)[1:, None]
+                    samples = np.where(np.array([plan.move_types[k] == "MoveL" for k in reached])[:, None, None],
+                                       plan.paths[reached],
+                                       starts[:, None] + fractions * (plan.joints[reached] - starts)[:, None])
+                    # A sample without joints leaves the move unscreened, it keeps the mesh check
+                    samples = samples.reshape(-1, 6)
+                    sampled = ~np.isnan(samples).any(axis=1)
+                    sample_status = np.full(len(samples), COLLIDING)
+                    sample_placed = np.repeat(placed[candidates[reached]], plan.paths.shape[1])
+                    sample_status[sampled] = check_clearance(samples[sampled], robot_model, placed=sample_placed[sampled],
+                                                             **clearance_options).status
+                    swept_status = sample_status.reshape(len(reached), plan.paths.shape[1]).max(axis=1)
+                    for k, status in zip(reached, swept_status):
+                        if collision_status[candidates[k]] == CLEAR and status == CLEAR:
+                            mesh_check[candidates[k]] = False
+                    SuccessMessage += f"\n{len(reached) - int(np.sum(swept_status == CLEAR))} move(s) pass near a placed strut."
+
+                # Near contact (or no move screened): let RoboDK check the moves with its meshes
+                if collide:
+                    for i in np.flatnonzero(mesh_check):
+                        linear_plan[i] = None
+
+            # Planes left to RoboDK: with several connections, query its IK for all of them at once so planes
+            # without any solution skip both simulated moves
+            connections = int(Connections) if 'Connections' in globals() and Connections else 1
+            check_label = ["local check"] * len(PlanesList)
+            undecided = np.array([i for i, status in enumerate(plane_status) if status is None], dtype=int)
+            if connections > 1 and len(undecided):
+                undecided_flanges = relative_poses[undecided].transformed(tool=tool.PoseTool()).to_mats()
+                solutions = run_pooled(session.link_factory, connections,
+                                       lambda client: client.solve_ik(robot, undecided_flanges))
+                for i, joints in zip(undecided, solutions):
+                    plane_status[i] = len(joints) >= 6
+                    check_label[i] = "RoboDK IK"
+
+            # Check every plane without rendering in between
+            kept_indices = []
+            move_types = []
+            target_names = []
+            with render_suspended(RDK):
+                # Process each plane in PlanesList independently
+                for idx, plane in enumerate(PlanesList):
+                    # Target pose with respect to the robot's base frame (computed in the batch above)
+                    target_pose_relative = relative_poses.mat(idx)
+
+                    # Planes without any IK solution cannot be reached by either movement
+                    if plane_status[idx] is False:
+                        SuccessMessage += f"\nPlane {idx+1} unreachable ({check_label[idx]})."
                         PlaneExtra.append(plane)  # Add unreachable plane to PlaneExtra for another robot
                         continue  # Skip this plane and move to the next one
+                    if collision_status[idx] == COLLIDING:
+                        SuccessMessage += f"\nPlane {idx+1} collides with a placed strut (local check)."
+                        PlaneExtra.append(plane)  # Another robot may reach it from a different side
+                        continue
+
+                    # Mesh collision checks unless the capsules cleared the plane and the move into it
+                    if collide:
+                        wanted = 1 if mesh_check[idx] else 0
+                        if wanted != collision_active:
+                            RDK.setCollisionActive(wanted)
+                            collision_active = wanted
+
+                    # Linear and joint movements already decided by the batched local check
+                    if linear_plan[idx] is not None:
+                        linear_movement_success, reason = linear_plan[idx]
+                        if linear_movement_success:
+                            SuccessMessage += f"\nPlane {idx+1} reachable with linear movement (local check)."
+                        elif near_singular[idx]:
+                            SuccessMessage += f"\nPlane {idx+1} near a singularity, using joint movement (local check)."
+                        else:
+                            SuccessMessage += f"\nPlane {idx+1} unreachable with linear movement ({reason}, local check)."
+                            SuccessMessage += f"\nPlane {idx+1} reachable with joint movement (local check)."
+                    else:
+                        # Try a linear movement first, except near a singularity (slow, jerky linear motion)
+                        linear_movement_success = False
+                        if near_singular[idx]:
+                            SuccessMessage += f"\nPlane {idx+1} near a singularity, using joint movement."
+                        else:
+                            try:
+                                robot.MoveL(target_pose_relative, False)  # Simulation mode, does not execute actual motion
+                                linear_movement_success = True
+                                SuccessMessage += f"\nPlane {idx+1} reachable with linear movement."
+                            except Exception as e:
+                                SuccessMessage += f"\nPlane {idx+1} unreachable with linear movement. Error: {str(e)}"
 
-                # Store the pose
-                TargetPoses.append(target_pose_relative)
+                        if not linear_movement_success:
+                            # Attempt a joint movement if linear movement fails (no need to ask RoboDK if already known
+                            # reachable, unless it has to check the joint move for collisions)
+                            if plane_status[idx] and not (collide and mesh_check[idx]):
+                                SuccessMessage += f"\nPlane {idx+1} reachable with joint movement ({check_label[idx]})."
+                            else:
+                                try:
+                                    robot.MoveJ(target_pose_relative, False)  # Simulation mode, does not execute actual motion
+                                    SuccessMessage += f"\nPlane {idx+1} reachable with joint movement."
+                                except Exception as e:
+                                    SuccessMessage += f"\nPlane {idx+1} unreachable with both linear and joint movements. Error: {str(e)}"
+                                    PlaneExtra.append(plane)  # Add unreachable plane to PlaneExtra for another robot
+                                    continue  # Skip this plane and move to the next one
 
-                # Format TCP orientation and coordinates for reporting
-                milestone = f"Plane {idx+1}"
-                TCPOrientations.append(format_tcp_orientation(plane, milestone))
-                TargetPointCoordinates.append(format_target_coordinates(plane, milestone))
+                    # Store the pose
+                    TargetPoses.append(target_pose_relative)
 
-                # Add the movement target in RoboDK
-                target_name = f"Plane_{idx+1}"
-                target = RDK.AddTarget(target_name, robot_base, robot)
-                target.setAsCartesianTarget()
-                target.setPose(target_pose_relative)
+                    # Format TCP orientation and coordinates for reporting
+                    milestone = f"Plane {idx+1}"
+                    TCPOrientations.append(format_tcp_orientation(plane, milestone))
+                    TargetPointCoordinates.append(format_target_coordinates(plane, milestone))
 
-                # Add the correct type of movement to the program
-                if linear_movement_success:
-                    program.MoveL(target)  # Add the successful linear movement to the program
+                    # Collect the target, the program is created in bulk after the checks
+                    kept_indices.append(idx)
+                    move_types.append("MoveL" if linear_movement_success else "MoveJ")
+                    target_names.append(f"Plane_{idx+1}")
+
+            # Create the program with all targets in one bulk step
+            program_poses = relative_poses[np.array(kept_indices, dtype=int)]
+            SuccessMessage += "\nCreating program in RoboDK..."
+            program_name = "MoveThroughPlanesProgram"
+            script_path = None
+            if 'ProgramFile' in globals() and ProgramFile:
+                if robot_model is not None and robot_model.ik_solver == "ur":
+                    script_path = ProgramFile
                 else:
-                    program.MoveJ(target)  # Add the fallback joint movement to the program
+                    SuccessMessage += "\nProgramFile is only supported for UR robots, adding targets instead."
+            program = build_program(RDK, robot, robot_base, tool, program_name, program_poses, move_types,
+                                    target_names, script_path, session.link_factory, connections)
+
+            # The same targets and move types as an offline UR program, joint moves solved with the local IK
+            if 'URScriptFile' in globals() and URScriptFile:
+                if robot_model is None or robot_model.ik_solver != "ur":
+                    SuccessMessage += "\nURScriptFile needs a UR robot with a local kinematic model."
+                else:
+                    tool_pose = np.array(tool.PoseTool().rows)
+                    program_flanges = program_poses.transformed(tool=tool_pose)
+                    home_joints = np.radians(robot.JointsHome().list())
+                    program_joints, program_reachable = chain_joints(program_flanges, robot_model, home_joints)
+                    blend = BlendRadius if 'BlendRadius' in globals() and BlendRadius else 0.0
+                    moves = write_ur_script(URScriptFile, program_poses, move_types, tool_pose, program_name,
+                                            program_joints, blend)
+                    SuccessMessage += f"\nURScript with {moves} moves written to {URScriptFile}."
+
+                    # Cycle time with the speeds and accelerations written to the script (write_ur_script defaults)
+                    script_limits = MotionLimits([DEFAULT_JOINT_SPEED] * 6, [DEFAULT_JOINT_ACCELERATION] * 6,
+                                                 linear_speed=1000.0 * DEFAULT_LINEAR_SPEED,
+                                                 linear_acceleration=1000.0 * DEFAULT_LINEAR_ACCELERATION)
+                    costed_moves = [m if ok else None for m, ok in zip(move_types, program_reachable)]
+                    estimate = estimate_cycle_time(program_joints, costed_moves, robot_model, home_joints,
+                                                   script_limits, tool_pose, blend_radii(program_poses.positions, blend))
+                    SuccessMessage += f"\n{estimate.summary()}."
 
-            Program = program_name  # Assign the created program's name to the output
-            SuccessMessage += f"\nProgram '{program_name}' created successfully."
\ No newline at end of file
+            Program = program.Name()  # Assign the created program's name to the output
+            SuccessMessage += f"\nProgram '{Program}' created successfully ({len(program_poses)} targets)."
+            SuccessMessage += f"\nRoboDK: {session.stats()}."
\ No newline at end of file
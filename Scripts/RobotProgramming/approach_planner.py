@@ -0,0 +1,322 @@
+import os
+import time
+import argparse
+import numpy as np
+from capsule_collision import segment_distances
+from strut_bvh import StrutBVH
+
+# Approach directions for placing struts between the struts already in the truss. The gripper holds a strut
+# at its midpoint with the TCP X axis along the strut and its Z axis perpendicular to it, so a direction of
+# motion fixes the gripper orientation as well: the TCP Z axis is the motion direction without its component
+# along the strut, and the motion may tilt away from that axis by a limited angle. For every strut the
+# sampled directions are tested at once: the carried strut is swept against the placed struts (StrutBVH)
+# and the gripper envelope, spheres covering the surface of CustomGripper.stl at two levels of detail, is
+# swept against the nearby struts. Struts are placed in sequence order, each becoming an obstacle for the
+# next. The free direction with the widest cone of free neighbours is chosen (the preferred direction among
+# similarly wide ones), and approach and retreat poses are offset along it.
+#
+# Benchmark on a layered truss:  python approach_planner.py --layers 4
+
+GRIPPER_STL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".OLD", "CustomGripper.stl")
+
+_envelopes = {}  # (path, modification time, settings) -> GripperEnvelope
+
+
+def read_stl(path):
+    """
+    Triangles of a binary or ASCII STL file.
+
+    :return: Array of shape (T, 3, 3), vertex coordinates in the file's units.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) >= 84:
+        count = int(np.frombuffer(data[80:84], "<u4")[0])
+        if len(data) == 84 + 50 * count:
+            record = np.dtype([("normal", "<f4", 3), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+            return np.frombuffer(data[84:], record)["vertices"].astype(float)
+    vertices = [line.split()[1:4] for line in data.decode("ascii", "replace").splitlines()
+                if line.strip().startswith("vertex")]
+    return np.array(vertices, dtype=float).reshape(-1, 3, 3)
+
+
+def _sample_surface(triangles, spacing):
+    """Points on the triangles, no further than spacing apart along the edges of a barycentric grid."""
+    edges = np.linalg.norm(triangles - np.roll(triangles, 1, axis=1), axis=2).max(axis=1)
+    divisions = np.maximum(np.ceil(edges / spacing), 1).astype(int)
+    points = []
+    for k in np.unique(divisions):
+        i, j = np.meshgrid(np.arange(k + 1), np.arange(k + 1), indexing="ij")
+        inside = i + j <= k
+        weights = np.stack([i[inside], j[inside], k - i[inside] - j[inside]], axis=1) / k
+        points.append(np.einsum("mk,tkc->tmc", weights, triangles[divisions == k]).reshape(-1, 3))
+    return np.concatenate(points)
+
+
+def _voxel_spheres(points, radii, size):
+    """Group spheres by voxel: one sphere per voxel around its members, and the voxel of every member."""
+    _, labels = np.unique(np.floor(points / size), axis=0, return_inverse=True)
+    labels = labels.reshape(-1)
+    count = labels.max() + 1
+    centers = np.zeros((count, 3))
+    np.add.at(centers, labels, points)
+    centers /= np.bincount(labels, minlength=count)[:, None]
+    bounding = np.zeros(count)
+    np.maximum.at(bounding, labels, np.linalg.norm(points - centers[labels], axis=1) + radii)
+    return centers, bounding, labels
+
+
+class GripperEnvelope:
+    """Gripper surface as spheres in the TCP frame: fine spheres grouped under coarse ones."""
+
+    def __init__(self, centers, radii, coarse_centers, coarse_radii, parents):
+        self.centers = centers  # (K, 3) millimeters in the TCP frame
+        self.radii = radii  # (K,)
+        self.coarse_centers = coarse_centers  # (C, 3)
+        self.coarse_radii = coarse_radii  # (C,)
+        self.parents = parents  # (K,) coarse sphere of every fine sphere
+        order = np.argsort(parents, kind="stable")
+        self._members = order  # fine spheres sorted by coarse sphere
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(parents, minlength=len(coarse_centers)))])
+
+    @classmethod
+    def from_triangles(cls, triangles, tcp=None, spacing=10.0, coarse_spacing=40.0):
+        """
+        :param triangles: Gripper mesh, shape (T, 3, 3).
+        :param tcp: 4x4 pose of the TCP in the mesh coordinates. Defaults to the centre of the top face of the
+                    bounding box with the mesh axes: the fingertips of CustomGripper.stl, which close along Y
+                    around a strut along X.
+        :param spacing: Size of the fine spheres in millimeters.
+        :param coarse_spacing: Size of the coarse spheres in millimeters.
+        """
+        triangles = np.asarray(triangles, dtype=float)
+        if tcp is None:
+            lower, upper = triangles.reshape(-1, 3).min(axis=0), triangles.reshape(-1, 3).max(axis=0)
+            tcp = np.eye(4)
+            tcp[:3, 3] = [(lower[0] + upper[0]) / 2, (lower[1] + upper[1]) / 2, upper[2]]
+        tcp = np.asarray(tcp, dtype=float)
+        local = (triangles.reshape(-1, 3) - tcp[:3, 3]) @ tcp[:3, :3]  # mesh -> TCP frame
+        # Samples half a spacing apart are within a quarter spacing of every surface point (edge midpoints)
+        samples = _sample_surface(local.reshape(-1, 3, 3), 0.5 * spacing)
+        centers, radii, _ = _voxel_spheres(samples, np.full(len(samples), 0.25 * spacing), spacing)
+        coarse_centers, coarse_radii, parents = _voxel_spheres(centers, radii, coarse_spacing)
+        return cls(centers, radii, coarse_centers, coarse_radii, parents)
+
+    @classmethod
+    def from_stl(cls, path=GRIPPER_STL, tcp=None, spacing=10.0, coarse_spacing=40.0):
+        """Envelope of an STL file, cached until the file changes."""
+        key = (os.path.abspath(path), os.path.getmtime(path), spacing, coarse_spacing,
+               None if tcp is None else np.asarray(tcp, dtype=float).tobytes())
+        if key not in _envelopes:
+            _envelopes[key] = cls.from_triangles(read_stl(path), tcp, spacing, coarse_spacing)
+        return _envelopes[key]
+
+    @property
+    def reach(self):
+        """Largest distance of the envelope from the TCP."""
+        return float((np.linalg.norm(self.coarse_centers, axis=1) + self.coarse_radii).max())
+
+    def members(self, coarse):
+        """Fine spheres of each coarse sphere in an index array, as (coarse position, fine sphere) pairs."""
+        counts = self._offsets[coarse + 1] - self._offsets[coarse]
+        owners = np.repeat(np.arange(len(coarse)), counts)
+        # Position of every pair within its group, plus where the group starts in the sorted members
+        within_group = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return owners, self._members[np.repeat(self._offsets[coarse], counts) + within_group]
+
+    def summary(self):
+        return f"{len(self.centers)} spheres in {len(self.coarse_centers)} groups, reach {self.reach:.0f} mm"
+
+
+def sphere_directions(count):
+    """Nearly uniform unit vectors (Fibonacci sphere), shape (count, 3)."""
+    k = np.arange(count) + 0.5
+    z = 1.0 - 2.0 * k / count
+    angle = np.pi * (1.0 + 5.0 ** 0.5) * k
+    ring = np.sqrt(1.0 - z * z)
+    return np.stack([ring * np.cos(angle), ring * np.sin(angle), z], axis=1)
+
+
+def tcp_rotations(axis, directions):
+    """
+    TCP orientations of a strut for several directions of motion.
+
+    :param axis: Unit strut direction, shape (3,).
+    :param directions: Unit motion directions, shape (D, 3), not parallel to the axis.
+    :return: Rotation matrices of shape (D, 3, 3), columns X (the strut), Y and Z (the motion without its axial part).
+    """
+    z = directions - (directions @ axis)[:, None] * axis
+    z /= np.linalg.norm(z, axis=1, keepdims=True)
+    x = np.broadcast_to(axis, z.shape)
+    return np.stack([x, np.cross(z, x), z], axis=2)
+
+
+class ApproachPlan:
+    """Chosen direction, free cone and TCP poses of every strut; NaN poses where no direction is free."""
+
+    def __init__(self, directions, free, chosen, cone_angles, poses, approach_distance, retreat_distance):
+        self.directions = directions  # (D, 3) sampled directions of motion
+        self.free = free  # (N, D) direction usable for the strut (False outside the tilt band)
+        self.chosen = chosen  # (N,) index into directions, -1 where none is free
+        self.cone_angles = cone_angles  # (N,) radians to the nearest blocked or unusable direction
+        self.poses = poses  # (N, 4, 4) TCP at the placement
+        offsets = np.where(chosen[:, None] >= 0, directions[np.maximum(chosen, 0)], np.nan)
+        self.approach_poses = poses.copy()
+        self.approach_poses[:, :3, 3] -= approach_distance * offsets
+        self.retreat_poses = poses.copy()
+        self.retreat_poses[:, :3, 3] -= retreat_distance * offsets
+
+    @property
+    def feasible(self):
+        return self.chosen >= 0
+
+    def summary(self):
+        cones = np.degrees(self.cone_angles[self.feasible])
+        spread = f", cone half-angle {cones.min():.0f}-{cones.max():.0f} deg" if cones.size else ""
+        return f"{int(self.feasible.sum())} of {len(self.chosen)} struts with a free approach{spread}"
+
+
+def _gripper_hits(envelope, rotations, origin, motion, length, strut_starts, strut_ends, strut_radii):
+    """Directions whose swept gripper comes into contact with one of the struts (coarse spheres, then fine ones)."""
+    def swept_distances(centers, radii, direction, struts):
+        # Every sphere centre moves along the segment from centre - length * motion to centre
+        return (segment_distances(centers - length * motion[direction], centers, strut_starts[struts], strut_ends[struts])
+                - radii - strut_radii[struts])
+
+    coarse = origin + np.einsum("dij,cj->dci", rotations, envelope.coarse_centers)  # (D, C, 3)
+    count, groups = coarse.shape[:2]
+    d, c, s = np.meshgrid(np.arange(count), np.arange(groups), np.arange(len(strut_starts)), indexing="ij")
+    d, c, s = d.ravel(), c.ravel(), s.ravel()
+    touching = swept_distances(coarse[d, c], envelope.coarse_radii[c], d, s) <= 0.0
+    d, c, s = d[touching], c[touching], s[touching]
+
+    owners, fine = envelope.members(c)
+    d, s = d[owners], s[owners]
+    centers = origin + np.einsum("kij,kj->ki", rotations[d], envelope.centers[fine])
+    touching = swept_distances(centers, envelope.radii[fine], d, s) <= 0.0
+    blocked = np.zeros(count, dtype=bool)
+    blocked[d[touching]] = True
+    return blocked
+
+
+def plan_approaches(starts, ends, envelope, placed_starts=None, placed_ends=None, strut_radius=10.0,
+                    directions=256, max_tilt=np.radians(30), approach_distance=100.0, retreat_distance=None,
+                    preferred=(0.0, 0.0, -1.0), clearance_trim=0.1, steps=8, floor=None):
+    """
+    Free approach directions for struts placed one after the other.
+
+    :param starts: Strut end points in placement order, shape (N, 3) (e.g. the assembly steps of Trussemble).
+    :param ends: Other strut end points, shape (N, 3).
+    :param envelope: The GripperEnvelope.
+    :param placed_starts: Optional struts already standing before the first one, shape (M, 3).
+    :param placed_ends: Their other end points, shape (M, 3).
+    :param strut_radius: Strut radius in millimeters.
+    :param directions: Number of sampled directions on the sphere.
+    :param max_tilt: Largest angle in radians between the motion and the TCP Z axis (perpendicular to the strut).
+    :param approach_distance: Distance in millimeters of the approach pose before the placement.
+    :param retreat_distance: Distance of the retreat pose after releasing the strut (defaults to the approach).
+    :param preferred: Direction of motion preferred among directions with similarly wide cones (top-down).
+    :param clearance_trim: Fraction of the strut length left out at both ends, where it meets its neighbours.
+    :param steps: Sampling steps of the carried strut along the approach.
+    :param floor: Optional height of the build plate; the gripper may not reach below it.
+    :return: An ApproachPlan.
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 3)
+    retreat_distance = approach_distance if retreat_distance is None else retreat_distance
+    sweep = max(approach_distance, retreat_distance)
+    samples = sphere_directions(directions)
+    preferred = np.asarray(preferred, dtype=float) / np.linalg.norm(preferred)
+    spacing = np.sqrt(4.0 * np.pi / directions)  # angle between neighbouring samples
+
+    index = StrutBVH()
+    if placed_starts is not None and len(placed_starts):
+        index.insert(placed_starts, placed_ends, strut_radius)
+
+    count = len(starts)
+    free = np.zeros((count, directions), dtype=bool)
+    chosen = np.full(count, -1)
+    cone_angles = np.zeros(count)
+    poses = np.tile(np.eye(4), (count, 1, 1))
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        axis = (end - start) / np.linalg.norm(end - start)
+        origin = 0.5 * (start + end)
+        usable = np.abs(samples @ axis) <= np.sin(max_tilt)
+        band = np.flatnonzero(usable)
+        motion = samples[band]
+        rotations = tcp_rotations(axis, motion)
+        blocked = np.zeros(len(band), dtype=bool)
+        if floor is not None:
+            # Lowest gripper sphere at the placement and at the far end of the sweep (the motion is linear)
+            heights = origin[2] + np.einsum("dj,kj->dk", rotations[:, 2], envelope.centers) - envelope.radii
+            blocked |= np.minimum(heights, heights - sweep * motion[:, 2:3]).min(axis=1) < floor
+
+        if len(index):
+            # Carried strut, trimmed where it meets its neighbours, moving in along every direction
+            trim = clearance_trim * (end - start)
+            near, final = (start + trim, end - trim), np.tile([start + trim, end - trim], (len(band), 1, 1))
+            hit, _, _ = index.swept(final[:, 0] - approach_distance * motion, final[:, 1] - approach_distance * motion,
+                                    final[:, 0], final[:, 1], strut_radius, 0.0, steps)
+            blocked[hit] = True
+            # Gripper against the struts within its reach
+            _, neighbours, _ = index.within(near[0], near[1], 0.0, envelope.reach + sweep + strut_radius)
+            neighbours = np.unique(neighbours)
+            if neighbours.size:
+                open_band = np.flatnonzero(~blocked)
+                blocked[open_band] = _gripper_hits(envelope, rotations[open_band], origin, motion[open_band], sweep,
+                                                   *index.struts(neighbours))
+
+        free[i, band] = ~blocked
+        if (~blocked).any():
+            # Angle from every free direction to the nearest blocked or unusable one
+            unusable = samples[~free[i]]
+            candidates = band[~blocked]
+            if len(unusable):
+                cones = np.arccos(np.clip((samples[candidates] @ unusable.T).max(axis=1), -1.0, 1.0))
+            else:
+                cones = np.full(len(candidates), np.pi)
+            wide = np.flatnonzero(cones >= cones.max() - spacing)
+            best = wide[np.argmax(samples[candidates[wide]] @ preferred)]
+            chosen[i] = candidates[best]
+            cone_angles[i] = cones[best]
+            poses[i, :3, :3] = tcp_rotations(axis, samples[chosen[i]][None])[0]
+        else:
+            poses[i, :3, :3] = np.nan
+        poses[i, :3, 3] = origin
+        index.insert(start, end, strut_radius)  # an obstacle for the struts after it
+    return ApproachPlan(samples, free, chosen, cone_angles, poses, approach_distance, retreat_distance)
+
+
+def _layered_truss(layers, size=4, spacing=300.0):
+    """Struts of a grid truss in layer order: bars and diagonals per layer, then the verticals to the next layer."""
+    struts = []
+    grid = [(i, j) for i in range(size) for j in range(size)]
+    for k in range(layers):
+        z = k * spacing
+        for i, j in grid:
+            for di, dj in ((1, 0), (0, 1), (1, 1)):
+                if i + di < size and j + dj < size:
+                    struts.append(((i * spacing, j * spacing, z), ((i + di) * spacing, (j + dj) * spacing, z)))
+        if k + 1 < layers:
+            for i, j in grid:
+                struts.append(((i * spacing, j * spacing, z), (i * spacing, j * spacing, z + spacing)))
+    struts = np.array(struts, dtype=float)
+    return struts[:, 0], struts[:, 1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan the approach of every strut of a layered truss.")
+    parser.add_argument("--layers", type=int, default=4)
+    parser.add_argument("--directions", type=int, default=256)
+    parser.add_argument("--stl", default=GRIPPER_STL)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    gripper = GripperEnvelope.from_stl(args.stl)
+    load_time = time.perf_counter() - start
+    strut_starts, strut_ends = _layered_truss(args.layers)
+    start = time.perf_counter()
+    plan = plan_approaches(strut_starts, strut_ends, gripper, directions=args.directions)
+    plan_time = time.perf_counter() - start
+    print(f"Gripper: {gripper.summary()} ({1000 * load_time:.0f} ms)")
+    print(f"{plan.summary()} in {plan_time:.2f} s ({1000 * plan_time / len(strut_starts):.1f} ms per strut)")
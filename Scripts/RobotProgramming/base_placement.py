@@ -0,0 +1,119 @@
+import math
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from robot_kinematics import inverse_kinematics, manipulability, invert_poses
+
+# Base placement search: every table point x Z rotation candidate is scored by how many assembly targets the
+# robot reaches from there (batched local IK) and by the manipulability margin of the reached targets.
+
+
+class BasePlacement:
+    """Score of one candidate base pose."""
+
+    def __init__(self, point_index, rotation_z, pose, reachable):
+        self.point_index = point_index
+        self.rotation_z = rotation_z  # degrees
+        self.pose = pose  # 4x4 world pose of the robot base
+        self.reachable = reachable  # boolean mask over the targets
+        self.num_reachable = int(np.count_nonzero(reachable))
+        self.margin = 0.0  # worst manipulability over the reached targets (best IK solution per target)
+
+    def __repr__(self):
+        return (f"BasePlacement(point={self.point_index}, rz={self.rotation_z}, "
+                f"reachable={self.num_reachable}, margin={self.margin:.4f})")
+
+
+def base_pose(point, rotation_z_deg):
+    """
+    Base pose at a table point rotated about Z.
+
+    :param point: (x, y, z) of the base in millimeters.
+    :param rotation_z_deg: Rotation around the Z-axis in degrees.
+    :return: 4x4 numpy array.
+    """
+    rz = math.radians(rotation_z_deg)
+    pose = np.eye(4)
+    pose[:2, :2] = [[math.cos(rz), -math.sin(rz)], [math.sin(rz), math.cos(rz)]]
+    pose[:3, 3] = point
+    return pose
+
+
+def _flange_poses(targets, base, tool_inverse):
+    """Flange poses in the robot base frame for targets given in the world frame."""
+    return invert_poses(base) @ targets @ tool_inverse
+
+
+def _score_reach(args):
+    point_index, point, rotation_z, targets, tool_inverse, model = args
+    pose = base_pose(point, rotation_z)
+    _, valid = inverse_kinematics(_flange_poses(targets, pose, tool_inverse), model)
+    return BasePlacement(point_index, rotation_z, pose, valid.any(axis=1))
+
+
+def _score_margin(args):
+    placement, targets, tool_inverse, model = args
+    reached = np.flatnonzero(placement.reachable)
+    if reached.size == 0:
+        return placement
+    solutions, valid = inverse_kinematics(_flange_poses(targets[reached], placement.pose, tool_inverse), model)
+    values = manipulability(np.nan_to_num(solutions.reshape(-1, 6)), model).reshape(valid.shape)
+    best_per_target = np.where(valid, values, -np.inf).max(axis=1)
+    placement.margin = float(best_per_target.min())
+    return placement
+
+
+def optimize_base_placement(targets, table_points, model, tool=None, rotations=range(0, 360, 15),
+                            top_k=10, max_workers=None):
+    """
+    Score every table point x rotation candidate and rank them.
+
+    Reachability is evaluated for all candidates; the more expensive manipulability margin only for the
+    top_k candidates by reach count. Candidates are scored in parallel threads (NumPy releases the GIL).
+
+    :param targets: TCP target poses in the world frame, shape (N, 4, 4).
+    :param table_points: Candidate base positions, shape (M, 3).
+    :param model: The DHModel of the robot.
+    :param tool: Optional 4x4 TCP pose relative to the flange.
+    :param rotations: Candidate rotations around Z in degrees.
+    :param top_k: Number of candidates that get a manipulability margin.
+    :param max_workers: Thread count (None lets the executor decide).
+    :return: List of BasePlacement sorted best first (most targets reached, then largest margin).
+    """
+    targets = np.asarray(targets, dtype=float).reshape(-1, 4, 4)
+    tool_inverse = np.eye(4) if tool is None else invert_poses(np.asarray(tool, dtype=float))
+    candidates = [(i, point, rz, targets, tool_inverse, model)
+                  for i, point in enumerate(np.asarray(table_points, dtype=float)) for rz in rotations]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        placements = list(executor.map(_score_reach, candidates))
+        placements.sort(key=lambda placement: -placement.num_reachable)
+        best = list(executor.map(_score_margin, [(p, targets, tool_inverse, model) for p in placements[:top_k]]))
+
+    best.sort(key=lambda placement: (-placement.num_reachable, -placement.margin))
+    return best + placements[top_k:]
+
+
+def select_base_poses(placements, num_robots):
+    """
+    Greedy choice of several base poses that together reach the most targets (one per robot, at most one
+    robot per table point).
+
+    :param placements: Scored candidates from optimize_base_placement.
+    :param num_robots: Number of robots available.
+    :return: List of up to num_robots BasePlacement objects.
+    """
+    if not placements:
+        return []
+    covered = np.zeros_like(placements[0].reachable)
+    used_points = set()
+    selected = []
+    for _ in range(num_robots):
+        gains = [np.count_nonzero(p.reachable & ~covered) if p.point_index not in used_points else 0
+                 for p in placements]
+        best = int(np.argmax(gains))
+        if gains[best] == 0:
+            break
+        selected.append(placements[best])
+        covered |= placements[best].reachable
+        used_points.add(placements[best].point_index)
+    return selected
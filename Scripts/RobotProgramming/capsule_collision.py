@@ -0,0 +1,185 @@
+import time
+import argparse
+import numpy as np
+from robot_kinematics import forward_kinematics
+from robot_models import get_model
+
+# Local collision screen between the robot and the struts that are already placed. Robot links and struts are
+# capsules (segment + radius): every DH link is the segment along its joint axis (d) followed by the segment
+# along its common normal (a), the tool is the segment from the flange to the TCP. Surface distances of all
+# link/strut pairs of a batch of configurations come from a bounding-sphere pass (matrix products) and one
+# vectorized segment-segment distance kernel for the pairs within the margin.
+# Only configurations within the margin need RoboDK's mesh collision check.
+#
+# Benchmark:  python capsule_collision.py "UR5" --configurations 2000 --struts 300
+
+CLEAR, NEAR, COLLIDING = 0, 1, 2
+
+
+def _closest_parameters(a, b, c, e, f):
+    """
+    Parameters s, t in [0, 1] of the closest points of two segments p1 + s d1 and p2 + t d2, from the dot
+    products a = d1.d1, b = d1.d2, c = d1.r, e = d2.d2, f = d2.r with r = p1 - p2.
+    """
+    eps = 1e-12
+    safe_a = np.where(a > eps, a, 1.0)
+    safe_e = np.where(e > eps, e, 1.0)
+    denominator = a * e - b * b
+    parallel = denominator <= 1e-9 * a * e
+
+    # Closest point of the infinite lines on the first segment (its start for parallel lines), clamped
+    s = np.where(parallel, 0.0, np.clip((b * f - c * e) / np.where(parallel, 1.0, denominator), 0.0, 1.0))
+    # Matching point on the second segment; when it falls outside, clamp it and project back onto the first
+    t = (b * s + f) / safe_e
+    t_clamped = np.clip(t, 0.0, 1.0)
+    s = np.where(t != t_clamped, np.clip((b * t_clamped - c) / safe_a, 0.0, 1.0), s)
+    t = t_clamped
+    # Segments of zero length are points
+    s = np.where(e > eps, s, np.clip(-c / safe_a, 0.0, 1.0))
+    t = np.where(e > eps, t, 0.0)
+    t = np.where(a > eps, t, np.clip(f / safe_e, 0.0, 1.0))
+    s = np.where(a > eps, s, 0.0)
+    return s, t
+
+
+def segment_distances(p1, q1, p2, q2):
+    """
+    Shortest distance between the segments p1-q1 and p2-q2 (closest points of both, clamped to the segments).
+
+    :param p1: Start points of the first segments, shape (..., 3).
+    :param q1: End points of the first segments, shape (..., 3).
+    :param p2: Start points of the second segments, broadcastable to p1.
+    :param q2: End points of the second segments, broadcastable to p1.
+    :return: Array with the broadcast shape of the inputs without the last axis.
+    """
+    d1 = q1 - p1
+    d2 = q2 - p2
+    r = p1 - p2
+    dot = lambda u, v: np.einsum('...i,...i', u, v)
+    s, t = _closest_parameters(dot(d1, d1), dot(d1, d2), dot(d1, r), dot(d2, d2), dot(d2, r))
+    return np.linalg.norm(r + s[..., None] * d1 - t[..., None] * d2, axis=-1)
+
+
+def robot_capsules(joints, model, tool=None, tool_radius=0.0):
+    """
+    Capsules of the robot links for a batch of configurations, in the robot base frame.
+
+    :param joints: Joint angles in radians, shape (N, 6) or (6,).
+    :param model: The DHModel of the robot (link_radii gives the capsule sizes).
+    :param tool: Optional 4x4 TCP pose relative to the flange; adds a tool capsule from the flange to the TCP.
+    :param tool_radius: Radius of the tool capsule in millimeters.
+    :return: Tuple (starts (N, L, 3), ends (N, L, 3), radii (L,)).
+    """
+    frames = forward_kinematics(joints, model)
+    origins = frames[:, :-1, :3, 3]
+    # Point where each link leaves its joint axis (after the d offset), then on to the next frame
+    elbows = origins + model.d[None, :, None] * frames[:, :-1, :3, 2]
+    starts = [origins, elbows]
+    ends = [elbows, frames[:, 1:, :3, 3]]
+    radii = [model.link_radii, model.link_radii]
+    if tool is not None:
+        starts.append(frames[:, -1:, :3, 3])
+        ends.append((frames[:, -1] @ np.asarray(tool, dtype=float))[:, None, :3, 3])
+        radii.append([tool_radius])
+    return np.concatenate(starts, axis=1), np.concatenate(ends, axis=1), np.concatenate(radii).astype(float)
+
+
+class ClearanceCheck:
+    """Smallest surface distance per configuration and its classification."""
+
+    def __init__(self, distances, closest_link, closest_strut, margin):
+        self.distances = distances  # (N,) millimeters, negative where capsules overlap (a lower bound above the margin)
+        self.closest_link = closest_link  # (N,) capsule index of the robot (two per DH link, then the tool)
+        self.closest_strut = closest_strut  # (N,) strut index
+        self.status = np.where(distances <= 0.0, COLLIDING, np.where(distances <= margin, NEAR, CLEAR))
+
+    def summary(self):
+        counts = np.bincount(self.status, minlength=3)
+        return f"{counts[CLEAR]} clear, {counts[NEAR]} near contact, {counts[COLLIDING]} colliding"
+
+
+def check_clearance(joints, model, strut_starts, strut_ends, strut_radii, tool=None, tool_radius=0.0,
+                    margin=20.0, ignore=None, placed=None, max_pairs=2000000):
+    """
+    Distance between the robot and the placed struts for a batch of configurations.
+
+    :param joints: Joint angles in radians, shape (N, 6).
+    :param model: The DHModel of the robot.
+    :param strut_starts: Strut end points in the robot base frame, shape (S, 3).
+    :param strut_ends: Other strut end points, shape (S, 3).
+    :param strut_radii: Strut radius in millimeters, scalar or shape (S,).
+    :param tool: Optional 4x4 TCP pose relative to the flange.
+    :param tool_radius: Radius of the tool capsule in millimeters.
+    :param margin: Surface distance in millimeters below which a configuration is near contact. Distances are
+                   exact up to the margin; above it they may be lower bounds from the bounding spheres.
+    :param ignore: Optional strut index per configuration to leave out (the strut held by the gripper), -1 for none.
+    :param placed: Optional number of struts in place per configuration, with the struts in placement order: only
+                   the struts before that index count, the one held by the gripper and later ones are left out.
+    :param max_pairs: Capsule pairs evaluated at once; bounds the memory of large batches.
+    :return: A ClearanceCheck.
+    """
+    joints = np.asarray(joints, dtype=float).reshape(-1, 6)
+    strut_starts = np.asarray(strut_starts, dtype=float).reshape(-1, 3)
+    strut_ends = np.asarray(strut_ends, dtype=float).reshape(-1, 3)
+    strut_radii = np.broadcast_to(np.asarray(strut_radii, dtype=float), (len(strut_starts),))
+    count = len(joints)
+    distances = np.full(count, np.inf)
+    closest_link = np.full(count, -1)
+    closest_strut = np.full(count, -1)
+    if not len(strut_starts) or not count:
+        return ClearanceCheck(distances, closest_link, closest_strut, margin)
+
+    starts, ends, radii = robot_capsules(joints, model, tool, tool_radius)
+    link_half_lengths = lambda p, q: 0.5 * np.linalg.norm(q - p, axis=1)
+    strut_centers = 0.5 * (strut_starts + strut_ends)
+    strut_half_lengths = link_half_lengths(strut_starts, strut_ends)
+    num_links = starts.shape[1]
+    chunk = max(1, max_pairs // (num_links * len(strut_starts)))
+    for first in range(0, count, chunk):
+        rows = slice(first, first + chunk)
+        link_starts = starts[rows].reshape(-1, 3)
+        link_ends = ends[rows].reshape(-1, 3)
+        link_radii = np.tile(radii, len(link_starts) // num_links)
+        # Broad phase: bounding spheres of both capsules give a lower bound of every gap
+        link_centers = 0.5 * (link_starts + link_ends)
+        squared = (np.einsum('ij,ij->i', link_centers, link_centers)[:, None] - 2.0 * link_centers @ strut_centers.T
+                   + np.einsum('ij,ij->i', strut_centers, strut_centers)[None, :])
+        gaps = (np.sqrt(np.maximum(squared, 0.0)) - link_half_lengths(link_starts, link_ends)[:, None] - strut_half_lengths[None, :]
+                - link_radii[:, None] - strut_radii[None, :])
+        # Narrow phase: exact segment distances only where the bound is within the margin
+        near_links, near_struts = np.nonzero(gaps <= margin)
+        gaps[near_links, near_struts] = (segment_distances(link_starts[near_links], link_ends[near_links],
+                                                           strut_starts[near_struts], strut_ends[near_struts])
+                                         - link_radii[near_links] - strut_radii[near_struts])
+        gaps = gaps.reshape(-1, num_links, len(strut_starts))
+        if ignore is not None:
+            held = np.asarray(ignore)[rows]
+            gaps[np.flatnonzero(held >= 0), :, held[held >= 0]] = np.inf
+        if placed is not None:
+            missing = np.arange(len(strut_starts))[None, :] >= np.asarray(placed)[rows, None]
+            gaps[np.broadcast_to(missing[:, None], gaps.shape)] = np.inf
+        flat = gaps.reshape(len(gaps), -1)
+        best = np.argmin(flat, axis=1)
+        distances[rows] = flat[np.arange(len(flat)), best]
+        closest_link[rows], closest_strut[rows] = np.divmod(best, len(strut_starts))
+    return ClearanceCheck(distances, closest_link, closest_strut, margin)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the capsule clearance check on random data.")
+    parser.add_argument("robot", help="Robot name, e.g. \"UR5\"")
+    parser.add_argument("--configurations", type=int, default=2000)
+    parser.add_argument("--struts", type=int, default=300)
+    args = parser.parse_args()
+
+    robot_model = get_model(args.robot)
+    rng = np.random.default_rng(0)
+    sample_joints = rng.uniform(-np.pi, np.pi, (args.configurations, 6))
+    centers = rng.uniform([0.3, -0.4, 0.0], [0.7, 0.4, 0.5], (args.struts, 3)) * robot_model.reach  # build volume
+    directions = rng.normal(size=(args.struts, 3))
+    directions *= 150.0 / np.linalg.norm(directions, axis=1, keepdims=True)
+    start = time.perf_counter()
+    check = check_clearance(sample_joints, robot_model, centers - directions, centers + directions, 10.0,
+                            tool=np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 150], [0, 0, 0, 1]]), tool_radius=30.0)
+    elapsed = time.perf_counter() - start
+    print(f"{args.configurations} configurations x {args.struts} struts: {check.summary()} in {1000 * elapsed:.1f} ms")
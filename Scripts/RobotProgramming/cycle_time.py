@@ -0,0 +1,176 @@
+import math
+import time
+import argparse
+import numpy as np
+from robot_kinematics import forward_kinematics, quaternions
+from robot_models import get_model
+
+# Local cycle-time estimate of a MoveJ/MoveL program. Every move is a rest-to-rest (or blended) 1-D motion
+# profile: trapezoidal (speed and acceleration limits) or S-curve (plus a jerk limit). MoveJ is synchronized,
+# so the slowest joint decides; MoveL follows the TCP path length and the tool rotation angle. A blended
+# waypoint is passed at cruise speed instead of stopping. All moves are evaluated in one batch.
+#
+# Benchmark:  python cycle_time.py "UR5" --moves 2000
+
+
+class MotionLimits:
+    """Speed, acceleration and optional jerk limits for joint and linear moves."""
+
+    def __init__(self, joint_speeds, joint_accelerations, joint_jerks=None, linear_speed=250.0,
+                 linear_acceleration=1200.0, linear_jerk=None, angular_speed=math.pi,
+                 angular_acceleration=2 * math.pi):
+        """
+        :param joint_speeds: Joint speed limits in rad/s, shape (6,).
+        :param joint_accelerations: Joint acceleration limits in rad/s^2, shape (6,).
+        :param joint_jerks: Optional joint jerk limits in rad/s^3 for S-curve profiles (default 10 x acceleration).
+        :param linear_speed: TCP speed of linear moves in mm/s.
+        :param linear_acceleration: TCP acceleration of linear moves in mm/s^2.
+        :param linear_jerk: Optional TCP jerk in mm/s^3 (default 10 x acceleration).
+        :param angular_speed: Tool rotation speed of linear moves in rad/s.
+        :param angular_acceleration: Tool rotation acceleration of linear moves in rad/s^2.
+        """
+        self.joint_speeds = np.asarray(joint_speeds, dtype=float)
+        self.joint_accelerations = np.asarray(joint_accelerations, dtype=float)
+        self.joint_jerks = np.asarray(joint_jerks if joint_jerks is not None else 10 * self.joint_accelerations,
+                                      dtype=float)
+        self.linear_speed = float(linear_speed)
+        self.linear_acceleration = float(linear_acceleration)
+        self.linear_jerk = float(linear_jerk if linear_jerk is not None else 10 * linear_acceleration)
+        self.angular_speed = float(angular_speed)
+        self.angular_acceleration = float(angular_acceleration)
+
+    @classmethod
+    def for_model(cls, model, **linear):
+        """Joint limits of a DHModel, linear limits from the keyword arguments."""
+        return cls(model.joint_speeds, model.joint_accelerations, **linear)
+
+
+def _acceleration_time(speed, acceleration, jerk):
+    """Time to go from rest to a speed (S-curve when jerk is given, trapezoidal otherwise)."""
+    if jerk is None:
+        return speed / acceleration
+    return np.where(speed * jerk >= acceleration ** 2, speed / acceleration + acceleration / jerk,
+                    2.0 * np.sqrt(speed / jerk))
+
+
+def _rest_to_rest_time(distance, speed, acceleration, jerk):
+    """Minimum time of a rest-to-rest move (all arguments broadcast)."""
+    distance = np.abs(distance)
+    ramp = _acceleration_time(speed, acceleration, jerk)
+    cruise = distance >= speed * ramp  # accelerating and braking both take speed * ramp / 2 of distance
+
+    # Speed not reached: the peak speed v satisfies distance = v * ramp(v)
+    if jerk is None:
+        peak = np.sqrt(distance * acceleration)
+    else:
+        knee = acceleration ** 2 / jerk
+        b = acceleration * knee
+        peak_limited = (-b / acceleration + np.sqrt((b / acceleration) ** 2 + 4 * acceleration * distance)) / 2
+        peak_jerk = (distance * np.sqrt(jerk) / 2) ** (2.0 / 3.0)
+        peak = np.where(peak_limited >= knee, peak_limited, peak_jerk)
+    short = 2.0 * _acceleration_time(np.maximum(peak, 1e-12), acceleration, jerk)
+    return np.where(cruise, distance / speed + ramp, np.where(distance > 0, short, 0.0))
+
+
+def profile_time(distance, speed, acceleration, jerk=None, stops=2):
+    """
+    Duration of a 1-D move with trapezoidal (jerk None) or S-curve velocity profile.
+
+    :param distance: Move distance(s).
+    :param speed: Speed limit.
+    :param acceleration: Acceleration limit.
+    :param jerk: Optional jerk limit (S-curve).
+    :param stops: 2 for rest to rest, 1 if one end is blended, 0 if both ends are blended (passed at cruise speed).
+    :return: Duration(s) with the broadcast shape of the arguments.
+    """
+    distance = np.abs(np.asarray(distance, dtype=float))
+    stops = np.asarray(stops)
+    # A move with one stop is half of a rest-to-rest move of twice the distance
+    half_scaled = 2.0 / np.maximum(stops, 1)
+    stopped = stops / 2.0 * _rest_to_rest_time(distance * half_scaled, speed, acceleration, jerk)
+    return np.where(stops == 0, distance / speed, stopped)
+
+
+class CycleTimeEstimate:
+    """Duration of every move and the total."""
+
+    def __init__(self, move_times):
+        self.move_times = move_times  # seconds, 0 for skipped (unreachable) targets
+
+    @property
+    def total(self):
+        return float(self.move_times.sum())
+
+    def summary(self):
+        return f"Estimated cycle time {self.total:.2f} s over {int(np.count_nonzero(self.move_times))} moves"
+
+
+def estimate_cycle_time(joints, move_types, model, start_joints, limits=None, tool=None, blend_radii=None,
+                        profile="trapezoidal"):
+    """
+    Estimate the duration of a MoveJ/MoveL program from its joint solutions.
+
+    :param joints: Joint solution per waypoint in radians, shape (N, 6).
+    :param move_types: "MoveJ" or "MoveL" per waypoint; None (unreachable) waypoints are skipped.
+    :param model: The DHModel of the robot.
+    :param start_joints: Joints in radians before the first move, shape (6,).
+    :param limits: MotionLimits, defaults to the model's joint limits and the default linear limits.
+    :param tool: Optional 4x4 TCP pose relative to the flange (linear moves follow the TCP).
+    :param blend_radii: Optional blend radius per waypoint; waypoints with a radius > 0 are passed without stopping.
+    :param profile: "trapezoidal" or "s-curve".
+    :return: A CycleTimeEstimate (move_times has one entry per waypoint).
+    """
+    limits = limits if limits is not None else MotionLimits.for_model(model)
+    s_curve = profile == "s-curve"
+    joints = np.asarray(joints, dtype=float).reshape(-1, 6)
+    included = np.array([move_type is not None for move_type in move_types], dtype=bool)
+    linear = np.array([move_type == "MoveL" for move_type in move_types], dtype=bool)[included]
+    path = np.vstack([np.asarray(start_joints, dtype=float)[None], joints[included]])
+
+    # A move stops at its start unless the previous waypoint is blended, and at its end unless its own is
+    blended = np.zeros(len(path), dtype=bool)
+    if blend_radii is not None:
+        blended[1:] = np.asarray(blend_radii, dtype=float)[included] > 0
+        blended[-1] = False
+    stops = (~blended[:-1]).astype(int) + (~blended[1:]).astype(int)
+
+    # Joint moves: the slowest joint of each move
+    joint_times = profile_time(np.diff(path, axis=0), limits.joint_speeds, limits.joint_accelerations,
+                               limits.joint_jerks if s_curve else None, stops[:, None]).max(axis=1)
+
+    # Linear moves: TCP path length and tool rotation angle
+    times = joint_times
+    if linear.any():
+        frames = forward_kinematics(path, model)[:, -1]
+        if tool is not None:
+            frames = frames @ np.asarray(tool, dtype=float)
+        lengths = np.linalg.norm(np.diff(frames[:, :3, 3], axis=0), axis=1)
+        q = quaternions(frames[:, :3, :3])
+        angles = 2.0 * np.arccos(np.clip(np.abs(np.sum(q[:-1] * q[1:], axis=1)), 0.0, 1.0))
+        translation_times = profile_time(lengths, limits.linear_speed, limits.linear_acceleration,
+                                         limits.linear_jerk if s_curve else None, stops)
+        rotation_times = profile_time(angles, limits.angular_speed, limits.angular_acceleration, None, stops)
+        times = np.where(linear, np.maximum(translation_times, rotation_times), joint_times)
+
+    move_times = np.zeros(len(move_types))
+    move_times[included] = times
+    return CycleTimeEstimate(move_times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the cycle-time estimator on a random program.")
+    parser.add_argument("robot", help="Robot name, e.g. \"UR5\"")
+    parser.add_argument("--moves", type=int, default=2000)
+    args = parser.parse_args()
+
+    robot_model = get_model(args.robot)
+    rng = np.random.default_rng(0)
+    program_joints = np.cumsum(rng.normal(0, 0.2, (args.moves, 6)), axis=0)
+    program_moves = rng.choice(["MoveJ", "MoveL"], args.moves).tolist()
+    radii = rng.choice([0.0, 5.0], args.moves)
+    for name in ("trapezoidal", "s-curve"):
+        start = time.perf_counter()
+        estimate = estimate_cycle_time(program_joints, program_moves, robot_model, np.zeros(6),
+                                       blend_radii=radii, profile=name)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {estimate.summary()} in {1000 * elapsed:.1f} ms")
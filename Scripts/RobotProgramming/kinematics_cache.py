@@ -0,0 +1,138 @@
+from collections import OrderedDict
+import numpy as np
+from robot_kinematics import forward_kinematics, inverse_kinematics
+
+# LRU memoization of FK and IK results. Keys are the model's kinematics_key (name and DH parameters) plus the
+# joint vector (or pose) quantized to a fixed resolution, so repeated queries for a robot that has not moved are
+# served from memory, and a model registered again with other DH values does not get the old results.
+# The module-level default_cache lives as long as the Python session, i.e. across Grasshopper solves.
+
+
+class KinematicsCache:
+    """Bounded LRU cache around forward_kinematics and inverse_kinematics with hit/miss counters."""
+
+    def __init__(self, max_size=4096, joint_resolution=1e-6, position_resolution=1e-3, rotation_resolution=1e-6):
+        """
+        :param max_size: Maximum number of cached results (FK and IK entries together).
+        :param joint_resolution: Joint quantization step in radians.
+        :param position_resolution: Pose position quantization step in millimeters.
+        :param rotation_resolution: Pose rotation matrix quantization step.
+        """
+        self.max_size = max_size
+        self.joint_resolution = joint_resolution
+        self.position_resolution = position_resolution
+        self.rotation_resolution = rotation_resolution
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _joint_keys(self, kind, joints, model):
+        quantized = np.round(joints / self.joint_resolution).astype(np.int64)
+        return [(kind, model.kinematics_key, row.tobytes()) for row in quantized]
+
+    def _pose_keys(self, kind, poses, model):
+        rotations = np.round(poses[:, :3, :3].reshape(-1, 9) / self.rotation_resolution).astype(np.int64)
+        positions = np.round(poses[:, :3, 3] / self.position_resolution).astype(np.int64)
+        quantized = np.concatenate([rotations, positions], axis=1)
+        return [(kind, model.kinematics_key, row.tobytes()) for row in quantized]
+
+    def _lookup(self, keys, compute, inputs):
+        """Serve cached rows and compute all missing rows in one batch."""
+        results = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            value = self._entries.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                self._entries.move_to_end(key)
+                results[i] = value
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            computed = compute(inputs[missing])
+            for row, i in enumerate(missing):
+                value = tuple(part[row].copy() for part in computed)
+                results[i] = value
+                self._entries[keys[i]] = value
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return results
+
+    def forward(self, joints, model, base=None):
+        """
+        Cached forward_kinematics. Frames are cached relative to the robot base, so moving the base does
+        not invalidate them.
+
+        :param joints: Joint angles in radians, shape (N, 6) or (6,).
+        :param model: The DHModel of the robot.
+        :param base: Optional 4x4 base pose.
+        :return: Array of shape (N, 7, 4, 4).
+        """
+        joints = np.atleast_2d(np.asarray(joints, dtype=float))
+        keys = self._joint_keys("fk", joints, model)
+        results = self._lookup(keys, lambda q: (forward_kinematics(q, model),), joints)
+        frames = np.stack([value[0] for value in results])
+        if base is not None:
+            frames = np.asarray(base, dtype=float) @ frames
+        return frames
+
+    def inverse(self, poses, model):
+        """
+        Cached inverse_kinematics.
+
+        :param poses: Flange poses in the robot base frame, shape (N, 4, 4) or (4, 4).
+        :param model: The DHModel of the robot.
+        :return: Tuple (solutions of shape (N, 8, 6), valid mask of shape (N, 8)).
+        """
+        poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+        keys = self._pose_keys("ik", poses, model)
+        results = self._lookup(keys, lambda T: inverse_kinematics(T, model), poses)
+        return np.stack([value[0] for value in results]), np.stack([value[1] for value in results])
+
+    def derived(self, kind, joints, model, build, base=None):
+        """
+        Cached object built from the joint frames of one configuration, e.g. the Rhino geometry of the links,
+        so it is not rebuilt while the robot and its base do not move.
+
+        :param kind: Name of what build returns, keeps the results of different builders apart.
+        :param joints: Joint angles in radians, shape (6,).
+        :param model: The DHModel of the robot.
+        :param build: Function frames (7, 4, 4) -> object, called on a miss with the frames from forward.
+        :param base: Optional 4x4 base pose.
+        :return: The object build returned. It is shared between hits, so callers must not modify it.
+        """
+        joints = np.asarray(joints, dtype=float).reshape(1, 6)
+        base = np.asarray(base if base is not None else np.eye(4), dtype=float)
+        key = self._joint_keys(kind, joints, model)[0] + (self._pose_keys("base", base[None], model)[0][2],)
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value[0]
+        value = (build(base @ forward_kinematics(joints, model)[0]),)
+        self.misses += 1
+        self._entries[key] = value
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return value[0]
+
+    def stats(self):
+        """Hit/miss summary as a string."""
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        return f"{self.hits} hits / {self.misses} misses ({rate:.1f}%), {len(self._entries)}/{self.max_size} entries"
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Shared cache for the Grasshopper components
+default_cache = KinematicsCache()
@@ -0,0 +1,220 @@
+import copy
+import math
+import numpy as np
+from robot_kinematics import (forward_kinematics, inverse_kinematics, interpolate_poses, invert_poses,
+                              inverse_condition_number, damped_least_squares_ik)
+
+# Local replacement for the simulated RoboDK moves of 241124_Linear.py: every target is tried with a linear
+# move from the previous one and falls back to a joint move, using only the local kinematics. All linear
+# segments of a program are sampled and solved in one batch (along the straight TCP path, as a MoveL moves
+# the tool center point and not the flange); a segment is rejected when a sample has no IK
+# solution, the start configuration's branch breaks off or jumps (configuration flip), the continuous joint
+# path leaves the limits, or it passes close to a singularity.
+
+
+def unwrap_joints(joints, reference, model):
+    """
+    Shift joint angles by multiples of 360 degrees to the turn closest to a reference, within the limits.
+
+    :param joints: Joint angles in radians, shape (..., 6).
+    :param reference: Reference joints in radians, broadcastable to joints.
+    :param model: The DHModel of the robot.
+    :return: Array with the shape of joints.
+    """
+    joints = np.asarray(joints, dtype=float)
+    shifted = joints + 2 * math.pi * np.round((np.asarray(reference) - joints) / (2 * math.pi))
+    inside = (shifted >= model.joint_limits[:, 0]) & (shifted <= model.joint_limits[:, 1])
+    return np.where(inside, shifted, joints)
+
+
+class MovePlan:
+    """Move type and joint solution per target; move_types[i] is None for unreachable targets."""
+
+    def __init__(self, move_types, joints, issues=None, paths=None):
+        self.move_types = move_types
+        self.joints = joints  # (N, 6) radians, NaN where unreachable
+        self.issues = issues  # (N,) why the linear move was rejected (LINEAR_OK for MoveL), see ISSUE_NAMES
+        self.paths = paths  # (N, steps, 6) joints along the linear path into each target, NaN where it breaks off
+
+    @property
+    def reachable(self):
+        return np.array([move_type is not None for move_type in self.move_types], dtype=bool)
+
+    def summary(self):
+        linear = sum(move_type == "MoveL" for move_type in self.move_types)
+        joint = sum(move_type == "MoveJ" for move_type in self.move_types)
+        return f"{linear} linear, {joint} joint, {len(self.move_types) - linear - joint} unreachable"
+
+
+# Reasons a linear move is rejected (LinearMoveCheck.issues)
+LINEAR_OK, NO_SOLUTION, CONFIGURATION_FLIP, JOINT_LIMITS, SINGULARITY = range(5)
+ISSUE_NAMES = ("feasible", "no IK solution", "configuration flip", "joint limits", "singularity")
+
+
+def _unlimited(model):
+    """Copy of a model without joint limits, so that the IK reports every geometric solution."""
+    unlimited = copy.copy(model)
+    unlimited.joint_limits = np.tile([-np.inf, np.inf], (6, 1))
+    return unlimited
+
+
+def _branch_indices(solutions, valid, joints):
+    """Index of the IK solution matching each configuration (angles compared modulo 360 degrees)."""
+    difference = np.angle(np.exp(1j * (np.nan_to_num(solutions) - np.asarray(joints)[:, None, :])))
+    distance = np.where(valid, np.abs(difference).max(axis=2), np.inf)
+    return np.argmin(distance, axis=1)
+
+
+class LinearMoveCheck:
+    """Outcome of the linear segments of a program (arrays over the segments)."""
+
+    def __init__(self, issues, end_joints, conditioning, paths=None):
+        self.issues = issues  # (N,) one of LINEAR_OK, NO_SOLUTION, CONFIGURATION_FLIP, JOINT_LIMITS, SINGULARITY
+        self.end_joints = end_joints  # (N, 6) radians at the end of the linear path, NaN if it breaks off
+        self.conditioning = conditioning  # (N,) smallest inverse condition number along the path
+        self.paths = paths  # (N, steps, 6) radians at the path samples, NaN if it breaks off
+
+    @property
+    def feasible(self):
+        return self.issues == LINEAR_OK
+
+    def describe(self, index):
+        return ISSUE_NAMES[self.issues[index]]
+
+    def summary(self):
+        counts = np.bincount(self.issues, minlength=len(ISSUE_NAMES))
+        return ", ".join(f"{count} {name}" for name, count in zip(ISSUE_NAMES, counts) if count)
+
+
+def check_linear_moves(start_joints, poses, model, end_joints=None, steps=10, max_joint_step=math.radians(30),
+                       singular_threshold=0.005, rotation_scale=1000.0, tool=None):
+    """
+    Check straight-line moves to a list of flange poses, all segments in one batch: the TCP path is sampled
+    (position lerp, orientation slerp), the flange pose of every sample is solved, and the IK branch of the
+    start configuration is followed to the end.
+
+    :param start_joints: Joints in radians at the start of each segment, shape (N, 6).
+    :param poses: Flange poses at the end of each segment in the robot base frame, shape (N, 4, 4).
+    :param model: The DHModel of the robot.
+    :param end_joints: Optional joints the program expects at the targets, shape (N, 6); a path that ends in
+                       another configuration counts as a configuration flip.
+    :param steps: Samples checked along every segment.
+    :param max_joint_step: Largest joint change in radians between samples before the path counts as a flip.
+    :param singular_threshold: Inverse condition number below which a sample counts as a singular pass.
+    :param rotation_scale: Length in millimeters that weights the angular Jacobian rows against the linear rows.
+    :param tool: Optional 4x4 TCP pose relative to the flange; the straight line is followed by the TCP.
+    :return: A LinearMoveCheck.
+    """
+    start_joints = np.asarray(start_joints, dtype=float).reshape(-1, 6)
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    count = len(poses)
+    unlimited = _unlimited(model)
+
+    # IK branch of every start configuration, then that branch at all samples of all segments
+    start_poses = forward_kinematics(start_joints, model)[:, -1]
+    solutions, valid = inverse_kinematics(start_poses, unlimited)
+    branch = _branch_indices(solutions, valid, start_joints)
+    if tool is None:
+        samples = interpolate_poses(start_poses, poses, steps)
+    else:
+        tool = np.asarray(tool, dtype=float)
+        samples = interpolate_poses(start_poses @ tool, poses @ tool, steps) @ invert_poses(tool)
+    solutions, valid = inverse_kinematics(samples.reshape(-1, 4, 4), unlimited)
+    solutions = solutions.reshape(count, steps, -1, 6)
+    valid = valid.reshape(count, steps, -1)
+    rows = np.arange(count)
+    path = solutions[rows, :, branch]  # (N, steps, 6)
+    on_branch = valid[rows, :, branch]
+
+    # Continuous joint path: the wrapped step between samples, accumulated from the start
+    steps_taken = np.angle(np.exp(1j * np.diff(np.concatenate([start_joints[:, None], np.nan_to_num(path)], axis=1),
+                                               axis=1)))
+    continuous = start_joints[:, None] + np.cumsum(steps_taken, axis=1)
+    broken = ~on_branch.all(axis=1)
+    jumps = np.where(on_branch, np.abs(steps_taken).max(axis=2), 0.0).max(axis=1) > max_joint_step
+    ends = continuous[:, -1]
+    other_end = np.zeros(count, dtype=bool)
+    if end_joints is not None:
+        other_end = np.abs(ends - np.asarray(end_joints, dtype=float).reshape(-1, 6)).max(axis=1) > 1e-6
+
+    lower, upper = model.joint_limits[:, 0], model.joint_limits[:, 1]
+    outside = ((continuous < lower - 1e-9) | (continuous > upper + 1e-9)).any(axis=(1, 2))
+    conditioning = inverse_condition_number(continuous.reshape(-1, 6), model, rotation_scale).reshape(count, steps)
+    conditioning = np.where(on_branch, conditioning, np.inf).min(axis=1)
+    no_solution = ~valid.any(axis=2).all(axis=1)
+
+    issues = np.select([no_solution, broken | jumps, outside, conditioning < singular_threshold, other_end],
+                       [NO_SOLUTION, CONFIGURATION_FLIP, JOINT_LIMITS, SINGULARITY, CONFIGURATION_FLIP], LINEAR_OK)
+    ends = np.where((no_solution | broken)[:, None], np.nan, ends)
+    continuous = np.where((no_solution | broken)[:, None, None], np.nan, continuous)
+    return LinearMoveCheck(issues, ends, conditioning, continuous)
+
+
+def plan_moves(poses, model, start_joints, near_singular=None, linear_steps=10, max_joint_step=math.radians(30),
+               singular_threshold=0.005, tool=None):
+    """
+    Decide MoveL or MoveJ for an ordered list of flange poses: a linear move from the previous reachable target
+    when the straight path stays on one IK branch, within the limits and away from singularities, otherwise a
+    joint move if the target has an IK solution.
+
+    :param poses: Flange poses in the robot base frame, shape (N, 4, 4).
+    :param model: The DHModel of the robot.
+    :param start_joints: Joints in radians the robot starts from (e.g. home), shape (6,).
+    :param near_singular: Optional boolean mask of shape (N,); these targets always use MoveJ.
+    :param linear_steps: Samples checked along every linear segment.
+    :param max_joint_step: Largest joint change in radians between samples of a linear move.
+    :param singular_threshold: Inverse condition number below which a linear path counts as passing a singularity.
+    :param tool: Optional 4x4 TCP pose relative to the flange; linear moves keep the TCP on a straight line.
+    :return: A MovePlan.
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    count = len(poses)
+    near_singular = np.zeros(count, dtype=bool) if near_singular is None else np.asarray(near_singular, dtype=bool)
+
+    # Configuration at every target, then all segments between consecutive reachable targets at once
+    joints, reachable = chain_joints(poses, model, start_joints)
+    reached = np.flatnonzero(reachable)
+    move_types = [None] * count
+    issues = np.full(count, NO_SOLUTION)
+    paths = np.full((count, linear_steps, 6), np.nan)
+    if not reached.size:
+        return MovePlan(move_types, joints, issues, paths)
+    starts = np.vstack([np.asarray(start_joints, dtype=float)[None], joints[reached[:-1]]])
+    check = check_linear_moves(starts, poses[reached], model, joints[reached], linear_steps, max_joint_step,
+                               singular_threshold, tool=tool)
+
+    issues[reached] = np.where(near_singular[reached], SINGULARITY, check.issues)
+    paths[reached] = check.paths
+    for i in reached:
+        move_types[i] = "MoveL" if issues[i] == LINEAR_OK else "MoveJ"
+    return MovePlan(move_types, joints, issues, paths)
+
+
+def chain_joints(poses, model, start_joints):
+    """
+    Joint solutions of an ordered list of flange poses, each one closest to the solution before it.
+
+    Same solver path as robot_kinematics.solve_target_sequence: closed-form IK, and damped least squares
+    warm-started from the previous solution where the closed form has none (e.g. outside a model's
+    closed-form family), so a target reachable there is reachable here as well.
+
+    :param poses: Flange poses in the robot base frame, shape (N, 4, 4).
+    :param model: The DHModel of the robot.
+    :param start_joints: Joints in radians before the first pose, shape (6,).
+    :return: Tuple (joints of shape (N, 6) with NaN rows where unreachable, reachable mask of shape (N,)).
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    solutions, valid = inverse_kinematics(poses, model)
+    joints = np.full((len(solutions), 6), np.nan)
+    reachable = valid.any(axis=1)
+    current = np.asarray(start_joints, dtype=float)
+    for i in range(len(solutions)):
+        if reachable[i]:
+            candidates = unwrap_joints(solutions[i][valid[i]], current, model)
+            current = joints[i] = candidates[np.argmin(np.abs(candidates - current).max(axis=1))]
+        else:
+            refined, converged = damped_least_squares_ik(poses[i], current[None], model)
+            if converged[0]:
+                current = joints[i] = refined[0]
+                reachable[i] = True
+    return joints, reachable
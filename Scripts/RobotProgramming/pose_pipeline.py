@@ -0,0 +1,211 @@
+import time
+import tracemalloc
+import argparse
+import numpy as np
+import robodk as rdk  # Mat, only at the API boundary
+from robot_kinematics import invert_poses, quaternions, quaternion_matrices
+
+# Batched pose preparation for the Grasshopper components. Rhino planes are read once into an (N, 4, 4) array,
+# base and tool transforms are applied with one matrix product, and RoboDK Mats are only created where a
+# pose is handed to the RoboDK API. PoseArray carries such a batch from one stage to the next.
+#
+# Benchmark against lists of Mats:  python pose_pipeline.py --count 20000
+
+
+def planes_to_poses(planes):
+    """
+    Homogeneous poses of Rhino planes (columns: X axis, Y axis, Z axis, origin).
+
+    :param planes: Sequence of Rhino.Geometry.Plane (or anything with Origin, XAxis, YAxis, ZAxis).
+    :return: Array of shape (N, 4, 4).
+    """
+    def values(plane):
+        # One property read per vector instead of one per coordinate
+        origin, x, y, z = plane.Origin, plane.XAxis, plane.YAxis, plane.ZAxis
+        return (x.X, y.X, z.X, origin.X, x.Y, y.Y, z.Y, origin.Y, x.Z, y.Z, z.Z, origin.Z)
+
+    planes = list(planes)
+    rows = np.fromiter((value for plane in planes for value in values(plane)), dtype=float, count=12 * len(planes))
+    poses = np.zeros((len(planes), 4, 4))
+    poses[:, :3, :] = rows.reshape(-1, 3, 4)
+    poses[:, 3, 3] = 1.0
+    return poses
+
+
+def as_array(pose):
+    """4x4 numpy array of a RoboDK Mat (arrays pass through)."""
+    return np.array(pose.rows if isinstance(pose, rdk.Mat) else pose, dtype=float)
+
+
+def to_mat(pose):
+    """RoboDK Mat of one 4x4 pose."""
+    return rdk.Mat(np.asarray(pose, dtype=float).tolist())
+
+
+def transform_poses(poses, base=None, tool=None):
+    """
+    Express station poses in a base frame and, optionally, move them from the TCP to the flange:
+    inv(base) @ poses @ inv(tool) as a single batched product.
+
+    :param poses: Poses in the station frame, shape (N, 4, 4).
+    :param base: Optional pose of the base frame (Mat or 4x4 array).
+    :param tool: Optional TCP pose relative to the flange (Mat or 4x4 array).
+    :return: Array of shape (N, 4, 4).
+    """
+    result = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    if base is not None:
+        result = invert_poses(as_array(base)) @ result
+    if tool is not None:
+        result = result @ invert_poses(as_array(tool))
+    return PoseArray(result) if isinstance(poses, PoseArray) else result
+
+
+class PoseArray:
+    """
+    Batch of poses in one contiguous (N, 4, 4) float64 buffer (millimeters).
+
+    Slicing returns views, numpy functions see the buffer directly (np.asarray makes no copy), so the
+    kinematics functions accept a PoseArray wherever they take an (N, 4, 4) array. The compact
+    position + quaternion form (N, 7) is available for storage and transfer.
+    """
+
+    __slots__ = ("matrices",)
+    __array_ufunc__ = None  # let ndarray @ PoseArray reach __rmatmul__
+
+    def __init__(self, matrices):
+        matrices = np.asarray(matrices, dtype=float)
+        self.matrices = matrices.reshape(-1, 4, 4) if matrices.ndim != 3 else matrices
+
+    @classmethod
+    def from_planes(cls, planes):
+        """Poses of Rhino planes, see planes_to_poses."""
+        return cls(planes_to_poses(planes))
+
+    @classmethod
+    def from_mats(cls, mats):
+        """Poses of a list of RoboDK Mats."""
+        return cls(np.array([mat.rows for mat in mats], dtype=float).reshape(-1, 4, 4))
+
+    @classmethod
+    def from_xyzq(cls, values):
+        """
+        Poses of positions and quaternions.
+
+        :param values: Array of shape (N, 7): x, y, z, qw, qx, qy, qz.
+        """
+        values = np.asarray(values, dtype=float).reshape(-1, 7)
+        matrices = np.zeros((len(values), 4, 4))
+        matrices[:, :3, :3] = quaternion_matrices(values[:, 3:])
+        matrices[:, :3, 3] = values[:, :3]
+        matrices[:, 3, 3] = 1.0
+        return cls(matrices)
+
+    def __len__(self):
+        return len(self.matrices)
+
+    def __getitem__(self, index):
+        """
+        An integer gives one 4x4 array; slices, masks and index arrays give a PoseArray.
+
+        Integers and slices are views of the buffer, masks and index arrays copy the selected poses (NumPy
+        advanced indexing), so writing into such a selection leaves this array unchanged.
+        """
+        selected = self.matrices[index]
+        return selected if selected.ndim == 2 else PoseArray(selected)
+
+    def __iter__(self):
+        return iter(self.matrices)
+
+    def __array__(self, dtype=None, copy=None):
+        """The buffer itself; copy=True always copies, copy=False raises if a dtype change needs a copy."""
+        if dtype is None or np.dtype(dtype) == self.matrices.dtype:
+            return self.matrices.copy() if copy else self.matrices
+        if copy is False:
+            raise ValueError(f"converting a PoseArray to {np.dtype(dtype)} needs a copy")
+        return self.matrices.astype(dtype)
+
+    def __repr__(self):
+        return f"PoseArray({len(self)} poses)"
+
+    def __matmul__(self, other):
+        return PoseArray(self.matrices @ as_array(other.matrices if isinstance(other, PoseArray) else other))
+
+    def __rmatmul__(self, other):
+        return PoseArray(as_array(other) @ self.matrices)
+
+    @property
+    def positions(self):
+        """View of the positions, shape (N, 3)."""
+        return self.matrices[:, :3, 3]
+
+    @property
+    def rotations(self):
+        """View of the rotation matrices, shape (N, 3, 3)."""
+        return self.matrices[:, :3, :3]
+
+    @property
+    def nbytes(self):
+        return self.matrices.nbytes
+
+    def compose(self, other):
+        """Pose-wise product self @ other (other: PoseArray of the same length, or one pose for all)."""
+        return self @ other
+
+    def inverse(self):
+        """Inverse of every pose."""
+        return PoseArray(invert_poses(self.matrices))
+
+    def transformed(self, base=None, tool=None):
+        """inv(base) @ poses @ inv(tool), see transform_poses."""
+        return transform_poses(self, base, tool)
+
+    def xyzq(self):
+        """Compact form, shape (N, 7): x, y, z, qw, qx, qy, qz."""
+        return np.concatenate([self.positions, quaternions(self.rotations)], axis=1)
+
+    def mat(self, index):
+        """RoboDK Mat of one pose."""
+        return to_mat(self.matrices[index])
+
+    def to_mats(self):
+        """List of RoboDK Mats, for outputs that must stay in the RoboDK format."""
+        return [to_mat(pose) for pose in self.matrices]
+
+
+def _measure(function):
+    """Run time (untraced) and memory held by the result of a benchmark step."""
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = function()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return elapsed, held
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare PoseArray with lists of RoboDK Mats.")
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    source = PoseArray.from_xyzq(np.concatenate([rng.uniform(-1000, 1000, (args.count, 3)),
+                                                 rng.normal(size=(args.count, 4))], axis=1))
+    rows = source.matrices.tolist()
+    base = rdk.transl(500, 200, 0) * rdk.rotz(0.3)
+    tool = rdk.transl(0, 0, 150)
+
+    steps = [
+        ("build", lambda: [rdk.Mat([row[:] for row in r]) for r in rows], lambda: PoseArray(rows)),
+        ("base/tool transform", lambda: [base.inv() * rdk.Mat(r) * tool.inv() for r in rows],
+         lambda: PoseArray(rows).transformed(base, tool)),
+        ("positions", lambda: [rdk.Mat(r).Pos() for r in rows], lambda: PoseArray(rows).positions.copy()),
+    ]
+    print(f"{args.count} poses      {'list of Mat':>22}  {'PoseArray':>22}")
+    for name, with_list, with_array in steps:
+        list_time, list_memory = _measure(with_list)
+        array_time, array_memory = _measure(with_array)
+        print(f"{name:<20} {list_time:9.4f} s {list_memory / 1e6:8.2f} MB  {array_time:9.4f} s {array_memory / 1e6:8.2f} MB")
+    print(f"storage: {source.nbytes / 1e6:.2f} MB as matrices, {source.xyzq().nbytes / 1e6:.2f} MB as xyz + quaternion")
@@ -0,0 +1,220 @@
+import json
+import hashlib
+from contextlib import contextmanager
+import numpy as np
+import robolink as rl  # Item type constants
+from ur_script import write_ur_script
+from pose_pipeline import to_mat
+from robodk_async import run_pooled, bind_items
+
+# Bulk creation of RoboDK programs. RoboDK stops rendering while the targets and instructions are added.
+# For UR robots the whole program can instead be written as a URScript file and loaded with a single
+# AddFile call. sync_program updates an existing program in place: a manifest of target names, pose hashes and
+# move types is stored on the program item, so a rerun only touches the targets whose pose changed.
+
+SYNC_PARAM = "PlaneSync"  # name of the custom item data holding the manifest
+
+
+@contextmanager
+def render_suspended(link):
+    """Turn off RoboDK rendering inside the block and render once at the end."""
+    link.Render(False)
+    try:
+        yield
+    finally:
+        link.Render(True)
+
+
+def build_program(link, robot, frame, tool, program_name, poses, move_types, target_names, script_path=None,
+                  link_factory=None, connections=1):
+    """
+    Create a RoboDK program moving through a list of targets.
+
+    :param link: The Robolink.
+    :param robot: The robot item.
+    :param frame: Reference frame of the targets (the robot base).
+    :param tool: The tool item.
+    :param program_name: Name of the new program.
+    :param poses: TCP poses relative to the frame, shape (N, 4, 4).
+    :param move_types: "MoveJ" or "MoveL" per pose.
+    :param target_names: Name of the target item per pose.
+    :param script_path: Optional .script file: write the program as URScript and load it with one AddFile call
+                        instead of adding every target (UR robots only).
+    :param link_factory: Optional callable returning new connections (e.g. RoboDKSession.link_factory).
+    :param connections: With link_factory, the targets are created over this many connections at once
+                        (robodk_async); the instructions are always added in order on link.
+    :return: The program item.
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    with render_suspended(link):
+        if script_path:
+            write_ur_script(script_path, poses, move_types, np.array(tool.PoseTool().rows), program_name)
+            program = link.AddFile(script_path, robot)
+            program.setName(program_name)  # AddFile names it after the file
+            return program
+
+        targets = None
+        if link_factory is not None and connections > 1 and len(poses):
+            mats = [to_mat(pose) for pose in poses]
+            targets = bind_items(run_pooled(link_factory, connections,
+                                            lambda client: client.add_targets(target_names, frame, robot, mats)), link)
+
+        program = link.AddProgram(program_name, robot)
+        program.setFrame(frame)
+        program.setTool(tool)
+        for i, (pose, move_type, target_name) in enumerate(zip(poses, move_types, target_names)):
+            if targets is not None:
+                target = targets[i]
+            else:
+                target = link.AddTarget(target_name, frame, robot)
+                target.setAsCartesianTarget()
+                target.setPose(to_mat(pose))
+            if move_type == "MoveL":
+                program.MoveL(target)
+            else:
+                program.MoveJ(target)
+        return program
+
+
+def pose_hashes(poses, decimals=3):
+    """
+    Short hash of every pose, rounded so that numerical noise does not count as a change.
+
+    :param poses: Poses, shape (N, 4, 4).
+    :param decimals: Decimals kept (millimeters for positions).
+    :return: List of N hex strings.
+    """
+    rounded = np.round(np.asarray(poses, dtype=float).reshape(-1, 16), decimals) + 0.0  # + 0.0 turns -0.0 into 0.0
+    return [hashlib.blake2b(row.tobytes(), digest_size=8).hexdigest() for row in rounded]
+
+
+class SyncResult:
+    """What sync_program changed."""
+
+    def __init__(self, program, added=0, updated=0, deleted=0, unchanged=0, instructions="kept"):
+        self.program = program
+        self.added = added
+        self.updated = updated
+        self.deleted = deleted
+        self.unchanged = unchanged
+        self.instructions = instructions  # "kept", "trimmed", "appended", "rebuilt" or "created"
+
+    def summary(self):
+        return (f"{self.added} added, {self.updated} updated, {self.deleted} deleted, {self.unchanged} unchanged "
+                f"targets; instructions {self.instructions}")
+
+
+def _add_moves(program, targets, move_types):
+    for target, move_type in zip(targets, move_types):
+        if move_type == "MoveL":
+            program.MoveL(target)
+        else:
+            program.MoveJ(target)
+
+
+def sync_program(link, robot, frame, tool, program_name, poses, move_types, target_names, lookup=None, forget=None):
+    """
+    Create a program like build_program, or bring an existing one up to date with as few API calls as possible:
+    targets are added, moved or deleted only where their pose hash changed, and the instructions are only
+    touched when the target sequence or a move type changed (trimmed when targets were only removed, appended
+    when the old sequence is a prefix, rebuilt otherwise).
+
+    Targets are matched by name, so the saving depends on names that follow the plane. With names built from
+    the plane index (Plane_1, Plane_2, ...), inserting or removing a plane shifts every later name onto another
+    pose, and all those targets count as changed.
+
+    :param link: The Robolink.
+    :param robot: The robot item.
+    :param frame: Reference frame of the targets (the robot base).
+    :param tool: The tool item.
+    :param program_name: Name of the program.
+    :param poses: TCP poses relative to the frame, shape (N, 4, 4).
+    :param move_types: "MoveJ" or "MoveL" per pose.
+    :param target_names: Name of the target item per pose (unique).
+    :param lookup: Optional function (name, item_type) -> item, e.g. RoboDKSession.item; defaults to link.Item.
+    :param forget: Optional function name -> None called for every deleted item, e.g. RoboDKSession.invalidate
+                   so that lookup does not serve its stale handle.
+    :return: A SyncResult.
+    """
+    lookup = lookup if lookup is not None else link.Item
+    forget = forget if forget is not None else (lambda name: None)
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    hashes = pose_hashes(poses)
+    move_types = list(move_types)
+    target_names = list(target_names)
+
+    program = lookup(program_name, rl.ITEM_TYPE_PROGRAM)
+    manifest = json.loads(program.getParam(SYNC_PARAM) or b"{}") if program.Valid() else {}
+    with render_suspended(link):
+        if not manifest:
+            # No program yet, or one created without a manifest: start over, without leaving targets of the
+            # same names behind for later lookups to find
+            result = SyncResult(None, added=len(poses), instructions="created")
+            if program.Valid():
+                program.Delete()
+                forget(program_name)
+            for name in target_names:
+                target = lookup(name, rl.ITEM_TYPE_TARGET)
+                while target.Valid(True):
+                    target.Delete()
+                    forget(name)
+                    result.deleted += 1
+                    target = lookup(name, rl.ITEM_TYPE_TARGET)
+            result.program = build_program(link, robot, frame, tool, program_name, poses, move_types, target_names)
+        else:
+            old_hashes = dict(zip(manifest["names"], manifest["hashes"]))
+            old_sequence = list(zip(manifest["names"], manifest["moves"]))
+            new_sequence = list(zip(target_names, move_types))
+            dropped = set(old_hashes) - set(target_names)
+            result = SyncResult(program)
+
+            # Instructions of dropped targets go first; if that is all that changed, the sequence is done
+            if dropped and [entry for entry in old_sequence if entry[0] not in dropped] == new_sequence:
+                for index in reversed(range(len(old_sequence))):
+                    if old_sequence[index][0] in dropped:
+                        program.InstructionDelete(index)
+                old_sequence = new_sequence
+                result.instructions = "trimmed"
+
+            # Targets: delete the dropped ones, move the changed ones, add the new ones
+            for name in dropped:
+                target = lookup(name, rl.ITEM_TYPE_TARGET)
+                if target.Valid():
+                    target.Delete()
+                    forget(name)
+                result.deleted += 1
+            targets = {}
+            for name, pose, pose_hash in zip(target_names, poses, hashes):
+                if old_hashes.get(name) == pose_hash:
+                    result.unchanged += 1
+                    continue
+                target = lookup(name, rl.ITEM_TYPE_TARGET) if name in old_hashes else None
+                if target is None or not target.Valid():
+                    target = link.AddTarget(name, frame, robot)
+                    target.setAsCartesianTarget()
+                    result.added += 1
+                else:
+                    result.updated += 1
+                target.setPose(to_mat(pose))
+                targets[name] = target
+
+            # Otherwise instructions are appended when the old sequence is a prefix, or rebuilt
+            if new_sequence != old_sequence:
+                target_of = lambda name: targets[name] if name in targets else lookup(name, rl.ITEM_TYPE_TARGET)
+                if not dropped and new_sequence[:len(old_sequence)] == old_sequence:
+                    tail = new_sequence[len(old_sequence):]
+                    result.instructions = "appended"
+                else:
+                    program.Delete()
+                    forget(program_name)
+                    program = link.AddProgram(program_name, robot)
+                    program.setFrame(frame)
+                    program.setTool(tool)
+                    result.program = program
+                    tail = new_sequence
+                    result.instructions = "rebuilt"
+                _add_moves(program, [target_of(name) for name, _ in tail], [move for _, move in tail])
+
+        manifest = {"names": target_names, "hashes": hashes, "moves": move_types}
+        result.program.setParam(SYNC_PARAM, json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+    return result
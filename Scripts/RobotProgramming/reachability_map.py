@@ -0,0 +1,224 @@
+import json
+import math
+import argparse
+import numpy as np
+from robot_kinematics import forward_kinematics, solve_target_sequence
+from robot_models import get_model
+
+# Precomputed reachability map: the robot workspace (robot base frame) is split into voxels and every voxel
+# into bins of the tool approach direction (flange Z axis). Each cell stores one class code, so a target is
+# classified with an array lookup. The map is stored as a .npy file (opened memory-mapped) with a .json
+# sidecar describing the grid.
+#
+# Offline build:  python reachability_map.py "UR5" ur5_reach.npy --voxel-size 50 --samples 5000000
+
+UNREACHABLE = 0  # outside the dilated region of reached cells
+BORDERLINE = 1   # few samples or near the edge of the reached region
+REACHABLE = 2    # well inside the sampled region
+#
+# The classes come from random sampling. UNREACHABLE is safe to trust: on a 50 mm UR5 map no random pose in
+# such a cell has an IK solution. REACHABLE is an estimate, since a cell mixes poses the arm can and cannot
+# reach (about 3% of the poses in REACHABLE cells of that map have no solution), so callers that program the
+# targets check those again. BORDERLINE targets get the exact IK in classify_targets.
+
+
+def _shifted(mask, axis, shift):
+    """
+    Neighbour of every cell of a (nx, ny, nz, polar_bins, azimuth_bins) mask along one axis.
+
+    The azimuth wraps around, the spatial and polar axes do not (cells past the edge count as not set).
+    """
+    neighbour = np.roll(mask, shift, axis=axis)
+    if axis < 4:
+        edge = [slice(None)] * 5
+        edge[axis] = 0 if shift == 1 else -1
+        neighbour[tuple(edge)] = False
+    return neighbour
+
+
+def _direction_bins(directions, polar_bins, azimuth_bins):
+    """Equal-area bin index of unit direction vectors (uniform in cos(polar) and in azimuth)."""
+    cos_polar = np.clip(directions[..., 2], -1.0, 1.0)
+    polar_index = np.minimum(((cos_polar + 1.0) / 2.0 * polar_bins).astype(np.int64), polar_bins - 1)
+    azimuth = np.arctan2(directions[..., 1], directions[..., 0])
+    azimuth_index = np.minimum(((azimuth + math.pi) / (2 * math.pi) * azimuth_bins).astype(np.int64), azimuth_bins - 1)
+    return polar_index * azimuth_bins + azimuth_index
+
+
+class ReachabilityMap:
+    """Voxel x orientation-bin reachability classes of one robot model."""
+
+    def __init__(self, classes, origin, voxel_size, polar_bins, azimuth_bins, model_name):
+        self.classes = classes  # (nx, ny, nz, polar_bins * azimuth_bins) uint8, usually a read-only memmap
+        self.origin = np.asarray(origin, dtype=float)
+        self.voxel_size = float(voxel_size)
+        self.polar_bins = int(polar_bins)
+        self.azimuth_bins = int(azimuth_bins)
+        self.model_name = model_name
+
+    @classmethod
+    def load(cls, path):
+        """
+        Open a map saved by build_reachability_map without reading it into memory.
+
+        :param path: Path of the .npy file.
+        :return: A ReachabilityMap backed by a read-only memmap.
+        """
+        with open(path + ".json", "r") as file:
+            header = json.load(file)
+        classes = np.load(path, mmap_mode="r")
+        return cls(classes, header["origin"], header["voxel_size"], header["polar_bins"],
+                   header["azimuth_bins"], header["model"])
+
+    def cell_indices(self, poses):
+        """
+        Voxel and orientation-bin indices of a batch of flange poses.
+
+        :param poses: Flange poses in the robot base frame, shape (N, 4, 4).
+        :return: Tuple (voxel indices of shape (N, 3), orientation bin of shape (N,), inside-grid mask of shape (N,)).
+        """
+        poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+        voxels = np.floor((poses[:, :3, 3] - self.origin) / self.voxel_size).astype(np.int64)
+        inside = np.all((voxels >= 0) & (voxels < np.array(self.classes.shape[:3])), axis=1)
+        bins = _direction_bins(poses[:, :3, 2], self.polar_bins, self.azimuth_bins)
+        return voxels, bins, inside
+
+    def classify(self, poses):
+        """
+        Look up the class of every pose (UNREACHABLE, BORDERLINE or REACHABLE).
+
+        :param poses: Flange poses in the robot base frame, shape (N, 4, 4).
+        :return: uint8 array of shape (N,).
+        """
+        voxels, bins, inside = self.cell_indices(poses)
+        result = np.full(len(bins), UNREACHABLE, dtype=np.uint8)
+        v = voxels[inside]
+        result[inside] = self.classes[v[:, 0], v[:, 1], v[:, 2], bins[inside]]
+        return result
+
+
+def build_reachability_map(model, path, voxel_size=50.0, num_samples=2000000, batch_size=200000,
+                           polar_bins=8, azimuth_bins=16, min_hits=3, dilation=2, seed=0):
+    """
+    Sample the workspace with batched FK and save the reachability map of a robot model.
+
+    :param model: The DHModel of the robot.
+    :param path: Output path of the .npy file (the grid description is written to path + ".json").
+    :param voxel_size: Voxel edge length in millimeters. The grid covers the full reach of the arm, so large
+                       robots need coarser voxels (e.g. 100 mm for the COMAU NJ 60-2.2).
+    :param num_samples: Number of random joint configurations to evaluate.
+    :param batch_size: Configurations per FK batch (bounds the memory use).
+    :param polar_bins: Number of orientation bins along the polar angle of the approach direction.
+    :param azimuth_bins: Number of orientation bins along the azimuth of the approach direction.
+    :param min_hits: Samples a cell needs to count as REACHABLE instead of BORDERLINE.
+    :param dilation: Number of cells the reached region is grown by (in space and orientation) before the
+                     remaining cells are marked UNREACHABLE.
+    :param seed: Random seed of the joint sampling.
+    :return: The saved ReachabilityMap (opened from disk).
+    """
+    # Workspace box from the maximum reach of the arm
+    reach = model.reach
+    origin = np.array([-reach, -reach, -reach])
+    shape = tuple(int(math.ceil(2 * reach / voxel_size)) for _ in range(3))
+    num_bins = polar_bins * azimuth_bins
+
+    # Count the samples per cell (uint16 accumulator, saturated below)
+    hits = np.zeros(shape + (num_bins,), dtype=np.uint16)
+    flat_hits = hits.reshape(-1)
+    lower = np.maximum(model.joint_limits[:, 0], -math.pi)
+    upper = np.minimum(model.joint_limits[:, 1], math.pi)
+    rng = np.random.default_rng(seed)
+
+    for start in range(0, num_samples, batch_size):
+        count = min(batch_size, num_samples - start)
+        joints = rng.uniform(lower, upper, size=(count, 6))
+        flanges = forward_kinematics(joints, model)[:, -1]
+        voxels = np.floor((flanges[:, :3, 3] - origin) / voxel_size).astype(np.int64)
+        voxels = np.clip(voxels, 0, np.array(shape) - 1)
+        bins = _direction_bins(flanges[:, :3, 2], polar_bins, azimuth_bins)
+        flat = np.ravel_multi_index((voxels[:, 0], voxels[:, 1], voxels[:, 2], bins), hits.shape)
+        cells, cell_hits = np.unique(flat, return_counts=True)
+        flat_hits[cells] = np.minimum(flat_hits[cells] + cell_hits, 65535)
+
+    # Only cells whose face neighbours (in space and in azimuth) were all reached count as interior
+    reached = hits.reshape(shape + (polar_bins, azimuth_bins)) > 0
+    interior = reached.copy()
+    for axis in (0, 1, 2, 4):
+        for shift in (1, -1):
+            interior &= _shifted(reached, axis, shift)
+
+    # Sampling leaves holes and thin gaps next to reached cells, and a cell is only partly reachable, so
+    # only cells outside the reached region grown by a few cells in every direction are unreachable
+    hull = reached.copy()
+    for _ in range(dilation):
+        grown = hull.copy()
+        for axis in range(5):
+            for shift in (1, -1):
+                grown |= _shifted(hull, axis, shift)
+        hull = grown
+
+    classes = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=hits.shape)
+    classes[:] = np.where((interior & (hits.reshape(reached.shape) >= min_hits)).reshape(hits.shape), REACHABLE,
+                          np.where(hull.reshape(hits.shape), BORDERLINE, UNREACHABLE))
+    classes.flush()
+    del classes
+
+    header = {
+        "model": model.name,
+        "origin": origin.tolist(),
+        "voxel_size": voxel_size,
+        "polar_bins": polar_bins,
+        "azimuth_bins": azimuth_bins,
+        "num_samples": num_samples,
+        "min_hits": min_hits,
+        "dilation": dilation,
+    }
+    with open(path + ".json", "w") as file:
+        json.dump(header, file, indent=2)
+    return ReachabilityMap.load(path)
+
+
+def classify_targets(reachability_map, poses, model, reference=None, cache=None):
+    """
+    Classify targets with the map and run the exact local IK (closed form, then damped least squares) only on
+    the borderline ones. UNREACHABLE and REACHABLE targets are decided by the array lookup alone; see the
+    module comment for how far REACHABLE can be trusted.
+
+    :param reachability_map: A ReachabilityMap of the robot model.
+    :param poses: Flange poses in the robot base frame, shape (N, 4, 4).
+    :param model: The DHModel used for the exact check.
+    :param reference: Optional reference joints in radians for the exact check.
+    :param cache: Optional KinematicsCache used for the closed-form solutions.
+    :return: Tuple (joints of shape (N, 6), NaN where not solved; reachable mask of shape (N,);
+             map classes of shape (N,)).
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    classes = reachability_map.classify(poses)
+    joints = np.full((len(poses), 6), np.nan)
+    reachable = classes == REACHABLE
+
+    borderline = np.flatnonzero(classes == BORDERLINE)
+    if borderline.size:
+        joints[borderline], reachable[borderline], _ = solve_target_sequence(poses[borderline], model, reference,
+                                                                             cache=cache)
+    return joints, reachable, classes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the reachability map of a robot model.")
+    parser.add_argument("robot", help="Robot name, e.g. \"UR5\" or \"COMAU NJ 60-2.2\"")
+    parser.add_argument("path", help="Output .npy file")
+    parser.add_argument("--voxel-size", type=float, default=50.0)
+    parser.add_argument("--samples", type=int, default=2000000)
+    parser.add_argument("--polar-bins", type=int, default=8)
+    parser.add_argument("--azimuth-bins", type=int, default=16)
+    args = parser.parse_args()
+
+    robot_model = get_model(args.robot)
+    if robot_model is None:
+        raise NameError(f"No kinematic model for robot '{args.robot}'.")
+    built = build_reachability_map(robot_model, args.path, args.voxel_size, args.samples,
+                                   polar_bins=args.polar_bins, azimuth_bins=args.azimuth_bins)
+    counts = np.bincount(np.asarray(built.classes).reshape(-1), minlength=3)
+    print(f"Saved {args.path}: {counts[REACHABLE]} reachable, {counts[BORDERLINE]} borderline, "
+          f"{counts[UNREACHABLE]} unreachable cells.")
@@ -0,0 +1,246 @@
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import robolink as rl  # Item class and type constants of the real API
+import robodk as rdk   # Mat
+from robodk_recorder import RecordingLink, ReplayLink  # Recorded and replayed sessions
+
+# Asyncio layer over the RoboDK API. A Robolink answers one request at a time, so the client keeps a pool of
+# connections and runs every call on an idle one in a worker thread; independent requests (IK queries, pose
+# reads, target creation) then overlap their network latency instead of queuing behind each other. Items
+# are rebound to the connection that runs the call. Order-dependent work, such as the instructions of one
+# program, goes into a single run() so it stays on one connection. Several stations are driven concurrently
+# by gathering the coroutines of one client per station. Blocking code (the Grasshopper components) uses
+# run_pooled, which opens a pool, runs one batch of requests and closes it again.
+#
+# The speed-up assumes RoboDK serves separate API connections in parallel. The benchmark gives every pooled
+# connection the same offline station (lambda: station), which sleeps for its latency outside its lock, so it
+# measures overlapping latency only; against a RoboDK that serializes its connections the gain shrinks.
+#
+# Benchmark against the blocking calls:  python robodk_async.py "UR5" --targets 200 --latency 0.002
+
+
+def _bind(value, link):
+    """
+    The same station item on another connection. Offline items share their station and pass through; on a
+    recorded or replayed connection the link adopts the item (ROBODK_RECORD / ROBODK_REPLAY sessions).
+    """
+    if isinstance(link, (RecordingLink, ReplayLink)):
+        return link.adopt(value)
+    if isinstance(value, rl.Item) and value.link is not link:
+        return rl.Item(link, value.item, value.type)
+    return value
+
+
+class AsyncRoboDK:
+    """Pool of RoboDK connections driven from asyncio."""
+
+    def __init__(self, link_factory=None, connections=4):
+        """
+        :param link_factory: Callable returning a new connection (defaults to robolink.Robolink).
+        :param connections: Number of connections, i.e. requests in flight at the same time.
+        """
+        self.link_factory = link_factory if link_factory is not None else rl.Robolink
+        self.connections = connections
+        self.calls = 0
+        self._links = None  # asyncio.Queue of idle connections
+        self._all_links = []
+        self._executor = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    async def open(self):
+        """Open all connections in parallel."""
+        loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self.connections)
+        self._all_links = await asyncio.gather(*[loop.run_in_executor(self._executor, self.link_factory)
+                                                 for _ in range(self.connections)])
+        self._links = asyncio.Queue()
+        for link in self._all_links:
+            self._links.put_nowait(link)
+
+    def close(self):
+        for link in self._all_links:
+            link.Disconnect()
+        self._all_links = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def run(self, function, *args):
+        """
+        Run function(link, *args) on an idle connection, items in args rebound to it.
+
+        :return: The result of function.
+        """
+        link = await self._links.get()
+        try:
+            self.calls += 1
+            bound = [_bind(arg, link) for arg in args]
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, link, *bound)
+        finally:
+            self._links.put_nowait(link)
+
+    async def item(self, name, item_type=None):
+        """Item by name."""
+        if item_type is None:
+            return await self.run(lambda link: link.Item(name))
+        return await self.run(lambda link: link.Item(name, item_type))
+
+    async def items(self, names, item_type=None):
+        """Items of several names, looked up concurrently."""
+        return await asyncio.gather(*[self.item(name, item_type) for name in names])
+
+    async def poses(self, items):
+        """Pose of every item, read concurrently."""
+        return await asyncio.gather(*[self.run(lambda link, item: item.Pose(), item) for item in items])
+
+    async def solve_ik(self, robot, poses, joints_approx=None, tool=None, reference=None):
+        """
+        Robot IK of every pose, queried concurrently.
+
+        :param robot: The robot item.
+        :param poses: Flange poses (Mats) in the robot base frame, or TCP poses with tool/reference.
+        :param joints_approx: Optional preferred joints in degrees (the current joints otherwise).
+        :return: List of joint lists in degrees, empty where unreachable.
+        """
+        def solve(link, robot, pose):
+            return robot.SolveIK(pose, joints_approx, tool, reference).list()
+        return await asyncio.gather(*[self.run(solve, robot, pose) for pose in poses])
+
+    async def add_targets(self, names, frame, robot, poses):
+        """
+        Create Cartesian targets concurrently.
+
+        :param names: Target names.
+        :param frame: Reference frame of the targets.
+        :param robot: Robot the targets belong to.
+        :param poses: Target poses (Mats) relative to the frame.
+        :return: List of target items.
+        """
+        def add(link, frame, robot, name, pose):
+            target = link.AddTarget(name, frame, robot)
+            target.setAsCartesianTarget()
+            target.setPose(pose)
+            return target
+        return await asyncio.gather(*[self.run(add, frame, robot, name, pose) for name, pose in zip(names, poses)])
+
+    async def add_program(self, name, robot, frame, tool, targets, move_types):
+        """Create a program moving through existing targets (one connection, instructions in order)."""
+        def build(link, robot, frame, tool, *targets):
+            program = link.AddProgram(name, robot)
+            program.setFrame(frame)
+            program.setTool(tool)
+            for target, move_type in zip(targets, move_types):
+                if move_type == "MoveL":
+                    program.MoveL(target)
+                else:
+                    program.MoveJ(target)
+            return program
+        return await self.run(build, robot, frame, tool, *targets)
+
+
+def run_sync(coroutine):
+    """Run a coroutine from blocking code such as a Grasshopper component."""
+    return asyncio.run(coroutine)
+
+
+def run_pooled(link_factory, connections, work):
+    """
+    Open a client, await work(client) and close the client again, from blocking code.
+
+    :param link_factory: Callable returning a new connection, e.g. RoboDKSession.link_factory.
+    :param connections: Number of connections of the pool.
+    :param work: Function client -> coroutine, e.g. lambda client: client.solve_ik(robot, poses).
+    :return: The result of the coroutine.
+    """
+    async def pooled():
+        async with AsyncRoboDK(link_factory, connections) as client:
+            return await work(client)
+    return run_sync(pooled())
+
+
+def bind_items(items, link):
+    """The same station items on another connection, e.g. items a closed pool created, on the shared link."""
+    return [_bind(item, link) for item in items]
+
+
+def _sync_workload(link, robot, frame, poses):
+    """Reference path: the same IK queries and target creation, one blocking call after the other."""
+    reachable = [len(robot.SolveIK(pose).list()) >= 6 for pose in poses]
+    for i, pose in enumerate(poses):
+        target = link.AddTarget(f"Sync_{i+1}", frame, robot)
+        target.setAsCartesianTarget()
+        target.setPose(pose)
+    return reachable
+
+
+async def _async_workload(client, robot, frame, poses, prefix="Async"):
+    joints = await client.solve_ik(robot, poses)
+    await client.add_targets([f"{prefix}_{i+1}" for i in range(len(poses))], frame, robot, poses)
+    return [len(j) >= 6 for j in joints]
+
+
+if __name__ == "__main__":
+    from robodk_offline import OfflineRobolink
+
+    parser = argparse.ArgumentParser(description="Compare blocking and pipelined RoboDK calls on the offline station.")
+    parser.add_argument("robot", help="Robot name, e.g. \"UR5\"")
+    parser.add_argument("--targets", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.002, help="Simulated round trip in seconds")
+    parser.add_argument("--connections", type=int, default=8)
+    args = parser.parse_args()
+
+    def make_station():
+        station = OfflineRobolink(latency=args.latency)
+        robot = station.add_robot(args.robot)
+        rng = np.random.default_rng(0)
+        flanges = robot.model.forward(rng.uniform(-np.pi, np.pi, (args.targets, 6)))[:, -1]
+        return station, robot, [rdk.Mat(pose.tolist()) for pose in flanges]
+
+    station, robot, poses = make_station()
+    start = time.perf_counter()
+    sync_reachable = _sync_workload(station, robot, robot.Parent(), poses)
+    sync_time = time.perf_counter() - start
+    sync_calls = station.round_trips
+
+    async def single():
+        async with AsyncRoboDK(lambda: station, args.connections) as client:
+            return await _async_workload(client, robot, robot.Parent(), poses)
+
+    station.round_trips = 0
+    start = time.perf_counter()
+    async_reachable = asyncio.run(single())
+    async_time = time.perf_counter() - start
+    assert async_reachable == sync_reachable
+
+    # Two stations at once, one client each
+    stations = [make_station() for _ in range(2)]
+
+    async def both():
+        clients = [AsyncRoboDK(lambda s=s: s, args.connections) for s, _, _ in stations]
+        for client in clients:
+            await client.open()
+        try:
+            return await asyncio.gather(*[_async_workload(client, r, r.Parent(), p)
+                                          for client, (_, r, p) in zip(clients, stations)])
+        finally:
+            for client in clients:
+                client.close()
+
+    start = time.perf_counter()
+    asyncio.run(both())
+    both_time = time.perf_counter() - start
+
+    print(f"{sync_calls} calls, {args.latency * 1000:.1f} ms latency")
+    rows = [("blocking", sync_time, sync_calls), (f"async, {args.connections} connections", async_time, sync_calls),
+            ("async, 2 stations at once", both_time, 2 * sync_calls)]
+    for label, elapsed, calls in rows:
+        print(f"{label:<28} {elapsed:7.3f} s {calls / elapsed:8.0f} calls/s")
@@ -0,0 +1,353 @@
+import os
+import math
+import time
+import argparse
+import threading
+import numpy as np
+import robolink as rl  # Item type constants and TargetReachError of the real API
+import robodk as rdk   # Mat, so poses behave exactly like the real ones
+from robot_models import get_model
+from robot_kinematics import interpolate_poses
+
+# Offline stand-in for the subset of the RoboDK API used by the robot programming scripts. Reachability of
+# MoveJ/MoveL comes from the local kinematics, and every call that would be a round trip to RoboDK sleeps for
+# a configurable latency and is counted in round_trips.
+#
+# Use it in place of a live RoboDK:
+#     station = OfflineRobolink(latency=0.002)
+#     station.add_robot("UR5")
+#     robodk_session.use_link(lambda: station)
+#
+# Benchmark:  python robodk_offline.py "UR5" --targets 200 --latency 0.002
+
+
+def _to_array(pose):
+    return np.array(pose.rows, dtype=float)
+
+
+def _to_mat(array):
+    return rdk.Mat(np.asarray(array, dtype=float).tolist())
+
+
+class OfflineItem:
+    """Station item (frame, robot, tool, target or program) with the robolink.Item methods the scripts use."""
+
+    def __init__(self, link, handle, name, item_type, parent=None, pose=None):
+        self.link = link
+        self.item = handle  # 0 is the invalid item, like in robolink
+        self.name = name
+        self.type = item_type
+        self.parent = parent
+        self.pose = np.eye(4) if pose is None else np.asarray(pose, dtype=float)
+        self.deleted = False
+        # Robots
+        self.model = None
+        self.joints = np.zeros(6)  # radians
+        self.home = np.zeros(6)
+        self.tool = None
+        # Programs
+        self.robot = None
+        self.frame = None
+        self.instructions = []
+        self.is_joint_target = False
+        self.params = {}  # custom binary data (setParam with bytes)
+
+    def __repr__(self):
+        return f"OfflineItem({self.name!r}, type={self.type})"
+
+    def __eq__(self, other):
+        return isinstance(other, OfflineItem) and other.item == self.item and other.link is self.link
+
+    def __hash__(self):
+        return hash(self.item)
+
+    def Valid(self, check_deleted=False):
+        if check_deleted:
+            self.link._check_status()
+        return self.item != 0 and not (check_deleted and self.deleted)
+
+    def Name(self):
+        self.link._check_status()
+        return self.name
+
+    def setName(self, name):
+        self.link._check_status()
+        self.name = name
+
+    def Type(self):
+        self.link._check_status()
+        return self.type
+
+    def Parent(self):
+        self.link._check_status()
+        return self.parent if self.parent is not None else self.link.invalid
+
+    def Delete(self):
+        self.link._check_status()
+        self.deleted = True
+        self.link.items.remove(self)
+
+    def setParam(self, param, value=""):
+        """Only custom binary data is supported (bytes values); other item commands are accepted and ignored."""
+        self.link._check_status()
+        if isinstance(value, bytes):
+            self.params[param] = value
+        return ""
+
+    def getParam(self, param):
+        self.link._check_status()
+        return self.params.get(param, b"")
+
+    def getLink(self, type_linked=rl.ITEM_TYPE_ROBOT):
+        self.link._check_status()
+        if type_linked == rl.ITEM_TYPE_TOOL and self.tool is not None:
+            return self.tool
+        if type_linked == rl.ITEM_TYPE_ROBOT and self.robot is not None:
+            return self.robot
+        return self.link.invalid
+
+    def Pose(self):
+        """Frames and targets: pose relative to the parent. Robots: TCP pose in the robot base frame."""
+        self.link._check_status()
+        if self.type == rl.ITEM_TYPE_ROBOT:
+            return _to_mat(self._flange() @ self._tool_pose())
+        return _to_mat(self.pose)
+
+    def setPose(self, pose):
+        self.link._check_status()
+        self.pose = _to_array(pose)
+
+    def PoseTool(self):
+        """Robots: pose of the active tool. Tools: their own TCP pose."""
+        self.link._check_status()
+        if self.type == rl.ITEM_TYPE_TOOL:
+            return _to_mat(self.pose)
+        return _to_mat(self._tool_pose())
+
+    def Joints(self):
+        self.link._check_status()
+        return rdk.Mat(np.degrees(self.joints).tolist())
+
+    def JointsHome(self):
+        self.link._check_status()
+        return rdk.Mat(np.degrees(self.home).tolist())
+
+    def setJoints(self, joints):
+        self.link._check_status()
+        self.joints = np.radians(np.asarray(joints.list() if isinstance(joints, rdk.Mat) else joints, dtype=float))
+
+    def setFrame(self, frame):
+        self.link._check_status()
+        self.frame = frame
+
+    def setTool(self, tool):
+        self.link._check_status()
+        self.tool = tool
+
+    def setAsCartesianTarget(self):
+        self.link._check_status()
+        self.is_joint_target = False
+
+    def setAsJointTarget(self):
+        self.link._check_status()
+        self.is_joint_target = True
+
+    def MoveJ(self, target, blocking=True):
+        if self.type == rl.ITEM_TYPE_PROGRAM:
+            self._add_instruction("MoveJ", target)
+        else:
+            self._move(target, linear=False)
+
+    def MoveL(self, target, blocking=True):
+        if self.type == rl.ITEM_TYPE_PROGRAM:
+            self._add_instruction("MoveL", target)
+        else:
+            self._move(target, linear=True)
+
+    def InstructionDelete(self, ins_id=0):
+        self.link._check_status()
+        if 0 <= ins_id < len(self.instructions):
+            del self.instructions[ins_id]
+            return 1
+        return 0
+
+    def SolveIK(self, pose, joints_approx=None, tool=None, reference=None):
+        """Joints in degrees closest to joints_approx (or the current joints), an empty Mat if unreachable."""
+        self.link._check_status()
+        flange = _to_array(pose)
+        if tool is not None:
+            flange = flange @ np.linalg.inv(_to_array(tool))
+        if reference is not None:
+            flange = _to_array(reference) @ flange
+        approx = self.joints if joints_approx is None else np.radians(
+            np.asarray(joints_approx.list() if isinstance(joints_approx, rdk.Mat) else joints_approx, dtype=float))
+        joints, reachable, _ = self.model.solve(flange[None], reference=approx, refine=False)
+        return rdk.Mat(np.degrees(joints[0]).tolist()) if reachable[0] else rdk.Mat([])
+
+    def _add_instruction(self, move_type, target):
+        self.link._check_status()
+        self.instructions.append((move_type, target))
+
+    def _tool_pose(self):
+        return self.tool.pose if self.tool is not None else np.eye(4)
+
+    def _flange(self):
+        return self.model.forward(self.joints)[0, -1]
+
+    def _move(self, target, linear):
+        """Move the robot like RoboDK would, raising TargetReachError when the local kinematics disagree."""
+        self.link._check_status()
+        if isinstance(target, OfflineItem):
+            target = _to_mat(target.pose)
+        if isinstance(target, rdk.Mat) and target.size() == (4, 4):
+            flange = _to_array(target) @ np.linalg.inv(self._tool_pose())
+        else:
+            joints = np.radians(np.asarray(target.list() if isinstance(target, rdk.Mat) else target, dtype=float))
+            flange = self.model.forward(joints)[0, -1]
+
+        if linear:
+            # Follow the straight TCP line in small steps: every step must be reachable without a jump
+            tool = self._tool_pose()
+            path = interpolate_poses(self._flange() @ tool, flange @ tool, self.link.linear_steps) @ np.linalg.inv(tool)
+        else:
+            path = flange[None]
+        joints, reachable, _ = self.model.solve(path, reference=self.joints)
+        if not np.all(reachable):
+            raise rl.TargetReachError(f"{self.name}: target not reachable.")
+        if linear:
+            steps = np.abs(np.diff(np.vstack([self.joints, joints]), axis=0))
+            if np.any(steps > self.link.max_joint_step):
+                raise rl.TargetReachError(f"{self.name}: linear move requires a configuration change.")
+        self.joints = joints[-1]
+
+
+class OfflineRobolink:
+    """Station with the robolink.Robolink methods the scripts use and a simulated per-call latency."""
+
+    def __init__(self, latency=0.0, linear_steps=10, max_joint_step=math.radians(30)):
+        """
+        :param latency: Simulated round-trip time in seconds added to every API call.
+        :param linear_steps: Number of steps checked along a MoveL.
+        :param max_joint_step: Largest joint change in radians allowed between MoveL steps.
+        """
+        self.latency = latency
+        self.linear_steps = linear_steps
+        self.max_joint_step = max_joint_step
+        self.items = []
+        self.round_trips = 0
+        self.collision_active = 0
+        self.render = True
+        self._next_handle = 1
+        self._lock = threading.Lock()  # station state shared by concurrent connections (see robodk_async)
+        self.invalid = OfflineItem(self, 0, "", -1)
+
+    def _check_status(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)  # outside the lock: calls from several connections overlap like in RoboDK
+        return 0
+
+    def _new_item(self, name, item_type, parent=None, pose=None):
+        with self._lock:
+            item = OfflineItem(self, self._next_handle, name, item_type, parent, pose)
+            self._next_handle += 1
+            self.items.append(item)
+        return item
+
+    def add_robot(self, name, base_pose=None, tool_pose=None, home=None, model=None):
+        """
+        Add a robot with its base frame and tool to the station (setup only, no simulated latency).
+
+        :param name: Robot name, also used to find the kinematic model in the registry.
+        :param base_pose: Optional 4x4 base frame pose in the station (numpy array or Mat).
+        :param tool_pose: Optional 4x4 TCP pose relative to the flange.
+        :param home: Optional home joints in degrees.
+        :param model: Optional DHModel, defaults to get_model(name).
+        :return: The robot item.
+        """
+        model = model if model is not None else get_model(name)
+        if model is None:
+            raise NameError(f"No kinematic model for robot '{name}'.")
+        as_array = lambda pose: _to_array(pose) if isinstance(pose, rdk.Mat) else pose
+        base = self._new_item(f"{name} Base", rl.ITEM_TYPE_FRAME, pose=as_array(base_pose))
+        robot = self._new_item(name, rl.ITEM_TYPE_ROBOT, parent=base)
+        robot.model = model
+        robot.tool = self._new_item("Tool", rl.ITEM_TYPE_TOOL, parent=robot, pose=as_array(tool_pose))
+        if home is not None:
+            robot.home = np.radians(np.asarray(home, dtype=float))
+        robot.joints = robot.home.copy()
+        return robot
+
+    def Item(self, name, itemtype=None):
+        self._check_status()
+        for item in self.items:
+            if item.name == name and (itemtype is None or item.type == itemtype):
+                return item
+        return self.invalid
+
+    def ItemList(self, filter=None, list_names=False):
+        self._check_status()
+        items = [item for item in self.items if filter is None or item.type == filter]
+        return [item.name for item in items] if list_names else items
+
+    def AddTarget(self, name, itemparent=0, itemrobot=0):
+        self._check_status()
+        target = self._new_item(name, rl.ITEM_TYPE_TARGET, parent=itemparent or None)
+        target.robot = itemrobot or None
+        return target
+
+    def AddProgram(self, name, itemrobot=0):
+        self._check_status()
+        program = self._new_item(name, rl.ITEM_TYPE_PROGRAM)
+        program.robot = itemrobot or None
+        return program
+
+    def AddFile(self, filename, parent=0):
+        """Only robot programs are supported: a UR .script becomes a program with one instruction per move."""
+        self._check_status()
+        program = self._new_item(os.path.splitext(os.path.basename(filename))[0], rl.ITEM_TYPE_PROGRAM)
+        program.robot = parent or None
+        with open(filename, "r") as file:
+            for line in file:
+                line = line.strip()
+                if line.startswith(("movej(", "movel(")):
+                    program.instructions.append(("MoveJ" if line.startswith("movej") else "MoveL", line))
+        return program
+
+    def setCollisionActive(self, check_state=rl.COLLISION_ON):
+        self._check_status()
+        self.collision_active = check_state
+
+    def Render(self, always_render=False):
+        self._check_status()
+        self.render = always_render
+
+    def Disconnect(self):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time MoveJ checks against the offline station.")
+    parser.add_argument("robot", help="Robot name, e.g. \"UR5\" or \"COMAU NJ 60-2.2\"")
+    parser.add_argument("--targets", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.002, help="Simulated round trip in seconds")
+    args = parser.parse_args()
+
+    station = OfflineRobolink(latency=args.latency)
+    station_robot = station.add_robot(args.robot)
+    rng = np.random.default_rng(0)
+    sample_joints = rng.uniform(-math.pi, math.pi, size=(args.targets, 6))
+    sample_poses = station_robot.model.forward(sample_joints)[:, -1]
+
+    start = time.perf_counter()
+    reached = 0
+    for sample_pose in sample_poses:
+        try:
+            station_robot.MoveJ(_to_mat(sample_pose), False)
+            reached += 1
+        except rl.TargetReachError:
+            pass
+    elapsed = time.perf_counter() - start
+    print(f"{reached}/{args.targets} targets reached, {station.round_trips} round trips, "
+          f"{elapsed:.3f} s ({elapsed - station.round_trips * args.latency:.3f} s without latency).")
@@ -0,0 +1,326 @@
+import gzip
+import json
+import base64
+import time
+import atexit
+import argparse
+import threading
+from collections import defaultdict, deque
+import robolink as rl  # Exception types of the real API
+import robodk as rdk   # Mat
+
+# Record-and-replay of RoboDK API traffic. RecordingLink wraps a live link (or the offline station) and logs
+# every call made through it: the object, the method, the arguments, the result, any error and the latency.
+# The log is JSON lines with short keys, gzip compressed when the file name ends with ".gz". ReplayLink
+# serves the recorded results back without RoboDK, so one captured session can be re-run in benchmarks.
+# All connections of a recorded session (reconnects, the connection pools of robodk_async) write to one log,
+# and both link types adopt the items of the other connections of their session, see adopt().
+#
+# Record from Grasshopper:  record_session("C:/logs/station.jsonl.gz")  (or set ROBODK_RECORD, see robodk_session)
+# Compare two captures:     python robodk_recorder.py before.jsonl.gz after.jsonl.gz
+
+LINK = 0  # object id of the link itself in the log, items use their handle
+
+
+def _is_item(value):
+    return hasattr(value, "item") and hasattr(value, "Valid") and not isinstance(value, (_Proxy, ReplayItem))
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _encode(value):
+    """JSON-friendly form of arguments and results: items become their handle, Mats their rows, bytes base64."""
+    if isinstance(value, (_Proxy, ReplayItem)):
+        return {"I": value.handle}
+    if _is_item(value):
+        return {"I": int(value.item)}
+    if isinstance(value, rdk.Mat):
+        return {"M": value.rows}
+    if isinstance(value, bytes):  # custom item data (getParam/setParam)
+        return {"B": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if hasattr(value, "tolist"):  # numpy arrays and scalars
+        return value.tolist()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return repr(value)
+
+
+class _Log:
+    """Log file shared by the RecordingLinks of one session, written from several threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = _open(path, "w")
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def write(self, entry):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class _Proxy:
+    """Forwards attribute access to the wrapped object and records every method call."""
+
+    def __init__(self, recorder, target, handle):
+        object.__setattr__(self, "_recorder", recorder)
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "handle", handle)
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name.startswith("_") or not callable(value):
+            return value  # attributes and internals are not recorded
+
+        def recorded_call(*args, **kwargs):
+            return self._recorder.call(self.handle, name, value, args, kwargs)
+
+        return recorded_call
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __eq__(self, other):
+        return isinstance(other, _Proxy) and other.handle == self.handle
+
+    def __hash__(self):
+        return hash(self.handle)
+
+    def unwrap(self):
+        return self._target
+
+
+class RecordingLink(_Proxy):
+    """Robolink wrapper that logs every call made through it and through the items it returns."""
+
+    def __init__(self, link, path, log=None):
+        """
+        :param link: The link to record (robolink.Robolink or robodk_offline.OfflineRobolink).
+        :param path: Log file (".gz" for gzip).
+        :param log: Open log of another RecordingLink of the same session to append to (path is opened and
+                    truncated otherwise).
+        """
+        super().__init__(self, link, LINK)
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "_log", log if log is not None else _Log(path))
+        object.__setattr__(self, "calls", 0)
+
+    def call(self, handle, name, method, args, kwargs):
+        # Real API calls need the real items back
+        unwrap = lambda value: value.unwrap() if isinstance(value, _Proxy) else value
+        start = time.perf_counter()
+        error = None
+        try:
+            result = method(*[unwrap(a) for a in args], **{k: unwrap(v) for k, v in kwargs.items()})
+        except Exception as e:
+            result = None
+            error = e
+        latency = time.perf_counter() - start
+
+        entry = {"o": handle, "m": name, "a": _encode(list(args)), "t": round(latency, 6)}
+        if kwargs:
+            entry["k"] = {k: _encode(v) for k, v in kwargs.items()}
+        if error is not None:
+            entry["e"] = [type(error).__name__, str(error)]
+        else:
+            entry["r"] = _encode(result)
+        self._log.write(entry)
+        object.__setattr__(self, "calls", self.calls + 1)
+
+        if error is not None:
+            raise error
+        return self._wrap(result)
+
+    def _wrap(self, result):
+        if _is_item(result):
+            return _Proxy(self, result, int(result.item))
+        if isinstance(result, list):
+            return [self._wrap(value) for value in result]
+        return result
+
+    def adopt(self, value):
+        """
+        The same item on this connection, for items returned by another RecordingLink of the session: the
+        calls are then logged here and reach RoboDK over this link.
+        """
+        if not isinstance(value, _Proxy) or value._recorder is self:
+            return value
+        target = value.unwrap()
+        link = self.unwrap()
+        if isinstance(target, rl.Item) and target.link is not link:
+            target = rl.Item(link, target.item, target.type)
+        return _Proxy(self, target, value.handle)
+
+    def close(self):
+        self._log.close()
+
+
+class ReplayMismatch(Exception):
+    """Raised when a replayed call was never recorded."""
+
+
+class ReplayItem:
+    """Item served from a recording."""
+
+    def __init__(self, link, handle):
+        self.link = link
+        self.handle = handle
+        self.item = handle
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.link.replay(self.handle, name, args, kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, ReplayItem) and other.handle == self.handle
+
+    def __hash__(self):
+        return hash(self.handle)
+
+
+class ReplayLink:
+    """Robolink stand-in answering from a recording made with RecordingLink."""
+
+    def __init__(self, path, simulate_latency=False):
+        """
+        :param path: Log file written by RecordingLink.
+        :param simulate_latency: Sleep for the recorded latency of every call.
+        """
+        self.simulate_latency = simulate_latency
+        self.calls = 0
+        # Calls are matched on (object, method, arguments) in recorded order, then on (object, method) so a
+        # changed argument (e.g. a rounded pose) still replays
+        self._exact = defaultdict(deque)
+        self._by_method = defaultdict(deque)
+        with _open(path, "r") as file:
+            for line in file:
+                entry = json.loads(line)
+                self._exact[self._key(entry["o"], entry["m"], entry["a"], entry.get("k"))].append(entry)
+                self._by_method[(entry["o"], entry["m"])].append(entry)
+
+    @staticmethod
+    def _key(handle, name, args, kwargs):
+        return handle, name, json.dumps(args, separators=(",", ":")), json.dumps(kwargs, sort_keys=True)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.replay(LINK, name, args, kwargs)
+
+    def replay(self, handle, name, args, kwargs):
+        key = self._key(handle, name, _encode(list(args)), {k: _encode(v) for k, v in kwargs.items()} or None)
+        queue = self._exact.get(key)
+        if queue:
+            entry = queue.popleft()
+            self._by_method[(handle, name)].remove(entry)
+        else:
+            queue = self._by_method.get((handle, name))
+            if not queue:
+                raise ReplayMismatch(f"No recorded call {name} on object {handle}.")
+            entry = queue.popleft()
+            self._exact[self._key(handle, name, entry["a"], entry.get("k"))].remove(entry)
+
+        self.calls += 1
+        if self.simulate_latency:
+            time.sleep(entry["t"])
+        if "e" in entry:
+            error_type = getattr(rl, entry["e"][0], None)
+            if not (isinstance(error_type, type) and issubclass(error_type, Exception)):
+                error_type = Exception
+            raise error_type(entry["e"][1])
+        return self._decode(entry["r"])
+
+    def _decode(self, value):
+        if isinstance(value, dict):
+            if "I" in value:
+                return ReplayItem(self, value["I"])
+            if "M" in value:
+                return rdk.Mat(value["M"])
+            if "B" in value:
+                return base64.b64decode(value["B"])
+        if isinstance(value, list):
+            return [self._decode(v) for v in value]
+        return value
+
+    def adopt(self, value):
+        """The same item answered by this link, for items of another ReplayLink of the session."""
+        if isinstance(value, ReplayItem) and value.link is not self:
+            return ReplayItem(self, value.handle)
+        return value
+
+    def Disconnect(self):
+        pass
+
+
+def record_session(path, link_factory=None):
+    """
+    Make the process-wide RoboDK session record all traffic to a file.
+
+    :param path: Log file (".gz" for gzip).
+    :param link_factory: Link to record, defaults to a live robolink.Robolink.
+    :return: The new RoboDKSession.
+    """
+    import robodk_session
+    factory = link_factory if link_factory is not None else rl.Robolink
+    log = _Log(path)  # one log for every connection the session opens
+    return robodk_session.use_link(lambda: RecordingLink(factory(), path, log))
+
+
+def replay_session(path, simulate_latency=False):
+    """
+    Make the process-wide RoboDK session answer from a recording.
+
+    :param path: Log file written by RecordingLink.
+    :param simulate_latency: Sleep for the recorded latency of every call.
+    :return: The new RoboDKSession.
+    """
+    import robodk_session
+    return robodk_session.use_link(lambda: ReplayLink(path, simulate_latency))
+
+
+def summarize(path):
+    """
+    Call counts and total latency per method of a recording.
+
+    :param path: Log file written by RecordingLink.
+    :return: Dictionary method -> [count, total seconds].
+    """
+    summary = defaultdict(lambda: [0, 0.0])
+    with _open(path, "r") as file:
+        for line in file:
+            entry = json.loads(line)
+            summary[entry["m"]][0] += 1
+            summary[entry["m"]][1] += entry["t"]
+    return dict(summary)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize (and compare) recorded RoboDK sessions.")
+    parser.add_argument("paths", nargs="+", help="One or two recordings")
+    args = parser.parse_args()
+
+    summaries = [summarize(path) for path in args.paths]
+    methods = sorted(set().union(*summaries), key=lambda m: -max(s.get(m, [0, 0.0])[1] for s in summaries))
+    print(f"{'method':<24}" + "".join(f"{'calls':>10}{'seconds':>12}" for _ in summaries))
+    for method in methods + ["total"]:
+        row = f"{method:<24}"
+        for summary in summaries:
+            if method == "total":
+                count, seconds = sum(v[0] for v in summary.values()), sum(v[1] for v in summary.values())
+            else:
+                count, seconds = summary.get(method, [0, 0.0])
+            row += f"{count:>10}{seconds:>12.4f}"
+        print(row)
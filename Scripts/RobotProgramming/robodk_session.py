@@ -0,0 +1,137 @@
+import os
+import time
+import robolink as rl  # RoboDK API
+
+# Process-wide RoboDK connection shared by all Grasshopper components. The module stays imported for the whole
+# Rhino session, so one live Robolink and the item handles looked up by name survive between solves instead
+# of reconnecting and searching the station tree on every solve.
+#
+# Set ROBODK_RECORD=<file> to log all traffic of the session, or ROBODK_REPLAY=<file> to answer from such a log
+# without RoboDK (see robodk_recorder).
+
+
+class RoboDKSession:
+    """One live RoboDK link, a pool of item handles by (name, type) and counters of the lookups it saves."""
+
+    def __init__(self, link_factory=None, validate_interval=2.0):
+        """
+        :param link_factory: Callable that creates the link (defaults to robolink.Robolink).
+        :param validate_interval: Seconds during which a cached item is trusted without asking RoboDK again.
+        """
+        self.link_factory = link_factory if link_factory is not None else rl.Robolink
+        self.validate_interval = validate_interval
+        self._link = None
+        self._items = {}  # (name, item_type) -> (item, time of last validation)
+        self.connections = 0
+        self.lookups = 0  # Item() calls by name
+        self.revalidations = 0  # Valid(True) checks of cached handles
+
+    def link(self):
+        """
+        The shared Robolink, created on first use.
+
+        :return: A robolink.Robolink instance.
+        """
+        if self._link is None:
+            self._link = self.link_factory()
+            self.connections += 1
+        return self._link
+
+    def reconnect(self):
+        """Drop the current link and all cached handles and connect again."""
+        if self._link is not None:
+            try:
+                self._link.Disconnect()
+            except Exception:
+                pass
+        self._link = None
+        self._items.clear()
+        return self.link()
+
+    def item(self, name, item_type=None):
+        """
+        Get an item by name, reusing the cached handle while it is valid.
+
+        A cached handle is trusted for validate_interval seconds, then checked with one cheap call. Stale
+        handles (deleted item, restarted RoboDK) are looked up again; a broken connection is reopened.
+
+        :param name: The item name in RoboDK.
+        :param item_type: Optional robolink.ITEM_TYPE_* filter.
+        :return: A robolink.Item (check Valid() as usual).
+        """
+        key = (name, item_type)
+        cached = self._items.get(key)
+        now = time.time()
+        if cached is not None:
+            item, validated = cached
+            if now - validated < self.validate_interval:
+                return item
+            try:
+                self.revalidations += 1
+                if item.Valid(True):
+                    self._items[key] = (item, now)
+                    return item
+            except Exception:
+                self.reconnect()
+            self._items.pop(key, None)
+
+        try:
+            item = self._lookup(name, item_type)
+        except Exception:
+            self.reconnect()
+            item = self._lookup(name, item_type)
+        if item.Valid():
+            self._items[key] = (item, now)
+        return item
+
+    def _lookup(self, name, item_type):
+        self.lookups += 1
+        if item_type is None:
+            return self.link().Item(name)
+        return self.link().Item(name, item_type)
+
+    def invalidate(self, name=None):
+        """Forget cached handles (all of them, or only those with this name)."""
+        if name is None:
+            self._items.clear()
+        else:
+            for key in [key for key in self._items if key[0] == name]:
+                del self._items[key]
+
+    def stats(self):
+        """Summary of the session's own calls as a string (the calls the scripts make on the link are not counted)."""
+        return (f"{self.lookups} item lookups, {self.revalidations} revalidations, "
+                f"{len(self._items)} cached handles, {self.connections} connection(s)")
+
+
+_session = None
+
+
+def get_session():
+    """
+    The process-wide RoboDK session (created on first use).
+
+    :return: A RoboDKSession.
+    """
+    global _session
+    if _session is None:
+        if os.environ.get("ROBODK_REPLAY"):
+            from robodk_recorder import replay_session
+            return replay_session(os.environ["ROBODK_REPLAY"])
+        if os.environ.get("ROBODK_RECORD"):
+            from robodk_recorder import record_session
+            return record_session(os.environ["ROBODK_RECORD"])
+        _session = RoboDKSession()
+    return _session
+
+
+def use_link(link_factory):
+    """
+    Replace the process-wide session by one built on another link, e.g. the offline station of robodk_offline.
+
+    :param link_factory: Callable returning a Robolink-compatible object.
+    :return: The new RoboDKSession.
+    """
+    global _session
+    _session = RoboDKSession(link_factory)
+    return _session
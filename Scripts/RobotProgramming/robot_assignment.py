@@ -0,0 +1,138 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from robot_kinematics import invert_poses
+from sequencing import travel_time_matrix
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # Rhino's Python may not ship SciPy, the greedy assignment is used instead
+    linear_sum_assignment = None
+
+# Distribution of assembly planes over the robots of a cell. Every robot solves all planes with the local
+# kinematics (one thread per robot, NumPy releases the GIL); a plane costs the joint travel time from the
+# robot's home configuration. The planes are then matched to robots at minimum total cost, where every further
+# plane on the same robot costs a balance penalty and robots can be given a load limit.
+
+UNASSIGNED_COST = 1e6  # seconds; higher than any real assignment, so planes are only left out when unavoidable
+
+
+class RobotCell:
+    """One robot of the cell: kinematic model, base frame and TCP, home joints and optional load limit."""
+
+    def __init__(self, name, model, base, tool=None, home=None, capacity=None):
+        self.name = name
+        self.model = model
+        self.base = np.asarray(base, dtype=float)  # 4x4 pose of the robot base in the station frame
+        self.tool = np.eye(4) if tool is None else np.asarray(tool, dtype=float)  # TCP relative to the flange
+        self.home = np.zeros(6) if home is None else np.asarray(home, dtype=float)  # radians
+        self.capacity = capacity  # largest number of planes, None for no limit
+
+    def __repr__(self):
+        return f"RobotCell('{self.name}', {self.model.name})"
+
+
+def _reach(args):
+    cell, targets = args
+    flanges = invert_poses(cell.base) @ targets @ invert_poses(cell.tool)
+    # Closed form with the damped least squares fallback, like move_planner.chain_joints that programs the
+    # planes, so every assigned plane can be programmed
+    joints, reachable, _ = cell.model.solve(flanges, reference=cell.home)
+    costs = np.full(len(targets), np.inf)
+    costs[reachable] = travel_time_matrix(cell.home[None], joints[reachable], cell.model.joint_speeds)[0]
+    return joints, reachable, costs
+
+
+def reachability_matrix(targets, cells, max_workers=None):
+    """
+    Solve every target for every robot, one thread per robot.
+
+    :param targets: TCP poses in the station frame, shape (N, 4, 4).
+    :param cells: List of RobotCell.
+    :param max_workers: Thread count (None lets the executor decide).
+    :return: Tuple (joints (R, N, 6), reachable (R, N), costs (R, N) in seconds, inf where unreachable).
+    """
+    targets = np.asarray(targets, dtype=float).reshape(-1, 4, 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_reach, [(cell, targets) for cell in cells]))
+    joints, reachable, costs = (np.stack(values) for values in zip(*results))
+    return joints, reachable, costs
+
+
+def _matching_assignment(costs, capacities, balance):
+    """Minimum-cost matching of targets to robot slots; slot k of a robot costs k * balance extra."""
+    num_targets = costs.shape[1]
+    columns, owners = [], []
+    for robot, (row, capacity) in enumerate(zip(costs, capacities)):
+        slots = int(np.count_nonzero(np.isfinite(row)))
+        slots = slots if capacity is None else min(slots, int(capacity))
+        columns.append(row[:, None] + balance * np.arange(slots)[None, :])
+        owners.append(np.full(slots, robot))
+    # One spare column per target, so that a complete matching always exists
+    columns.append(np.full((num_targets, num_targets), UNASSIGNED_COST))
+    owners.append(np.full(num_targets, -1))
+    rows, chosen = linear_sum_assignment(np.hstack(columns))
+    assignment = np.full(num_targets, -1)
+    assignment[rows] = np.concatenate(owners)[chosen]
+    return assignment
+
+
+def _greedy_assignment(costs, capacities, balance):
+    """Most constrained targets first, each to the robot with the lowest cost plus load penalty."""
+    num_robots, num_targets = costs.shape
+    limits = np.array([num_targets if capacity is None else capacity for capacity in capacities])
+    loads = np.zeros(num_robots, dtype=int)
+    assignment = np.full(num_targets, -1)
+    options = np.isfinite(costs).sum(axis=0)
+    for target in np.argsort(options, kind="stable"):
+        marginal = np.where(loads < limits, costs[:, target] + balance * loads, np.inf)
+        robot = int(np.argmin(marginal))
+        if np.isfinite(marginal[robot]):
+            assignment[target] = robot
+            loads[robot] += 1
+    return assignment
+
+
+class RobotAssignment:
+    """Robot index per target (-1 where no robot takes it) and the per-robot solutions."""
+
+    def __init__(self, names, assignment, joints, reachable, costs):
+        self.names = names
+        self.assignment = assignment  # (N,)
+        self.joints = joints  # (R, N, 6) radians
+        self.reachable = reachable  # (R, N)
+        self.costs = costs  # (R, N) seconds from home, inf where unreachable
+
+    def targets_of(self, robot):
+        """Indices of the targets of one robot, in input order."""
+        return np.flatnonzero(self.assignment == robot)
+
+    @property
+    def unassigned(self):
+        return np.flatnonzero(self.assignment < 0)
+
+    @property
+    def loads(self):
+        return np.bincount(self.assignment[self.assignment >= 0], minlength=len(self.names))
+
+    def summary(self):
+        parts = [f"{name}: {load}" for name, load in zip(self.names, self.loads)]
+        return f"Planes per robot: {', '.join(parts)}; {len(self.unassigned)} unassigned"
+
+
+def assign_targets(targets, cells, balance=0.1, max_workers=None):
+    """
+    Distribute targets over several robots.
+
+    :param targets: TCP poses in the station frame, shape (N, 4, 4).
+    :param cells: List of RobotCell.
+    :param balance: Extra cost in seconds of every further target on the same robot (0: cheapest robot only).
+    :param max_workers: Thread count for the reachability checks.
+    :return: A RobotAssignment.
+    """
+    joints, reachable, costs = reachability_matrix(targets, cells, max_workers)
+    capacities = [cell.capacity for cell in cells]
+    if linear_sum_assignment is not None:
+        assignment = _matching_assignment(costs, capacities, balance)
+    else:
+        assignment = _greedy_assignment(costs, capacities, balance)
+    return RobotAssignment([cell.name for cell in cells], assignment, joints, reachable, costs)
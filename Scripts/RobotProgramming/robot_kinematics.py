@@ -0,0 +1,634 @@
+import math
+import numpy as np
+
+# Shared kinematics for the robot programming scripts.
+# Everything works on batches: joint angles are (N x 6) arrays in radians, lengths are in millimeters
+# and poses are (N x 4 x 4) homogeneous matrices.
+
+
+class DHModel:
+    """
+    Standard Denavit-Hartenberg table of a 6-axis robot (millimeters and radians).
+
+    Models are normally created by the registry in robot_models.py from robot_models.json. Everything
+    that only depends on the table (twist trigonometry, the constant rows of each link transform, the
+    reach) is computed once here instead of on every solve.
+    """
+
+    def __init__(self, name, a, d, alpha, joint_limits=None, ik_solver="ur", joint_speeds=None,
+                 joint_accelerations=None, link_radii=None):
+        self.name = name
+        self.a = np.asarray(a, dtype=float)
+        self.d = np.asarray(d, dtype=float)
+        self.alpha = np.asarray(alpha, dtype=float)
+        # Joint limits in radians, shape (6, 2) as [lower, upper]. Defaults to +/-360 degrees (not enforced).
+        if joint_limits is None:
+            joint_limits = [[-2 * math.pi, 2 * math.pi]] * 6
+        self.joint_limits = np.asarray(joint_limits, dtype=float)
+        # Closed-form IK family: "ur" (offset wrist) or "spherical_wrist"
+        self.ik_solver = ik_solver
+        # Joint speed (rad/s) and acceleration (rad/s^2) limits, used for travel and cycle time estimates
+        self.joint_speeds = np.asarray(joint_speeds if joint_speeds is not None else [math.pi] * 6, dtype=float)
+        self.joint_accelerations = np.asarray(joint_accelerations if joint_accelerations is not None
+                                              else [2 * math.pi] * 6, dtype=float)
+        # Capsule radius per link in millimeters, used by the local collision check
+        self.link_radii = np.asarray(link_radii if link_radii is not None else [50.0] * 6, dtype=float)
+
+        # Precompiled constants
+        self.cos_alpha = np.cos(self.alpha)
+        self.sin_alpha = np.sin(self.alpha)
+        self.link_template = np.zeros((6, 4, 4))  # rows 2 and 3 of each link transform do not depend on theta
+        self.link_template[:, 2, 1] = self.sin_alpha
+        self.link_template[:, 2, 2] = self.cos_alpha
+        self.link_template[:, 2, 3] = self.d
+        self.link_template[:, 3, 3] = 1.0
+        self.reach = float(np.sum(np.abs(self.a)) + np.sum(np.abs(self.d)))
+        # Everything FK and IK results depend on, so caches never serve another model's results under the same name
+        self.kinematics_key = (self.name, self.ik_solver,
+                               np.concatenate([self.a, self.d, self.alpha, self.joint_limits.ravel()]).tobytes())
+
+    def __repr__(self):
+        return f"DHModel('{self.name}')"
+
+    def forward(self, joints, base=None):
+        """All link frames, see forward_kinematics."""
+        return forward_kinematics(joints, self, base)
+
+    def inverse(self, poses):
+        """All closed-form IK solutions, see inverse_kinematics."""
+        return inverse_kinematics(poses, self)
+
+    def solve(self, poses, reference=None, refine=True, cache=None):
+        """One IK solution per target with fallback refinement, see solve_target_sequence."""
+        return solve_target_sequence(poses, self, reference, refine, cache)
+
+    def jacobian(self, joints):
+        """Geometric flange Jacobian, see jacobian."""
+        return jacobian(joints, self)
+
+
+def _link_transforms(theta, model, index=slice(None)):
+    """
+    Build DH link transforms for any array of joint angles.
+
+    :param theta: Joint angles; the last axis must match the selected links when index is a slice.
+    :param model: The DHModel of the robot.
+    :param index: Link index (0-5) or slice of links.
+    :return: Array of shape theta.shape + (4, 4).
+    """
+    theta = np.asarray(theta, dtype=float)
+    a = model.a[index]
+    cos_alpha = model.cos_alpha[index]
+    sin_alpha = model.sin_alpha[index]
+    cos_theta = np.cos(theta)
+    sin_theta = np.sin(theta)
+
+    T = np.empty(theta.shape + (4, 4))
+    T[...] = model.link_template[index]
+    T[..., 0, 0] = cos_theta
+    T[..., 0, 1] = -sin_theta * cos_alpha
+    T[..., 0, 2] = sin_theta * sin_alpha
+    T[..., 0, 3] = a * cos_theta
+    T[..., 1, 0] = sin_theta
+    T[..., 1, 1] = cos_theta * cos_alpha
+    T[..., 1, 2] = -cos_theta * sin_alpha
+    T[..., 1, 3] = a * sin_theta
+    return T
+
+
+def dh_transforms(joints, model):
+    """
+    Compute the six link transforms of every configuration in one pass.
+
+    :param joints: Joint angles in radians, shape (N, 6) or (6,).
+    :param model: The DHModel of the robot.
+    :return: Array of shape (N, 6, 4, 4) with the transform of each link relative to the previous one.
+    """
+    theta = np.atleast_2d(np.asarray(joints, dtype=float))
+    return _link_transforms(theta, model)
+
+
+def forward_kinematics(joints, model, base=None):
+    """
+    Compute all link frames for a batch of joint configurations.
+
+    :param joints: Joint angles in radians, shape (N, 6) or (6,).
+    :param model: The DHModel of the robot.
+    :param base: Optional 4x4 base pose (world from robot base). Defaults to identity.
+    :return: Array of shape (N, 7, 4, 4): the base frame followed by the frame after each joint.
+             frames[:, -1] is the flange pose.
+    """
+    T = dh_transforms(joints, model)
+    num_configs = T.shape[0]
+
+    frames = np.empty((num_configs, 7, 4, 4))
+    frames[:, 0] = np.eye(4) if base is None else np.asarray(base, dtype=float)
+    for i in range(6):
+        frames[:, i + 1] = frames[:, i] @ T[:, i]
+    return frames
+
+
+def invert_poses(poses):
+    """
+    Invert a batch of homogeneous transforms without a general matrix inverse.
+
+    :param poses: Array of shape (..., 4, 4).
+    :return: Array of the same shape with the inverse transforms.
+    """
+    poses = np.asarray(poses, dtype=float)
+    R_t = np.swapaxes(poses[..., :3, :3], -1, -2)
+    inverse = np.zeros_like(poses)
+    inverse[..., :3, :3] = R_t
+    inverse[..., :3, 3] = -np.einsum('...ij,...j->...i', R_t, poses[..., :3, 3])
+    inverse[..., 3, 3] = 1.0
+    return inverse
+
+
+def quaternions(rotations):
+    """
+    Unit quaternions (w, x, y, z) of a batch of rotation matrices, with w >= 0.
+
+    :param rotations: Array of shape (N, 3, 3).
+    :return: Array of shape (N, 4).
+    """
+    R = np.asarray(rotations, dtype=float).reshape(-1, 3, 3)
+    trace = np.trace(R, axis1=1, axis2=2)
+
+    # Shepperd's method: build the quaternion from its largest component
+    candidates = np.stack([trace, R[:, 0, 0], R[:, 1, 1], R[:, 2, 2]], axis=1)
+    largest = np.argmax(candidates, axis=1)
+    q = np.empty((len(R), 4))  # w, x, y, z
+    for k in range(4):
+        rows = largest == k
+        if not np.any(rows):
+            continue
+        r = R[rows]
+        if k == 0:
+            s = 2.0 * np.sqrt(1.0 + trace[rows])
+            q[rows] = np.stack([0.25 * s, (r[:, 2, 1] - r[:, 1, 2]) / s,
+                                (r[:, 0, 2] - r[:, 2, 0]) / s, (r[:, 1, 0] - r[:, 0, 1]) / s], axis=1)
+        else:
+            i = k - 1
+            j, l = (i + 1) % 3, (i + 2) % 3
+            s = 2.0 * np.sqrt(np.maximum(1.0 + r[:, i, i] - r[:, j, j] - r[:, l, l], 1e-300))
+            part = np.empty((len(r), 4))
+            part[:, 0] = (r[:, l, j] - r[:, j, l]) / s
+            part[:, 1 + i] = 0.25 * s
+            part[:, 1 + j] = (r[:, j, i] + r[:, i, j]) / s
+            part[:, 1 + l] = (r[:, l, i] + r[:, i, l]) / s
+            q[rows] = part
+    q[q[:, 0] < 0] *= -1.0  # angle in [0, pi]
+    return q
+
+
+def quaternion_matrices(q):
+    """
+    Rotation matrices of a batch of quaternions (w, x, y, z); the quaternions are normalized first.
+
+    :param q: Array of shape (N, 4).
+    :return: Array of shape (N, 3, 3).
+    """
+    q = np.asarray(q, dtype=float).reshape(-1, 4)
+    w, x, y, z = (q / np.linalg.norm(q, axis=1, keepdims=True)).T
+    return np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y),
+                     2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x),
+                     2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=1).reshape(-1, 3, 3)
+
+
+def rotation_vectors(rotations):
+    """
+    Rotation vectors (axis * angle) of a batch of rotation matrices, through unit quaternions so that
+    rotations close to a half turn stay accurate.
+
+    :param rotations: Array of shape (N, 3, 3).
+    :return: Array of shape (N, 3) in radians.
+    """
+    q = quaternions(rotations)
+    sin_half = np.linalg.norm(q[:, 1:], axis=1)
+    angle = 2.0 * np.arctan2(sin_half, q[:, 0])
+    scale = np.where(sin_half > 1e-12, angle / np.maximum(sin_half, 1e-300), 2.0)
+    return q[:, 1:] * scale[:, None]
+
+
+def rotation_matrices(vectors):
+    """
+    Rotation matrices of a batch of rotation vectors (Rodrigues' formula).
+
+    :param vectors: Array of shape (..., 3) in radians.
+    :return: Array of shape (..., 3, 3).
+    """
+    vectors = np.asarray(vectors, dtype=float)
+    angle = np.linalg.norm(vectors, axis=-1)
+    axis = vectors / np.where(angle > 1e-12, angle, 1.0)[..., None]
+    K = np.zeros(vectors.shape[:-1] + (3, 3))
+    K[..., 0, 1], K[..., 0, 2], K[..., 1, 2] = -axis[..., 2], axis[..., 1], -axis[..., 0]
+    K[..., 1, 0], K[..., 2, 0], K[..., 2, 1] = axis[..., 2], -axis[..., 1], axis[..., 0]
+    sin, cos = np.sin(angle)[..., None, None], np.cos(angle)[..., None, None]
+    return np.eye(3) + sin * K + (1.0 - cos) * (K @ K)
+
+
+def interpolate_poses(start, end, steps):
+    """
+    Poses along the straight-line motion between two poses: the position moves linearly and the
+    orientation turns about the fixed relative axis, like a MoveL.
+
+    :param start: Start poses, shape (4, 4) or (N, 4, 4).
+    :param end: End poses with the same shape as start.
+    :param steps: Number of poses per segment; the last one equals the end pose.
+    :return: Array of shape (steps, 4, 4) or (N, steps, 4, 4).
+    """
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    single = start.ndim == 2
+    start = start.reshape(-1, 4, 4)
+    end = end.reshape(-1, 4, 4)
+
+    relative = np.swapaxes(start[:, :3, :3], -1, -2) @ end[:, :3, :3]
+    vectors = rotation_vectors(relative)
+    fractions = np.linspace(0.0, 1.0, steps + 1)[1:]
+
+    poses = np.zeros((len(start), steps, 4, 4))
+    poses[:, :, :3, :3] = start[:, None, :3, :3] @ rotation_matrices(fractions[None, :, None] * vectors[:, None, :])
+    poses[:, :, :3, 3] = start[:, None, :3, 3] + fractions[None, :, None] * (end[:, None, :3, 3] - start[:, None, :3, 3])
+    poses[:, :, 3, 3] = 1.0
+    return poses[0] if single else poses
+
+
+def wrap_to_limits(joints, model):
+    """
+    Shift joint angles by multiples of 360 degrees into the model's joint limits.
+
+    :param joints: Joint angles in radians, shape (..., 6).
+    :param model: The DHModel of the robot.
+    :return: Tuple (wrapped joints, boolean mask of shape (...) that is True where all six joints are within limits).
+    """
+    lower = model.joint_limits[:, 0]
+    upper = model.joint_limits[:, 1]
+    wrapped = np.mod(np.asarray(joints, dtype=float) + math.pi, 2 * math.pi) - math.pi
+    wrapped = np.where(wrapped < lower, wrapped + 2 * math.pi, wrapped)
+    wrapped = np.where(wrapped > upper, wrapped - 2 * math.pi, wrapped)
+    within = (wrapped >= lower - 1e-9) & (wrapped <= upper + 1e-9)
+    return wrapped, np.all(within, axis=-1)
+
+
+def ur5_inverse_kinematics(poses, model):
+    """
+    Closed-form inverse kinematics of a UR-type arm for a batch of flange poses.
+
+    All eight solutions (shoulder left/right x wrist up/down x elbow up/down) are computed with
+    array operations only. Solutions that do not exist or fall outside the joint limits are
+    marked invalid.
+
+    :param poses: Flange poses in the robot base frame, shape (N, 4, 4) or (4, 4).
+    :param model: A DHModel with the UR parameter layout (e.g. the UR5).
+    :return: Tuple (solutions, valid): solutions in radians with shape (N, 8, 6) (NaN where invalid)
+             and a boolean mask of shape (N, 8).
+    """
+    T = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    a, d = model.a, model.d
+    a2, a3 = a[1], a[2]
+    d4, d6 = d[3], d[5]
+
+    R = T[:, :3, :3]
+    p = T[:, :3, 3]
+
+    # Shoulder: the wrist 2 origin (p05) must lie d4 away from the base Z axis -> 2 solutions of theta1
+    p05 = p - d6 * R[:, :, 2]
+    radius = np.hypot(p05[:, 0], p05[:, 1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shoulder_ratio = d4 / radius
+    valid = np.abs(shoulder_ratio) <= 1.0
+    psi = np.arccos(np.clip(shoulder_ratio, -1.0, 1.0))
+    phi = np.arctan2(p05[:, 1], p05[:, 0])
+    theta1 = phi[:, None] + np.stack([psi, -psi], axis=1) + math.pi / 2  # (N, 2)
+    s1, c1 = np.sin(theta1), np.cos(theta1)
+    valid = valid[:, None] & np.ones_like(theta1, dtype=bool)
+
+    # Wrist 2: projection of the flange position on the shoulder normal -> 2 solutions of theta5
+    wrist_ratio = (p[:, None, 0] * s1 - p[:, None, 1] * c1 - d4) / d6
+    valid &= np.abs(wrist_ratio) <= 1.0
+    acos5 = np.arccos(np.clip(wrist_ratio, -1.0, 1.0))
+    theta5 = np.stack([acos5, -acos5], axis=2)  # (N, 2, 2)
+    valid = np.repeat(valid[:, :, None], 2, axis=2)
+    s5 = np.sin(theta5)
+
+    # Wrist 3 from the orientation (arbitrary when sin(theta5) = 0, i.e. wrist singularity)
+    s1b, c1b = s1[:, :, None], c1[:, :, None]
+    sign5 = np.where(s5 < 0, -1.0, 1.0)
+    theta6 = np.arctan2(sign5 * (-R[:, None, None, 0, 1] * s1b + R[:, None, None, 1, 1] * c1b),
+                        sign5 * (R[:, None, None, 0, 0] * s1b - R[:, None, None, 1, 0] * c1b))
+    theta6 = np.where(np.abs(s5) < 1e-10, 0.0, theta6)
+
+    # Planar shoulder/elbow chain: T14 = inv(A1) T inv(A5 A6)
+    A1 = _link_transforms(theta1, model, 0)[:, :, None]
+    A5 = _link_transforms(theta5, model, 4)
+    A6 = _link_transforms(theta6, model, 5)
+    T14 = invert_poses(A1) @ T[:, None, None] @ invert_poses(A5 @ A6)  # (N, 2, 2, 4, 4)
+    p13 = T14[..., :3, 3] - d4 * T14[..., :3, 1]
+    p13_norm = np.linalg.norm(p13[..., :2], axis=-1)
+
+    elbow_ratio = (p13_norm ** 2 - a2 ** 2 - a3 ** 2) / (2 * a2 * a3)
+    valid &= np.abs(elbow_ratio) <= 1.0
+    acos3 = np.arccos(np.clip(elbow_ratio, -1.0, 1.0))
+    theta3 = np.stack([acos3, -acos3], axis=3)  # (N, 2, 2, 2)
+    valid = np.repeat(valid[..., None], 2, axis=3)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        elbow_sin = np.clip(a3 * np.sin(theta3) / p13_norm[..., None], -1.0, 1.0)
+    theta2 = -np.arctan2(p13[..., None, 1], -p13[..., None, 0]) + np.arcsin(elbow_sin)
+
+    # Wrist 1 closes the planar chain: A4 = inv(A2 A3) T14
+    A2 = _link_transforms(theta2, model, 1)
+    A3 = _link_transforms(theta3, model, 2)
+    A4 = invert_poses(A2 @ A3) @ T14[:, :, :, None]
+    theta4 = np.arctan2(A4[..., 1, 0], A4[..., 0, 0])
+
+    num_poses = T.shape[0]
+    shape = (num_poses, 2, 2, 2)
+    solutions = np.stack([
+        np.broadcast_to(theta1[:, :, None, None], shape),
+        theta2,
+        theta3,
+        theta4,
+        np.broadcast_to(theta5[:, :, :, None], shape),
+        np.broadcast_to(theta6[:, :, :, None], shape),
+    ], axis=-1).reshape(num_poses, 8, 6)
+    valid = valid.reshape(num_poses, 8)
+
+    solutions, within_limits = wrap_to_limits(solutions, model)
+    valid &= within_limits
+    solutions[~valid] = np.nan
+    return solutions, valid
+
+
+def closest_solution(solutions, valid, reference):
+    """
+    Pick the valid IK solution closest to a reference configuration for every pose.
+
+    :param solutions: Array of shape (N, K, 6) as returned by the IK solvers.
+    :param valid: Boolean mask of shape (N, K).
+    :param reference: Reference joints in radians, shape (6,) or (N, 6).
+    :return: Tuple (joints of shape (N, 6), boolean mask of shape (N,) that is False where no solution exists).
+    """
+    reference = np.broadcast_to(np.asarray(reference, dtype=float), (solutions.shape[0], 6))
+    distance = np.abs(np.nan_to_num(solutions, nan=0.0) - reference[:, None, :]).max(axis=2)
+    distance = np.where(valid, distance, np.inf)
+    best = np.argmin(distance, axis=1)
+    joints = solutions[np.arange(solutions.shape[0]), best]
+    return joints, valid.any(axis=1)
+
+
+def spherical_wrist_inverse_kinematics(poses, model):
+    """
+    Closed-form inverse kinematics of an arm with a spherical wrist (position/orientation decoupling).
+
+    The wrist centre fixes joints 1-3 (2 shoulder x 2 elbow solutions) and the remaining
+    orientation R36 = Rz(q4) Ry(-q5) Rz(q6) fixes the wrist (2 solutions), giving eight in total.
+
+    :param poses: Flange poses in the robot base frame, shape (N, 4, 4) or (4, 4).
+    :param model: A DHModel with a spherical wrist (e.g. the COMAU NJ 60-2.2).
+    :return: Tuple (solutions, valid): solutions in radians with shape (N, 8, 6) (NaN where invalid)
+             and a boolean mask of shape (N, 8).
+    """
+    T = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    a, d = model.a, model.d
+    a2, a3 = a[1], a[2]
+    d1, d4, d6 = d[0], d[3], d[5]
+
+    R = T[:, :3, :3]
+    wrist_centre = T[:, :3, 3] - d6 * R[:, :, 2]
+
+    # Shoulder: the wrist centre lies d4 off the plane of the arm -> 2 solutions of theta1
+    radius = np.hypot(wrist_centre[:, 0], wrist_centre[:, 1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shoulder_ratio = d4 / radius
+    valid = np.abs(shoulder_ratio) <= 1.0
+    offset = np.arcsin(np.clip(shoulder_ratio, -1.0, 1.0))
+    phi = np.arctan2(wrist_centre[:, 1], wrist_centre[:, 0])
+    theta1 = phi[:, None] + np.stack([offset, math.pi - offset], axis=1)  # (N, 2)
+    valid = np.repeat(valid[:, None], 2, axis=1)
+
+    # Elbow: planar 2R chain in the arm plane -> 2 solutions of theta3
+    reach = wrist_centre[:, None, 0] * np.cos(theta1) + wrist_centre[:, None, 1] * np.sin(theta1)
+    height = wrist_centre[:, None, 2] - d1
+    elbow_ratio = (reach ** 2 + height ** 2 - a2 ** 2 - a3 ** 2) / (2 * a2 * a3)
+    valid &= np.abs(elbow_ratio) <= 1.0
+    acos3 = np.arccos(np.clip(elbow_ratio, -1.0, 1.0))
+    theta3 = np.stack([acos3, -acos3], axis=2)  # (N, 2, 2)
+    theta2 = (np.arctan2(height, reach)[:, :, None]
+              - np.arctan2(a3 * np.sin(theta3), a2 + a3 * np.cos(theta3)))
+    valid = np.repeat(valid[:, :, None], 2, axis=2)
+
+    # Wrist orientation relative to frame 3
+    theta1_b = np.broadcast_to(theta1[:, :, None], theta3.shape)
+    A1 = _link_transforms(theta1_b, model, 0)
+    A2 = _link_transforms(theta2, model, 1)
+    A3 = _link_transforms(theta3, model, 2)
+    R03 = (A1 @ A2 @ A3)[..., :3, :3]
+    R36 = np.swapaxes(R03, -1, -2) @ R[:, None, None]  # (N, 2, 2, 3, 3)
+
+    acos5 = np.arccos(np.clip(R36[..., 2, 2], -1.0, 1.0))
+    theta5 = np.stack([acos5, -acos5], axis=3)  # (N, 2, 2, 2)
+    s5 = np.sin(theta5)
+    sign5 = np.where(s5 < 0, -1.0, 1.0)
+    R36 = R36[:, :, :, None]
+    theta4 = np.arctan2(-sign5 * R36[..., 1, 2], -sign5 * R36[..., 0, 2])
+    theta6 = np.arctan2(-sign5 * R36[..., 2, 1], sign5 * R36[..., 2, 0])
+
+    # Wrist singularity (q5 = 0 or 180 degrees): only q4 + q6 is defined, keep q4 = 0
+    singular = np.abs(s5) < 1e-10
+    theta6_singular = np.where(R36[..., 2, 2] > 0,
+                               np.arctan2(R36[..., 1, 0], R36[..., 0, 0]),
+                               np.arctan2(R36[..., 0, 1], -R36[..., 0, 0]))
+    theta4 = np.where(singular, 0.0, theta4)
+    theta6 = np.where(singular, theta6_singular, theta6)
+
+    num_poses = T.shape[0]
+    shape = (num_poses, 2, 2, 2)
+    solutions = np.stack([
+        np.broadcast_to(theta1[:, :, None, None], shape),
+        np.broadcast_to(theta2[:, :, :, None], shape),
+        np.broadcast_to(theta3[:, :, :, None], shape),
+        theta4,
+        theta5,
+        theta6,
+    ], axis=-1).reshape(num_poses, 8, 6)
+    valid = np.repeat(valid[..., None], 2, axis=3).reshape(num_poses, 8)
+
+    solutions, within_limits = wrap_to_limits(solutions, model)
+    valid &= within_limits
+    solutions[~valid] = np.nan
+    return solutions, valid
+
+
+def inverse_kinematics(poses, model):
+    """
+    Closed-form inverse kinematics with the solver that matches the model.
+
+    :param poses: Flange poses in the robot base frame, shape (N, 4, 4) or (4, 4).
+    :param model: The DHModel of the robot.
+    :return: Tuple (solutions of shape (N, 8, 6), valid mask of shape (N, 8)).
+    """
+    if model.ik_solver == "spherical_wrist":
+        return spherical_wrist_inverse_kinematics(poses, model)
+    return ur5_inverse_kinematics(poses, model)
+
+
+def jacobian(joints, model):
+    """
+    Geometric Jacobian of the flange for a batch of configurations (base frame).
+
+    :param joints: Joint angles in radians, shape (N, 6) or (6,).
+    :param model: The DHModel of the robot.
+    :return: Array of shape (N, 6, 6); rows 0-2 are linear velocity (mm/rad), rows 3-5 angular velocity.
+    """
+    frames = forward_kinematics(joints, model)
+    axes = frames[:, :6, :3, 2]  # joint i rotates about the Z axis of frame i-1
+    origins = frames[:, :6, :3, 3]
+    flange = frames[:, 6, :3, 3]
+
+    J = np.empty((frames.shape[0], 6, 6))
+    J[:, :3, :] = np.swapaxes(np.cross(axes, flange[:, None, :] - origins), 1, 2)
+    J[:, 3:, :] = np.swapaxes(axes, 1, 2)
+    return J
+
+
+def manipulability(joints, model):
+    """
+    Translational manipulability index (Yoshikawa) for a batch of configurations.
+
+    :param joints: Joint angles in radians, shape (N, 6) or (6,).
+    :param model: The DHModel of the robot.
+    :return: Array of shape (N,) with sqrt(det(Jv Jv^T)) divided by reach^3, so 0 at a singularity
+             and comparable between robots of different size.
+    """
+    J = jacobian(joints, model)[:, :3, :]
+    determinant = np.linalg.det(J @ np.swapaxes(J, 1, 2))
+    return np.sqrt(np.maximum(determinant, 0.0)) / model.reach ** 3
+
+
+def jacobian_singular_values(joints, model, rotation_scale=1000.0):
+    """
+    Singular values of the flange Jacobian for a batch of configurations.
+
+    :param joints: Joint angles in radians, shape (N, 6) or (6,).
+    :param model: The DHModel of the robot.
+    :param rotation_scale: Length in millimeters that weights the angular rows against the linear rows.
+    :return: Array of shape (N, 6), largest singular value first.
+    """
+    J = jacobian(joints, model)
+    J[:, 3:, :] *= rotation_scale
+    return np.linalg.svd(J, compute_uv=False)
+
+
+def inverse_condition_number(joints, model, rotation_scale=1000.0):
+    """
+    Ratio of the smallest to the largest Jacobian singular value (1 = isotropic, 0 = singular).
+
+    :param joints: Joint angles in radians, shape (N, 6) or (6,).
+    :param model: The DHModel of the robot.
+    :param rotation_scale: Length in millimeters that weights the angular rows against the linear rows.
+    :return: Array of shape (N,).
+    """
+    singular_values = jacobian_singular_values(joints, model, rotation_scale)
+    return singular_values[:, -1] / singular_values[:, 0]
+
+
+def _pose_error(current, target):
+    """Position error and rotation-vector orientation error (base frame) between batches of poses."""
+    position_error = target[:, :3, 3] - current[:, :3, 3]
+    R_error = target[:, :3, :3] @ np.swapaxes(current[:, :3, :3], 1, 2)
+    cos_angle = np.clip((np.trace(R_error, axis1=1, axis2=2) - 1) / 2, -1.0, 1.0)
+    angle = np.arccos(cos_angle)
+    axis = np.stack([R_error[:, 2, 1] - R_error[:, 1, 2],
+                     R_error[:, 0, 2] - R_error[:, 2, 0],
+                     R_error[:, 1, 0] - R_error[:, 0, 1]], axis=1)
+    sin_angle = np.sin(angle)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(sin_angle > 1e-9, angle / (2 * sin_angle), 0.5)
+    return np.concatenate([position_error, axis * scale[:, None]], axis=1)
+
+
+def damped_least_squares_ik(poses, initial_joints, model, damping=10.0, max_iterations=100,
+                            position_tolerance=0.01, rotation_tolerance=1e-4, rotation_scale=1000.0):
+    """
+    Iterative IK refinement with damped least squares, run for all poses in lockstep.
+
+    :param poses: Flange poses in the robot base frame, shape (N, 4, 4).
+    :param initial_joints: Warm start in radians, shape (N, 6).
+    :param model: The DHModel of the robot.
+    :param damping: Damping factor (lambda) in mm; larger values trade speed for stability near singularities.
+    :param max_iterations: Maximum number of iterations.
+    :param position_tolerance: Convergence tolerance on position in millimeters.
+    :param rotation_tolerance: Convergence tolerance on orientation in radians.
+    :param rotation_scale: Length in millimeters that weights orientation rows against position rows.
+    :return: Tuple (joints of shape (N, 6), boolean mask of shape (N,) that is True where the pose was reached).
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    joints = np.array(initial_joints, dtype=float).reshape(-1, 6)
+    lower = model.joint_limits[:, 0]
+    upper = model.joint_limits[:, 1]
+    converged = np.zeros(len(poses), dtype=bool)
+    active = np.arange(len(poses))
+    weights = np.array([1.0, 1.0, 1.0, rotation_scale, rotation_scale, rotation_scale])
+
+    for _ in range(max_iterations):
+        if active.size == 0:
+            break
+        current = forward_kinematics(joints[active], model)[:, -1]
+        error = _pose_error(current, poses[active])
+        done = ((np.linalg.norm(error[:, :3], axis=1) < position_tolerance)
+                & (np.linalg.norm(error[:, 3:], axis=1) < rotation_tolerance))
+        converged[active[done]] = True
+        active = active[~done]
+        error = error[~done]
+        if active.size == 0:
+            break
+
+        # dq = J^T (J J^T + lambda^2 I)^-1 e, with orientation rows scaled to millimeters
+        J = jacobian(joints[active], model) * weights[:, None]
+        JJt = J @ np.swapaxes(J, 1, 2) + (damping ** 2) * np.eye(6)
+        step = np.einsum('nji,nj->ni', J, np.linalg.solve(JJt, (error * weights)[:, :, None])[:, :, 0])
+        joints[active] = np.clip(joints[active] + step, lower, upper)
+
+    return joints, converged
+
+
+def solve_target_sequence(poses, model, reference=None, refine=True, cache=None):
+    """
+    Solve an ordered list of targets: closed-form IK first, damped least squares as fallback.
+
+    Each target takes the closed-form solution closest to the reference configuration. Targets
+    without a closed-form solution are refined with damped least squares, warm-started from the
+    solution of the last solved target before them (or the reference for the first ones).
+
+    :param poses: Flange poses in the robot base frame, shape (N, 4, 4).
+    :param model: The DHModel of the robot.
+    :param reference: Reference joints in radians, shape (6,). Defaults to all zeros.
+    :param refine: Set to False to skip the damped least squares fallback.
+    :param cache: Optional KinematicsCache used for the closed-form solutions.
+    :return: Tuple (joints of shape (N, 6), reachable mask of shape (N,), refined mask of shape (N,)).
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    reference = np.zeros(6) if reference is None else np.asarray(reference, dtype=float)
+
+    if cache is not None:
+        solutions, valid = cache.inverse(poses, model)
+    else:
+        solutions, valid = inverse_kinematics(poses, model)
+    joints, reachable = closest_solution(solutions, valid, reference)
+    refined = np.zeros(len(poses), dtype=bool)
+
+    failed = np.flatnonzero(~reachable)
+    if refine and failed.size:
+        # Index of the last closed-form solved target before each failed one (-1 if none)
+        solved_index = np.where(reachable, np.arange(len(poses)), -1)
+        previous = np.maximum.accumulate(solved_index)[failed]
+        warm_start = np.where(previous[:, None] >= 0, joints[np.maximum(previous, 0)], reference)
+
+        refined_joints, converged = damped_least_squares_ik(poses[failed], warm_start, model)
+        joints[failed] = np.where(converged[:, None], refined_joints, np.nan)
+        reachable[failed] = converged
+        refined[failed] = converged
+
+    return joints, reachable, refined
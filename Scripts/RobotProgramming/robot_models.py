@@ -0,0 +1,84 @@
+import os
+import json
+import numpy as np
+from robot_kinematics import DHModel
+
+# Robot model registry. DH tables and joint limits are defined in robot_models.json (next to this file) and
+# loaded once per Python session; adding an arm only means adding an entry there (or calling register_model).
+# Robots are looked up by exact name: a renamed copy in RoboDK needs its name in the entry's "aliases".
+
+MODELS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "robot_models.json")
+
+_models = {}
+_aliases = {}  # alias -> model name
+_loaded = False
+
+
+def register_model(model, aliases=()):
+    """
+    Add a model to the registry (replaces a model with the same name).
+
+    :param model: A DHModel.
+    :param aliases: Other robot names that use this model.
+    :return: The registered model.
+    """
+    _models[model.name] = model
+    for alias in aliases:
+        _aliases[alias] = model.name
+    return model
+
+
+def _radians_or_none(values):
+    return np.radians(values) if values is not None else None
+
+
+def load_models(path=MODELS_FILE):
+    """
+    Load and register all robots of a model file.
+
+    :param path: Path of a JSON file with a "robots" list (lengths in millimeters, angles in degrees).
+    :return: List of the registered DHModel objects.
+    """
+    with open(path, "r") as file:
+        definitions = json.load(file)["robots"]
+
+    models = []
+    for definition in definitions:
+        model = DHModel(
+            definition["name"],
+            a=definition["a"],
+            d=definition["d"],
+            alpha=np.radians(definition["alpha"]),
+            joint_limits=_radians_or_none(definition.get("joint_limits")),
+            ik_solver=definition.get("ik_solver", "ur"),
+            joint_speeds=_radians_or_none(definition.get("joint_speeds")),
+            joint_accelerations=_radians_or_none(definition.get("joint_accelerations")),
+            link_radii=definition.get("link_radii"),
+        )
+        models.append(register_model(model, definition.get("aliases", [])))
+    return models
+
+
+def _ensure_loaded():
+    global _loaded
+    if not _loaded:
+        load_models()
+        _loaded = True
+
+
+def get_model(robot_name):
+    """
+    Find the model of a RoboDK robot by name.
+
+    :param robot_name: The robot name in RoboDK (e.g., "UR5" or "COMAU NJ 60-2.2"), or one of the model's aliases.
+                       Names are matched exactly: "UR5e" or "UR5 (2)" are other arms unless listed as aliases.
+    :return: The matching DHModel, or None if the robot is unknown.
+    """
+    _ensure_loaded()
+    return _models.get(_aliases.get(robot_name, robot_name))
+
+
+def model_names():
+    """Names of all registered models."""
+    _ensure_loaded()
+    return list(_models)
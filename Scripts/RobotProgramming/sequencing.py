@@ -0,0 +1,195 @@
+import numpy as np
+
+# Travel-time ordering of targets inside precedence groups. Consecutive targets with the same group label
+# (e.g. one assembly step of Trussemble) may be visited in any order; the groups themselves keep their order.
+# Within a group the path is built by nearest neighbour and improved by 2-opt and Or-opt moves, each round
+# evaluating all candidate moves at once on the joint-space travel-time matrix.
+
+DEFAULT_JOINT_SPEEDS = np.radians([180, 180, 180, 180, 180, 180])  # rad/s, UR5 maximum joint speeds
+
+
+def travel_time_matrix(joints_a, joints_b, joint_speeds=DEFAULT_JOINT_SPEEDS):
+    """
+    Travel time of synchronized joint moves: the slowest joint decides.
+
+    :param joints_a: Joint angles in radians, shape (N, 6).
+    :param joints_b: Joint angles in radians, shape (M, 6).
+    :param joint_speeds: Maximum speed per joint in rad/s, shape (6,).
+    :return: Array of shape (N, M) in seconds.
+    """
+    difference = np.abs(np.asarray(joints_a)[:, None, :] - np.asarray(joints_b)[None, :, :])
+    return (difference / np.asarray(joint_speeds)).max(axis=2)
+
+
+def sequence_time(joints, start_joints, joint_speeds=DEFAULT_JOINT_SPEEDS):
+    """
+    Joint travel time of visiting configurations in the given order.
+
+    :param joints: Joint angles in radians, shape (N, 6).
+    :param start_joints: Joints in radians before the first configuration, shape (6,).
+    :param joint_speeds: Maximum speed per joint in rad/s, shape (6,).
+    :return: Seconds.
+    """
+    path = np.vstack([np.asarray(start_joints, dtype=float)[None], np.asarray(joints, dtype=float).reshape(-1, 6)])
+    return float((np.abs(np.diff(path, axis=0)) / np.asarray(joint_speeds)).max(axis=1).sum())
+
+
+def _nearest_neighbour(start_time, times):
+    count = len(start_time)
+    visited = np.zeros(count, dtype=bool)
+    order = np.empty(count, dtype=int)
+    current_times = start_time
+    for position in range(count):
+        node = int(np.argmin(np.where(visited, np.inf, current_times)))
+        order[position] = node
+        visited[node] = True
+        current_times = times[node]
+    return order
+
+
+def _leg_costs(order, start_time, times):
+    """Cost of the leg arriving at every position of the path (the first one from the start)."""
+    return np.concatenate([[start_time[order[0]]], times[order[:-1], order[1:]]])
+
+
+def _two_opt(order, start_time, times):
+    """Best segment reversal of the open path, or None if none improves it."""
+    n = len(order)
+    if n < 3:
+        return None
+    legs = _leg_costs(order, start_time, times)
+    # Predecessor cost row of every position (the start for position 0)
+    before = np.vstack([start_time[order][None, :], times[order[:-1]][:, order]])  # before[i, k]: pred of i -> node k
+    i, j = np.triu_indices(n, 1)
+    # Reversing positions i..j: arrive at order[j] from pred of i, leave order[i] to the successor of j
+    new_in = before[i, j]
+    old_in = legs[i]
+    successor = np.minimum(j + 1, n - 1)
+    has_successor = j + 1 < n
+    new_out = np.where(has_successor, times[order[i], order[successor]], 0.0)
+    old_out = np.where(has_successor, legs[successor], 0.0)
+    delta = new_in + new_out - old_in - old_out
+    best = int(np.argmin(delta))
+    if delta[best] >= -1e-9:
+        return None
+    a, b = i[best], j[best]
+    return np.concatenate([order[:a], order[a:b + 1][::-1], order[b + 1:]])
+
+
+def _or_opt(order, start_time, times, max_length=3):
+    """Best move of a segment of 1 to max_length nodes to another gap of the path, or None."""
+    n = len(order)
+    legs = _leg_costs(order, start_time, times)
+    gaps = np.arange(0, n + 1)  # gap p lies between positions p - 1 and p (0: after the start, n: at the end)
+    into_gap = np.concatenate([[0.0], legs[1:], [0.0]])  # leg broken by inserting into each gap
+    into_gap[0] = legs[0]
+    best_delta, best_order = -1e-9, None
+
+    for length in range(1, min(max_length, n - 1) + 1):
+        starts = np.arange(0, n - length + 1)
+        ends = starts + length - 1
+        head = order[starts]
+        tail = order[ends]
+
+        # Taking the segment out: its in and out legs are replaced by a bridge from predecessor to successor
+        has_successor = ends + 1 < n
+        successor = order[np.minimum(ends + 1, n - 1)]
+        bridge = np.where(starts > 0, times[order[np.maximum(starts - 1, 0)], successor], start_time[successor])
+        out_leg = legs[np.minimum(ends + 1, n - 1)]
+        removal = np.where(has_successor, bridge - out_leg, 0.0) - legs[starts]
+
+        # Putting it into gap p: the leg of the gap is replaced by legs into the head and out of the tail
+        arrive = np.where(gaps[None, :] > 0, times[order[np.maximum(gaps - 1, 0)]][:, head].T, start_time[head][:, None])
+        leave = np.where(gaps[None, :] < n, times[tail][:, order[np.minimum(gaps, n - 1)]], 0.0)
+        insertion = arrive + leave - into_gap[None, :]
+
+        # Gaps next to or inside the segment give the same path
+        allowed = (gaps[None, :] < starts[:, None]) | (gaps[None, :] > ends[:, None] + 1)
+        delta = np.where(allowed, removal[:, None] + insertion, np.inf)
+        index = np.unravel_index(int(np.argmin(delta)), delta.shape)
+        if delta[index] < best_delta:
+            best_delta = delta[index]
+            first, gap = starts[index[0]], gaps[index[1]]
+            segment = order[first:first + length]
+            rest = np.concatenate([order[:first], order[first + length:]])
+            position = gap if gap < first else gap - length
+            best_order = np.concatenate([rest[:position], segment, rest[position:]])
+    return best_order
+
+
+def optimize_path(start_time, times, max_rounds=1000):
+    """
+    Open path through all nodes from a fixed start: nearest neighbour, then 2-opt and Or-opt until no move
+    improves it.
+
+    :param start_time: Travel time from the start to every node, shape (n,).
+    :param times: Travel times between the nodes, shape (n, n).
+    :param max_rounds: Upper bound on improvement rounds.
+    :return: Node order, shape (n,).
+    """
+    order = _nearest_neighbour(start_time, times)
+    for _ in range(max_rounds):
+        improved = _two_opt(order, start_time, times)
+        if improved is None:
+            improved = _or_opt(order, start_time, times)
+        if improved is None:
+            break
+        order = improved
+    return order
+
+
+def precedence_groups(labels):
+    """
+    Split targets into runs of equal labels.
+
+    :param labels: Group label per target, in assembly order.
+    :return: List of index arrays, one per run.
+    """
+    labels = list(labels)
+    boundaries = [0] + [i for i in range(1, len(labels)) if labels[i] != labels[i - 1]] + [len(labels)]
+    return [np.arange(boundaries[k], boundaries[k + 1]) for k in range(len(boundaries) - 1)]
+
+
+class SequencingResult:
+    """Visiting order of the targets and the joint travel time before and after reordering."""
+
+    def __init__(self, order, original_time, optimized_time):
+        self.order = order
+        self.original_time = original_time
+        self.optimized_time = optimized_time
+
+    @property
+    def saving(self):
+        return self.original_time - self.optimized_time
+
+    def summary(self):
+        percent = 100.0 * self.saving / self.original_time if self.original_time > 0 else 0.0
+        return (f"Joint travel {self.original_time:.2f} s -> {self.optimized_time:.2f} s "
+                f"({self.saving:.2f} s, {percent:.1f}% saved)")
+
+
+def order_targets(joints, labels, start_joints, joint_speeds=DEFAULT_JOINT_SPEEDS):
+    """
+    Reorder targets inside their precedence groups to minimize the joint travel time.
+
+    :param joints: Joint solution per target in radians, shape (N, 6).
+    :param labels: Group label per target; only consecutive targets with the same label are reordered.
+    :param start_joints: Joints in radians before the first target (e.g. home), shape (6,).
+    :param joint_speeds: Maximum speed per joint in rad/s.
+    :return: A SequencingResult.
+    """
+    joints = np.asarray(joints, dtype=float).reshape(-1, 6)
+    start = np.asarray(start_joints, dtype=float)
+    original_time = sequence_time(joints, start, joint_speeds)
+
+    order = []
+    current = start
+    for group in precedence_groups(labels):
+        start_time = travel_time_matrix(current[None], joints[group], joint_speeds)[0]
+        times = travel_time_matrix(joints[group], joints[group], joint_speeds)
+        group_order = group[optimize_path(start_time, times)]
+        order.extend(group_order.tolist())
+        current = joints[group_order[-1]]
+    order = np.array(order, dtype=int)
+    optimized_time = sequence_time(joints[order], start, joint_speeds)
+    return SequencingResult(order, original_time, optimized_time)
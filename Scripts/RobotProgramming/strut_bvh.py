@@ -0,0 +1,397 @@
+import time
+import argparse
+import numpy as np
+from capsule_collision import segment_distances
+
+# Bounding-volume hierarchy over the struts of a growing truss. Struts are capsules (axis segment + radius) in
+# the leaves of a dynamic AABB tree: every insertion walks down the cheapest branch by surface area and
+# rebalances its ancestors with AVL rotations, so the tree stays O(log n) deep while the assembly grows one
+# node at a time. Queries run for a whole batch of segments at once: the traversal keeps a frontier of
+# (query, node) pairs and expands one tree level per step with array operations, the exact capsule distances
+# only run on the leaves that survive the box tests.
+#
+# Benchmark:  python strut_bvh.py --struts 100000 --queries 1000
+
+NULL = -1
+
+
+def _area(box):
+    """Half the surface area of a box [x0, y0, z0, x1, y1, z1]."""
+    dx, dy, dz = box[3] - box[0], box[4] - box[1], box[5] - box[2]
+    return dx * dy + dy * dz + dz * dx
+
+
+def _union(a, b):
+    # Conditional expressions instead of min/max: this runs a few dozen times per insertion
+    return [a[0] if a[0] < b[0] else b[0], a[1] if a[1] < b[1] else b[1], a[2] if a[2] < b[2] else b[2],
+            a[3] if a[3] > b[3] else b[3], a[4] if a[4] > b[4] else b[4], a[5] if a[5] > b[5] else b[5]]
+
+
+def _box_distances(points, lower, upper):
+    """Distance of every point to its box (0 inside), rows of shape (K, 3)."""
+    return np.linalg.norm(np.maximum(np.maximum(lower - points, points - upper), 0.0), axis=1)
+
+
+class StrutBVH:
+    """Dynamic AABB tree over capsule struts with batched distance queries."""
+
+    def __init__(self):
+        # Tree topology and boxes as Python lists: insertions touch O(log n) nodes one at a time
+        self._boxes = []
+        self._left = []
+        self._right = []
+        self._parent = []
+        self._height = []
+        self._strut = []  # strut index of a leaf, NULL for internal nodes
+        self._root = NULL
+        # Strut geometry, the first _count rows are used
+        self._starts = np.zeros((0, 3))
+        self._ends = np.zeros((0, 3))
+        self._radii = np.zeros(0)
+        self._count = 0
+        # Array copies of the tree for the queries, refreshed for the nodes changed since the last query
+        self._dirty = set()
+        self._arrays = None
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def height(self):
+        """Levels below the root (0 for a single strut)."""
+        return self._height[self._root] if self._root != NULL else 0
+
+    def struts(self, indices=None):
+        """Start points, end points and radii of the given struts (all struts by default)."""
+        indices = slice(0, self._count) if indices is None else indices
+        return self._starts[indices], self._ends[indices], self._radii[indices]
+
+    def _new_node(self, box, strut=NULL):
+        self._boxes.append(box)
+        self._left.append(NULL)
+        self._right.append(NULL)
+        self._parent.append(NULL)
+        self._height.append(0)
+        self._strut.append(strut)
+        self._dirty.add(len(self._boxes) - 1)
+        return len(self._boxes) - 1
+
+    def insert(self, starts, ends, radii=0.0):
+        """
+        Add struts to the tree.
+
+        :param starts: Strut end points, shape (K, 3) or (3,).
+        :param ends: Other strut end points, same shape.
+        :param radii: Strut radius in millimeters, scalar or shape (K,).
+        :return: Indices of the new struts, shape (K,).
+        """
+        starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 3)
+        radii = np.broadcast_to(np.asarray(radii, dtype=float), (len(starts),))
+        first = self._count
+        self._count += len(starts)
+        if self._count > len(self._radii):  # grow the strut storage by doubling, not on every insertion
+            capacity = max(16, 2 * self._count)
+            self._starts = np.resize(self._starts, (capacity, 3))
+            self._ends = np.resize(self._ends, (capacity, 3))
+            self._radii = np.resize(self._radii, capacity)
+        self._starts[first:self._count] = starts
+        self._ends[first:self._count] = ends
+        self._radii[first:self._count] = radii
+
+        boxes = np.hstack([np.minimum(starts, ends) - radii[:, None], np.maximum(starts, ends) + radii[:, None]])
+        for offset, box in enumerate(boxes.tolist()):
+            self._insert_leaf(self._new_node(box, first + offset))
+        return np.arange(first, self._count)
+
+    def _insert_leaf(self, leaf):
+        if self._root == NULL:
+            self._root = leaf
+            return
+        boxes, left, right = self._boxes, self._left, self._right
+        box = boxes[leaf]
+
+        # Cheapest sibling: growing a subtree costs its added area at every level above it
+        index = self._root
+        while left[index] != NULL:
+            area = _area(boxes[index])
+            combined = _area(_union(boxes[index], box))
+            cost = 2.0 * combined  # new parent of this node and the leaf
+            inheritance = 2.0 * (combined - area)
+            child_costs = []
+            for child in (left[index], right[index]):
+                grown = _area(_union(boxes[child], box))
+                child_costs.append(grown + inheritance if left[child] == NULL else grown - _area(boxes[child]) + inheritance)
+            if cost < child_costs[0] and cost < child_costs[1]:
+                break
+            index = left[index] if child_costs[0] < child_costs[1] else right[index]
+
+        # New parent of the sibling and the leaf
+        sibling = index
+        old_parent = self._parent[sibling]
+        parent = self._new_node(_union(boxes[sibling], box))
+        self._parent[parent] = old_parent
+        self._height[parent] = self._height[sibling] + 1
+        if old_parent == NULL:
+            self._root = parent
+        elif left[old_parent] == sibling:
+            left[old_parent] = parent
+        else:
+            right[old_parent] = parent
+        left[parent], right[parent] = sibling, leaf
+        self._parent[sibling] = self._parent[leaf] = parent
+        self._dirty.update((sibling, leaf, old_parent))
+
+        # Refit and rebalance up to the root
+        index = parent
+        while index != NULL:
+            index = self._balance(index)
+            a, b = left[index], right[index]
+            self._height[index] = 1 + max(self._height[a], self._height[b])
+            boxes[index] = _union(boxes[a], boxes[b])
+            self._dirty.add(index)
+            index = self._parent[index]
+
+    def _balance(self, a):
+        """AVL rotation at node a if its subtrees differ by more than one level; returns the node now in its place."""
+        left, right, parent, height, boxes = self._left, self._right, self._parent, self._height, self._boxes
+        if left[a] == NULL or height[a] < 2:
+            return a
+        b, c = left[a], right[a]
+        imbalance = height[c] - height[b]
+        if -1 <= imbalance <= 1:
+            return a
+
+        # Promote the taller child; its taller grandchild stays with it, the other one moves under a
+        up = c if imbalance > 1 else b
+        kept = b if imbalance > 1 else c
+        f, g = left[up], right[up]
+        high, low = (f, g) if height[f] > height[g] else (g, f)
+
+        left[up] = a
+        parent[up] = parent[a]
+        parent[a] = up
+        if parent[up] == NULL:
+            self._root = up
+        elif left[parent[up]] == a:
+            left[parent[up]] = up
+        else:
+            right[parent[up]] = up
+
+        right[up] = high
+        if imbalance > 1:
+            right[a] = low
+        else:
+            left[a] = low
+        parent[low] = a
+        boxes[a] = _union(boxes[kept], boxes[low])
+        boxes[up] = _union(boxes[a], boxes[high])
+        height[a] = 1 + max(height[kept], height[low])
+        height[up] = 1 + max(height[a], height[high])
+        self._dirty.update((a, up, low, high, parent[up]))
+        return up
+
+    def _tree_arrays(self):
+        """Boxes, children and leaf struts as arrays, copying only the nodes changed since the last query."""
+        size = len(self._boxes)
+        if self._arrays is None or len(self._arrays[0]) < size:
+            capacity = max(16, 2 * size)
+            arrays = (np.zeros((capacity, 6)), np.full(capacity, NULL), np.full(capacity, NULL), np.full(capacity, NULL))
+            if self._arrays is not None:
+                for new, old in zip(arrays, self._arrays):
+                    new[:len(old)] = old
+            self._arrays = arrays
+        self._dirty.discard(NULL)
+        if self._dirty:
+            changed = np.fromiter(self._dirty, dtype=int)
+            boxes, left, right, strut = self._arrays
+            boxes[changed] = [self._boxes[i] for i in changed]
+            left[changed] = [self._left[i] for i in changed]
+            right[changed] = [self._right[i] for i in changed]
+            strut[changed] = [self._strut[i] for i in changed]
+            self._dirty.clear()
+        return self._arrays
+
+    def _leaf_pairs(self, lower, upper, centers, reach):
+        """
+        Struts whose leaf box overlaps the query box and lies within reach of the query centre.
+
+        :return: Tuple (query indices, strut indices) of the candidate pairs.
+        """
+        query = np.arange(len(lower))
+        if self._root == NULL or not len(query):
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        boxes, left, right, strut = self._tree_arrays()
+        nodes = np.full(len(query), self._root)
+        found_queries, found_struts = [], []
+        while len(query):
+            node_boxes = boxes[nodes]
+            keep = ((lower[query] <= node_boxes[:, 3:]).all(axis=1) & (node_boxes[:, :3] <= upper[query]).all(axis=1)
+                    & (_box_distances(centers[query], node_boxes[:, :3], node_boxes[:, 3:]) <= reach[query]))
+            query, nodes = query[keep], nodes[keep]
+            leaf = strut[nodes] >= 0
+            found_queries.append(query[leaf])
+            found_struts.append(strut[nodes[leaf]])
+            inner = nodes[~leaf]
+            query = np.concatenate([query[~leaf], query[~leaf]])
+            nodes = np.concatenate([left[inner], right[inner]])
+        return np.concatenate(found_queries), np.concatenate(found_struts)
+
+    def _surface_distances(self, query, struts, starts, ends, radii):
+        return (segment_distances(starts[query], ends[query], self._starts[struts], self._ends[struts])
+                - radii[query] - self._radii[struts])
+
+    def within(self, starts, ends, radii=0.0, clearance=0.0):
+        """
+        Struts closer than a clearance to each query capsule.
+
+        :param starts: Query segment starts, shape (Q, 3).
+        :param ends: Query segment ends, shape (Q, 3).
+        :param radii: Query capsule radius in millimeters, scalar or shape (Q,).
+        :param clearance: Surface distance in millimeters up to which a strut is reported.
+        :return: Tuple (query indices, strut indices, surface distances), sorted by query.
+        """
+        starts, ends, radii = _queries(starts, ends, radii)
+        reach = radii + clearance
+        centers = 0.5 * (starts + ends)
+        query, struts = self._leaf_pairs(np.minimum(starts, ends) - reach[:, None], np.maximum(starts, ends) + reach[:, None],
+                                         centers, 0.5 * np.linalg.norm(ends - starts, axis=1) + reach)
+        distances = self._surface_distances(query, struts, starts, ends, radii)
+        close = distances <= clearance
+        order = np.argsort(query[close], kind="stable")
+        return query[close][order], struts[close][order], distances[close][order]
+
+    def nearest(self, starts, ends, radii=0.0, max_distance=np.inf):
+        """
+        Closest strut to each query capsule.
+
+        Radius search that doubles the radius for the queries without a hit yet, starting from the mean strut
+        spacing; the first radius with hits contains the nearest strut, so the result is exact.
+
+        :param starts: Query segment starts, shape (Q, 3).
+        :param ends: Query segment ends, shape (Q, 3).
+        :param radii: Query capsule radius in millimeters, scalar or shape (Q,).
+        :param max_distance: Struts further away than this are not reported.
+        :return: Tuple (strut indices, surface distances), -1 and inf where no strut is within max_distance.
+        """
+        starts, ends, radii = _queries(starts, ends, radii)
+        best_strut = np.full(len(starts), NULL)
+        best = np.full(len(starts), np.inf)
+        if self._root == NULL:
+            return best_strut, best
+        root = np.array(self._boxes[self._root])
+        spacing = float(np.prod(np.maximum(root[3:] - root[:3], 1.0))) ** (1.0 / 3.0) / max(1.0, len(self) ** (1.0 / 3.0))
+        reach = min(spacing, max_distance)
+        remaining = np.arange(len(starts))
+        while remaining.size:
+            query, struts, distances = self.within(starts[remaining], ends[remaining], radii[remaining], reach)
+            # Smallest distance per query (within() sorts by query)
+            order = np.lexsort((distances, query))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = query[order][1:] != query[order][:-1]
+            hits = remaining[query[order][first]]
+            best[hits] = distances[order][first]
+            best_strut[hits] = struts[order][first]
+            remaining = remaining[best_strut[remaining] < 0]
+            if reach >= max_distance:
+                break
+            reach = min(2.0 * reach, max_distance)
+        return best_strut, best
+
+    def swept(self, starts0, ends0, starts1, ends1, radii=0.0, clearance=0.0, steps=8):
+        """
+        Struts hit by query capsules moving linearly from one segment to another (e.g. a strut carried in).
+
+        The sweep is sampled at steps + 1 positions. No point of the capsule moves further than the largest
+        end point displacement per step, so between two samples the distance cannot drop below their mean
+        minus half that displacement. Every strut the swept volume comes within the clearance of is found;
+        the reported distances are lower bounds, exact where the closest approach is at a sample.
+
+        :param starts0: Segment starts at the beginning of the motion, shape (Q, 3).
+        :param ends0: Segment ends at the beginning of the motion, shape (Q, 3).
+        :param starts1: Segment starts at the end of the motion, shape (Q, 3).
+        :param ends1: Segment ends at the end of the motion, shape (Q, 3).
+        :param radii: Query capsule radius in millimeters, scalar or shape (Q,).
+        :param clearance: Surface distance in millimeters up to which a strut is reported.
+        :param steps: Sampling steps along the motion.
+        :return: Tuple (query indices, strut indices, surface distance lower bounds), sorted by query.
+        """
+        starts0, ends0, radii = _queries(starts0, ends0, radii)
+        starts1, ends1, _ = _queries(starts1, ends1, radii)
+        corners = np.stack([starts0, ends0, starts1, ends1], axis=1)
+        reach = radii + clearance
+        centers = corners.mean(axis=1)
+        query, struts = self._leaf_pairs(corners.min(axis=1) - reach[:, None], corners.max(axis=1) + reach[:, None], centers,
+                                         np.linalg.norm(corners - centers[:, None], axis=2).max(axis=1) + reach)
+
+        fractions = np.linspace(0.0, 1.0, steps + 1)[:, None, None]
+        sample_starts = starts0[query] + fractions * (starts1 - starts0)[query]
+        sample_ends = ends0[query] + fractions * (ends1 - ends0)[query]
+        step = np.maximum(np.linalg.norm(starts1 - starts0, axis=1), np.linalg.norm(ends1 - ends0, axis=1)) / steps
+        sampled = segment_distances(sample_starts, sample_ends, self._starts[struts], self._ends[struts])
+        between = 0.5 * (sampled[:-1] + sampled[1:] - step[query])
+        distances = (np.minimum(sampled.min(axis=0), between.min(axis=0, initial=np.inf))
+                     - radii[query] - self._radii[struts])
+        close = distances <= clearance
+        order = np.argsort(query[close], kind="stable")
+        return query[close][order], struts[close][order], distances[close][order]
+
+
+def _queries(starts, ends, radii):
+    starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 3)
+    return starts, ends, np.broadcast_to(np.asarray(radii, dtype=float), (len(starts),)).copy()
+
+
+def _brute_force_nearest(starts, ends, radii, strut_starts, strut_ends, strut_radii):
+    distances = (segment_distances(starts[:, None], ends[:, None], strut_starts[None], strut_ends[None])
+                 - radii[:, None] - strut_radii[None])
+    return distances.min(axis=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time incremental insertion and batched queries on a random truss.")
+    parser.add_argument("--struts", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--length", type=float, default=300.0, help="Strut length in millimeters")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Struts grow layer by layer from the ground, like an assembly sequence
+    side = args.length * args.struts ** (1.0 / 3.0)  # about one strut per strut-length cube
+    centers = rng.uniform(0.0, side, (args.struts, 3))
+    centers = centers[np.argsort(centers[:, 2])]
+    directions = rng.normal(size=(args.struts, 3))
+    directions *= 0.5 * args.length / np.linalg.norm(directions, axis=1, keepdims=True)
+
+    tree = StrutBVH()
+    start = time.perf_counter()
+    for i in range(0, args.struts, 4):  # a node with its struts per assembly step
+        tree.insert(centers[i:i + 4] - directions[i:i + 4], centers[i:i + 4] + directions[i:i + 4], 10.0)
+    insert_time = time.perf_counter() - start
+
+    query_centers = rng.uniform(0.0, side, (args.queries, 3))
+    query_directions = rng.normal(size=(args.queries, 3))
+    query_directions *= 0.5 * args.length / np.linalg.norm(query_directions, axis=1, keepdims=True)
+    query_starts, query_ends = query_centers - query_directions, query_centers + query_directions
+
+    start = time.perf_counter()
+    nearest_struts, nearest_distances = tree.nearest(query_starts, query_ends, 10.0)
+    nearest_time = time.perf_counter() - start
+    start = time.perf_counter()
+    within_pairs = tree.within(query_starts, query_ends, 10.0, clearance=50.0)
+    within_time = time.perf_counter() - start
+    shift = rng.normal(size=(args.queries, 3)) * args.length
+    start = time.perf_counter()
+    swept_pairs = tree.swept(query_starts, query_ends, query_starts + shift, query_ends + shift, 10.0)
+    swept_time = time.perf_counter() - start
+
+    sample = slice(0, min(args.queries, 100))
+    expected = _brute_force_nearest(query_starts[sample], query_ends[sample], np.full(args.queries, 10.0)[sample],
+                                    *tree.struts())
+    assert np.allclose(nearest_distances[sample], expected)
+
+    print(f"{len(tree)} struts inserted in {insert_time:.2f} s ({1e6 * insert_time / len(tree):.0f} us per strut), "
+          f"tree height {tree.height}")
+    print(f"{args.queries} queries: nearest {1000 * nearest_time:.1f} ms, within 50 mm {1000 * within_time:.1f} ms "
+          f"({len(within_pairs[0])} pairs), swept {1000 * swept_time:.1f} ms ({len(swept_pairs[0])} pairs)")
@@ -0,0 +1,65 @@
+import numpy as np
+from robot_kinematics import jacobian_singular_values, manipulability, closest_solution
+
+# Conditioning screen for assembly targets: targets that are reachable but close to a singularity make MoveL
+# slow and jerky on the real robot. All targets are solved and their Jacobians decomposed in one batch.
+
+
+class TargetScreening:
+    """Per-target conditioning of the selected IK solution (arrays over the targets)."""
+
+    def __init__(self, joints, reachable, singular_values, manipulability, threshold):
+        self.joints = joints  # (N, 6) radians, NaN where unreachable
+        self.reachable = reachable  # (N,) bool
+        self.singular_values = singular_values  # (N, 6), largest first, NaN where unreachable
+        with np.errstate(invalid='ignore'):
+            self.inverse_condition = np.where(reachable, singular_values[:, -1] / singular_values[:, 0], np.nan)
+        self.manipulability = manipulability  # (N,) translational Yoshikawa index, NaN where unreachable
+        self.near_singular = reachable & (np.nan_to_num(self.inverse_condition) < threshold)
+
+    def ranking(self):
+        """Indices of the reachable targets, worst conditioned first."""
+        reached = np.flatnonzero(self.reachable)
+        return reached[np.argsort(self.inverse_condition[reached])]
+
+
+def screen_targets(poses, model, reference=None, threshold=0.005, rotation_scale=1000.0, joints=None):
+    """
+    Solve all targets and compute the Jacobian conditioning of each one.
+
+    :param poses: Flange poses in the robot base frame, shape (N, 4, 4).
+    :param model: The DHModel of the robot.
+    :param reference: Optional reference joints in radians. If given, each target uses the IK solution closest
+                      to it (the configuration the program will use); otherwise the best conditioned solution.
+    :param threshold: Inverse condition number below which a target counts as near singular.
+    :param rotation_scale: Length in millimeters that weights the angular Jacobian rows against the linear rows.
+    :param joints: Optional joints in radians the program uses at the targets, shape (N, 6) with NaN rows where
+                   unreachable (e.g. from move_planner.chain_joints); these are screened instead of solving.
+    :return: A TargetScreening.
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+
+    if joints is not None:
+        joints = np.asarray(joints, dtype=float).reshape(-1, 6)
+        reachable = ~np.isnan(joints).any(axis=1)
+        singular_values = jacobian_singular_values(np.nan_to_num(joints), model, rotation_scale)
+    elif reference is not None:
+        solutions, valid = model.inverse(poses)
+        joints, reachable = closest_solution(solutions, valid, reference)
+        singular_values = jacobian_singular_values(np.nan_to_num(joints), model, rotation_scale)
+    else:
+        # Decompose the Jacobian of every solution and keep the best conditioned one per target
+        solutions, valid = model.inverse(poses)
+        num_targets, num_solutions = valid.shape
+        all_values = jacobian_singular_values(np.nan_to_num(solutions.reshape(-1, 6)), model, rotation_scale)
+        all_values = all_values.reshape(num_targets, num_solutions, 6)
+        conditioning = np.where(valid, all_values[..., -1] / all_values[..., 0], -np.inf)
+        best = np.argmax(conditioning, axis=1)
+        rows = np.arange(num_targets)
+        joints = solutions[rows, best]
+        singular_values = all_values[rows, best]
+        reachable = valid.any(axis=1)
+
+    singular_values = np.where(reachable[:, None], singular_values, np.nan)
+    index = np.where(reachable, manipulability(np.nan_to_num(joints), model), np.nan)
+    return TargetScreening(joints, reachable, singular_values, index, threshold)
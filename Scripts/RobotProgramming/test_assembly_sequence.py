@@ -0,0 +1,88 @@
+import os
+import ast
+import types
+import numpy as np
+import pytest
+
+# The stability model of the Trussemble component (Scripts/.OLD) updates the compliance of the partial
+# structure with Woodbury and Schur complement steps. Only the class is loaded here (the component imports
+# Rhino and Grasshopper), and the placement methods only use numpy.
+SCRIPT = os.path.join(os.path.dirname(__file__), os.pardir, ".OLD", "FIX NEEDED_AssemblySequence.py")
+
+
+def _trussemble_class():
+    with open(SCRIPT) as file:
+        tree = ast.parse(file.read())
+    definition = next(node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == "Trussemble")
+    namespace = {"np": np}
+    exec(compile(ast.Module([definition], type_ignores=[]), SCRIPT, "exec"), namespace)
+    return namespace["Trussemble"]
+
+
+def _partial_structure(points, rigid_indices, axial_stiffness=2.0, strut_weight=0.5):
+    """Trussemble with the stability state only, no geometry from Rhino."""
+    truss = object.__new__(_trussemble_class())
+    truss.points = [types.SimpleNamespace(X=x, Y=y, Z=z) for x, y, z in points]
+    truss.rigid_indices = list(rigid_indices)
+    truss.axial_stiffness = axial_stiffness
+    truss.strut_weight = strut_weight
+    truss.node_dofs = {}
+    truss.compliance = np.zeros((0, 0))
+    truss.loads = np.zeros(0)
+    truss.displacements = np.zeros(0)
+    truss.max_displacements = []
+    return truss
+
+
+def _full_solve(truss, struts):
+    """Assemble the stiffness matrix and loads of all struts over the free DOFs and solve it directly."""
+    dofs = truss.node_dofs
+    size = 3 * len(dofs)
+    stiffness = np.zeros((size, size))
+    loads = np.zeros(size)
+    coords = np.array([[p.X, p.Y, p.Z] for p in truss.points])
+    for a, b in struts:
+        vector = coords[b] - coords[a]
+        length = np.linalg.norm(vector)
+        block = truss.axial_stiffness / length * np.outer(vector, vector) / length ** 2
+        for p, q in ((a, b), (b, a)):
+            if p in dofs:
+                stiffness[dofs[p]:dofs[p] + 3, dofs[p]:dofs[p] + 3] += block
+                loads[dofs[p] + 2] -= 0.5 * truss.strut_weight * length
+                if q in dofs:
+                    stiffness[dofs[p]:dofs[p] + 3, dofs[q]:dofs[q] + 3] -= block
+    return stiffness, loads
+
+
+POINTS = [(0, 0, 0), (1000, 0, 0), (0, 1000, 0),           # rigid base
+          (300, 300, 800), (900, 700, 900), (200, 900, 1000),  # free nodes
+          (1200, 1200, 0)]                                   # rigid support placed later
+STEPS = [(3, (0, 1, 2)), (4, (1, 2, 3)), (5, (0, 3, 4)), (6, (4, 5))]
+
+
+@pytest.mark.parametrize("num_steps", range(1, len(STEPS) + 1))
+def test_update_matches_full_solve(num_steps):
+    truss = _partial_structure(POINTS, rigid_indices=[0, 1, 2, 6])
+    struts = []
+    for node, supports in STEPS[:num_steps]:
+        score = truss._Trussemble__score_stability(node, supports)
+        truss._Trussemble__commit_placement(node, supports)
+        struts += [(support, node) for support in supports]
+        # The score of a candidate is the largest displacement of the structure it commits
+        assert np.isclose(score, truss.max_displacements[-1])
+
+    stiffness, loads = _full_solve(truss, struts)
+    assert np.allclose(truss.loads, loads)
+    assert np.allclose(truss.compliance, np.linalg.inv(stiffness), rtol=1e-9, atol=1e-9)
+    assert np.allclose(truss.displacements, np.linalg.solve(stiffness, loads), rtol=1e-9, atol=1e-9)
+
+
+def test_mechanism_is_rejected():
+    truss = _partial_structure(POINTS + [(500, 500, 0)], rigid_indices=[0, 1, 2, 6])
+    truss._Trussemble__commit_placement(3, (0, 1, 2))
+
+    # Coplanar supports leave the new node free to move out of their plane
+    assert truss._Trussemble__score_stability(7, (0, 1, 2)) == float("inf")
+    with pytest.raises(ValueError):
+        truss._Trussemble__commit_placement(7, (0, 1, 2))
+    assert truss._Trussemble__score_stability(7, (0, 3)) == float("inf")
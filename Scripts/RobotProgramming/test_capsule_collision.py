@@ -0,0 +1,62 @@
+import numpy as np
+from robot_models import get_model
+from capsule_collision import segment_distances, check_clearance
+
+
+def _sampled_distances(p1, q1, p2, q2, samples=401):
+    """Smallest distance between points sampled along both segments (an upper bound of the exact one)."""
+    fractions = np.linspace(0.0, 1.0, samples)[:, None]
+    first = p1[:, None] + fractions * (q1 - p1)[:, None]
+    second = p2[:, None] + fractions * (q2 - p2)[:, None]
+    return np.linalg.norm(first[:, :, None] - second[:, None], axis=-1).min(axis=(1, 2))
+
+
+def test_random_segments_match_sampling():
+    rng = np.random.default_rng(0)
+    p1, q1, p2, q2 = rng.uniform(-100.0, 100.0, (4, 300, 3))
+    exact = segment_distances(p1, q1, p2, q2)
+    sampled = _sampled_distances(p1, q1, p2, q2)
+
+    # Sampling never undercuts the exact distance and gets within its resolution of it
+    resolution = (np.linalg.norm(q1 - p1, axis=1) + np.linalg.norm(q2 - p2, axis=1)) / 400
+    assert np.all(exact <= sampled + 1e-9)
+    assert np.all(sampled - exact <= resolution)
+
+
+def test_special_cases():
+    origin = np.zeros(3)
+    x = np.array([10.0, 0.0, 0.0])
+    y = np.array([0.0, 1.0, 0.0])
+    z = np.array([0.0, 0.0, 1.0])
+
+    assert np.isclose(segment_distances(origin, x, y, x + y), 1.0)              # parallel, overlapping
+    assert np.isclose(segment_distances(origin, x, x + 3 * x / 10 + y, 2 * x + y), np.hypot(3.0, 1.0))  # parallel, apart
+    assert np.isclose(segment_distances(origin, x, x / 2 - y, x / 2 + y), 0.0)  # crossing
+    assert np.isclose(segment_distances(origin, x, x / 2 + z, x / 2 + z), 1.0)  # point against segment
+    assert np.isclose(segment_distances(origin, origin, z, z), 1.0)             # two points
+
+
+def test_broadcasting():
+    rng = np.random.default_rng(1)
+    starts, ends = rng.uniform(-10.0, 10.0, (2, 5, 3))
+    other_starts, other_ends = rng.uniform(-10.0, 10.0, (2, 7, 3))
+    table = segment_distances(starts[:, None], ends[:, None], other_starts[None], other_ends[None])
+    assert table.shape == (5, 7)
+    for i in range(5):
+        assert np.allclose(table[i], segment_distances(starts[i], ends[i], other_starts, other_ends))
+
+
+def test_placed_struts_per_configuration():
+    model = get_model("UR5")
+    rng = np.random.default_rng(2)
+    joints = rng.uniform(-np.pi, np.pi, (40, 6))
+    centers = rng.uniform(-600.0, 600.0, (30, 3))
+    halves = rng.normal(size=(30, 3)) * 100.0
+    placed = rng.integers(0, 31, 40)
+    check = check_clearance(joints, model, centers - halves, centers + halves, 10.0, margin=1e9, placed=placed)
+
+    # Each configuration only sees the struts placed before it
+    for configuration, count, distance in zip(joints, placed, check.distances):
+        alone = check_clearance(configuration, model, centers[:count] - halves[:count], centers[:count] + halves[:count],
+                                10.0, margin=1e9)
+        assert np.isclose(distance, alone.distances[0]) or np.isinf(distance) and np.isinf(alone.distances[0])
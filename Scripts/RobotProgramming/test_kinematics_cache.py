@@ -0,0 +1,51 @@
+import numpy as np
+from robot_models import get_model
+from robot_kinematics import DHModel, forward_kinematics, inverse_kinematics
+from kinematics_cache import KinematicsCache
+
+
+def _modified(model, scale):
+    """Same name, other link lengths (a model registered again after a calibration)."""
+    return DHModel(model.name, model.a * scale, model.d * scale, model.alpha, model.joint_limits, model.ik_solver)
+
+
+def test_model_with_same_name_gets_own_results():
+    model = get_model("UR5")
+    other = _modified(model, 1.1)
+    cache = KinematicsCache()
+    joints = np.random.default_rng(0).uniform(-np.pi, np.pi, (20, 6))
+    poses = forward_kinematics(joints, model)[:, -1]
+
+    cache.forward(joints, model)
+    cache.inverse(poses, model)
+    assert np.allclose(cache.forward(joints, other), forward_kinematics(joints, other))
+    solutions, valid = cache.inverse(poses, other)
+    expected_solutions, expected_valid = inverse_kinematics(poses, other)
+    assert np.array_equal(valid, expected_valid)
+    assert np.allclose(solutions[valid], expected_solutions[expected_valid])
+    assert cache.hits == 0
+
+    # The model itself is still served from memory
+    cache.forward(joints, model)
+    assert cache.hits == len(joints)
+
+
+def test_derived_is_built_once_per_configuration():
+    model = get_model("UR5")
+    cache = KinematicsCache()
+    built = []
+    build = lambda frames: built.append(frames) or frames[:, :3, 3].tolist()
+    joints = np.radians([0, -90, 90, -90, -90, 0])
+    base = np.eye(4)
+    base[:3, 3] = [100.0, 0.0, 50.0]
+
+    first = cache.derived("points", joints, model, build, base)
+    assert cache.derived("points", joints, model, build, base) is first
+    assert len(built) == 1
+    assert np.allclose(built[0], base @ forward_kinematics(joints, model)[0])
+
+    # Another configuration, base or model builds again
+    cache.derived("points", joints + 0.1, model, build, base)
+    cache.derived("points", joints, model, build)
+    cache.derived("points", joints, _modified(model, 1.1), build, base)
+    assert len(built) == 4
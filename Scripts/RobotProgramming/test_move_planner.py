@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+import move_planner
+from robot_models import get_model
+from robot_kinematics import forward_kinematics, inverse_kinematics
+from move_planner import chain_joints, plan_moves
+
+
+@pytest.fixture
+def sparse_closed_form(monkeypatch):
+    """Closed-form IK that misses every third pose, like a model the closed form only partly covers."""
+    def inverse(poses, model):
+        solutions, valid = inverse_kinematics(poses, model)
+        valid[::3] = False
+        return solutions, valid
+    monkeypatch.setattr(move_planner, "inverse_kinematics", inverse)
+
+
+@pytest.mark.parametrize("name", ["UR5", "COMAU NJ 60-2.2"])
+def test_chain_joints_falls_back_to_damped_least_squares(name, sparse_closed_form):
+    model = get_model(name)
+    joints = np.radians([10, -80, 70, -60, -80, 20]) + np.cumsum(
+        np.random.default_rng(0).normal(scale=0.05, size=(12, 6)), axis=0)
+    poses = forward_kinematics(joints, model)[:, -1]
+
+    chained, reachable = chain_joints(poses, model, joints[0])
+    assert reachable.all()
+    reached = forward_kinematics(chained, model)[:, -1]
+    assert np.abs(reached[:, :3, 3] - poses[:, :3, 3]).max() < 0.1
+
+    # Targets only the fallback reaches are still programmed
+    assert plan_moves(poses, model, joints[0]).reachable.all()
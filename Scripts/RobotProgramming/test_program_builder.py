@@ -0,0 +1,57 @@
+import numpy as np
+import robolink as rl
+from robodk_offline import OfflineRobolink
+from robodk_session import RoboDKSession
+from robot_kinematics import forward_kinematics
+from program_builder import build_program, sync_program
+from pose_pipeline import PoseArray
+
+
+def _station(count):
+    station = OfflineRobolink()
+    robot = station.add_robot("UR5", home=[0, -90, 90, -90, -90, 0])
+    joints = np.radians([0, -90, 90, -90, -90, 0]) + np.random.default_rng(0).normal(scale=0.2, size=(count, 6))
+    poses = PoseArray(forward_kinematics(joints, robot.model)[:, -1])
+    return station, robot, poses
+
+
+def _target_names(station):
+    return [item.Name() for item in station.items if item.Type() == rl.ITEM_TYPE_TARGET]
+
+
+def test_sync_replaces_program_without_manifest():
+    station, robot, poses = _station(6)
+    names = [f"Plane_{i+1}" for i in range(len(poses))]
+    frame, tool = robot.Parent(), robot.getLink(rl.ITEM_TYPE_TOOL)
+    session = RoboDKSession(lambda: station)
+    # A program from before incremental updates, through the session so that its handles are cached
+    build_program(station, robot, frame, tool, "Prog", poses, ["MoveJ"] * len(poses), names)
+    assert all(session.item(name, rl.ITEM_TYPE_TARGET).Valid() for name in names)
+
+    result = sync_program(station, robot, frame, tool, "Prog", poses, ["MoveJ"] * len(poses), names,
+                          session.item, forget=session.invalidate)
+    assert result.instructions == "created"
+    assert result.deleted == len(poses)
+    assert sorted(_target_names(station)) == sorted(names)
+
+    # The next sync finds the new targets, not the deleted ones, and only touches the moved plane
+    before = np.array(station.Item("Plane_3").Pose().rows)
+    moved = poses.matrices.copy()
+    moved[2, 2, 3] += 10.0
+    result = sync_program(station, robot, frame, tool, "Prog", PoseArray(moved), ["MoveJ"] * len(poses), names,
+                          session.item, forget=session.invalidate)
+    assert (result.updated, result.unchanged, result.instructions) == (1, len(poses) - 1, "kept")
+    assert sorted(_target_names(station)) == sorted(names)
+    program = station.Item("Prog")
+    after = np.array(program.instructions[2][1].Pose().rows)
+    assert np.allclose(after[:3, 3] - before[:3, 3], [0.0, 0.0, 10.0])
+
+
+def test_script_program_takes_program_name(tmp_path):
+    station, robot, poses = _station(4)
+    frame, tool = robot.Parent(), robot.getLink(rl.ITEM_TYPE_TOOL)
+    program = build_program(station, robot, frame, tool, "Prog", poses, ["MoveJ", "MoveL", "MoveL", "MoveJ"],
+                            [f"Plane_{i+1}" for i in range(len(poses))], script_path=str(tmp_path / "planes.script"))
+    assert program.Name() == "Prog"
+    assert station.Item("Prog").Valid()
+    assert [move_type for move_type, _ in program.instructions] == ["MoveJ", "MoveL", "MoveL", "MoveJ"]
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from robot_models import get_model
+from robot_kinematics import forward_kinematics, quaternion_matrices
+import reachability_map
+from reachability_map import build_reachability_map, classify_targets, UNREACHABLE, BORDERLINE, REACHABLE
+
+
+@pytest.fixture(scope="module")
+def model():
+    return get_model("UR5")
+
+
+@pytest.fixture(scope="module")
+def reach_map(model, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("maps") / "ur5.npy")
+    return build_reachability_map(model, path, voxel_size=150.0, num_samples=300000)
+
+
+@pytest.fixture(scope="module")
+def random_poses(model):
+    """Poses with random positions inside the reach box and random orientations."""
+    rng = np.random.default_rng(1)
+    poses = np.tile(np.eye(4), (3000, 1, 1))
+    poses[:, :3, :3] = quaternion_matrices(rng.normal(size=(3000, 4)))
+    poses[:, :3, 3] = rng.uniform(-model.reach, model.reach, (3000, 3))
+    return poses
+
+
+def test_saved_map_loads(model, reach_map):
+    assert reach_map.model_name == model.name
+    assert set(np.unique(reach_map.classes)) <= {0, 1, 2}
+
+
+def test_reached_poses_are_not_unreachable(model, reach_map):
+    joints = np.random.default_rng(7).uniform(-np.pi, np.pi, (5000, 6))
+    poses = forward_kinematics(joints, model)[:, -1]
+    assert not np.any(reach_map.classify(poses) == UNREACHABLE)
+
+
+def test_unreachable_cells_have_no_ik_solution(model, reach_map, random_poses):
+    classes = reach_map.classify(random_poses)
+    unreachable = classes == UNREACHABLE
+    assert unreachable.any()
+    _, reachable, _ = model.solve(random_poses[unreachable])
+    assert not reachable.any()
+
+
+def test_classify_targets_against_ik(model, reach_map, random_poses, monkeypatch):
+    solved = []
+    solve = reachability_map.solve_target_sequence
+    monkeypatch.setattr(reachability_map, "solve_target_sequence",
+                        lambda poses, *args, **kwargs: solved.append(len(poses)) or solve(poses, *args, **kwargs))
+    joints, reachable, classes = classify_targets(reach_map, random_poses, model)
+    assert np.array_equal(classes, reach_map.classify(random_poses))
+    _, exact, _ = model.solve(random_poses)
+
+    # Only the borderline targets get the IK, and there it is exact
+    borderline = classes == BORDERLINE
+    assert solved == [np.count_nonzero(borderline)]
+    assert np.array_equal(reachable[borderline], exact[borderline])
+    reached = forward_kinematics(joints[reachable & borderline], model)[:, -1]
+    assert np.abs(reached[:, :3, 3] - random_poses[reachable & borderline, :3, 3]).max() < 1e-2
+
+    # The other classes come from the lookup alone
+    assert not reachable[classes == UNREACHABLE].any()
+    assert reachable[classes == REACHABLE].all()
+    assert exact[classes == REACHABLE].mean() > 0.9  # an estimate, see the module comment
+    assert np.isnan(joints[~borderline]).all()
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import robolink as rl
+import robodk_session
+from robot_kinematics import forward_kinematics
+from robodk_offline import OfflineRobolink
+from robodk_recorder import record_session, replay_session, summarize
+from robodk_async import run_pooled
+from program_builder import build_program
+from pose_pipeline import PoseArray
+
+
+@pytest.fixture(autouse=True)
+def restore_session():
+    yield
+    robodk_session._session = None
+
+
+def _pooled_run(session, poses):
+    """IK queries and target creation over four connections, the program on the shared link."""
+    link = session.link()
+    robot = session.item("UR5", rl.ITEM_TYPE_ROBOT)
+    frame = robot.Parent()
+    tool = robot.getLink(rl.ITEM_TYPE_TOOL)
+    solutions = run_pooled(session.link_factory, 4, lambda client: client.solve_ik(robot, poses.to_mats()))
+    names = [f"Plane_{i+1}" for i in range(len(poses))]
+    program = build_program(link, robot, frame, tool, "Pooled", poses, ["MoveJ"] * len(poses), names,
+                            link_factory=session.link_factory, connections=4)
+    return solutions, program.Name()
+
+
+def test_record_and_replay_pooled_run(tmp_path):
+    station = OfflineRobolink()
+    robot = station.add_robot("UR5", home=[0, -90, 90, -90, -90, 0])
+    joints = np.radians([0, -90, 90, -90, -90, 0]) + np.random.default_rng(0).normal(scale=0.2, size=(12, 6))
+    poses = PoseArray(forward_kinematics(joints, robot.model)[:, -1])
+    path = str(tmp_path / "pooled.jsonl")
+
+    session = record_session(path, lambda: station)
+    recorded = _pooled_run(session, poses)
+    main_calls = session.link().calls
+    session.link().close()
+
+    # Every connection wrote to the one log, none of them truncated it
+    calls = summarize(path)
+    assert calls["SolveIK"][0] == len(poses)
+    assert calls["AddTarget"][0] == len(poses)
+    assert calls["MoveJ"][0] == len(poses)
+    # The pooled calls (IK, target creation and pose) went over their own connections
+    assert main_calls <= sum(count for count, _ in calls.values()) - 4 * len(poses)
+    assert all(len(solution) == 6 for solution in recorded[0])
+    program = station.Item("Pooled")
+    assert [target.Name() for _, target in program.instructions] == [f"Plane_{i+1}" for i in range(len(poses))]
+
+    session = replay_session(path)
+    assert _pooled_run(session, poses) == recorded
+    assert session.link().calls == main_calls
@@ -0,0 +1,82 @@
+import math
+import numpy as np
+import pytest
+from robot_models import get_model
+from robot_kinematics import forward_kinematics, inverse_kinematics, solve_target_sequence
+
+
+def _random_joints(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-np.pi, np.pi, (count, 6))
+
+
+def _wrapped(difference):
+    return (difference + np.pi) % (2 * np.pi) - np.pi
+
+
+def _dh_product(joints, model, base=np.eye(4)):
+    """Flange pose of one configuration, one textbook DH matrix after the other."""
+    pose = np.array(base, dtype=float)
+    for theta, a, d, alpha in zip(joints, model.a, model.d, model.alpha):
+        ct, st, ca, sa = math.cos(theta), math.sin(theta), math.cos(alpha), math.sin(alpha)
+        pose = pose @ np.array([[ct, -st * ca, st * sa, a * ct],
+                                [st, ct * ca, -ct * sa, a * st],
+                                [0.0, sa, ca, d],
+                                [0.0, 0.0, 0.0, 1.0]])
+    return pose
+
+
+@pytest.mark.parametrize("name", ["UR5", "COMAU NJ 60-2.2"])
+def test_batched_forward_matches_dh_product(name):
+    model = get_model(name)
+    joints = _random_joints(100)
+    base = np.eye(4)
+    base[:3, 3] = [100.0, -200.0, 300.0]
+    frames = forward_kinematics(joints, model, base)
+
+    assert frames.shape == (100, 7, 4, 4)
+    assert np.allclose(frames[:, 0], base)
+    for configuration, flange in zip(joints, frames[:, -1]):
+        assert np.allclose(flange, _dh_product(configuration, model, base))
+    assert np.allclose(forward_kinematics(joints[0], model)[0, -1], _dh_product(joints[0], model))
+
+
+@pytest.mark.parametrize("name", ["UR5", "COMAU NJ 60-2.2"])
+def test_closed_form_round_trip(name):
+    model = get_model(name)
+    joints = _random_joints(200)
+    poses = forward_kinematics(joints, model)[:, -1]
+
+    solutions, valid = inverse_kinematics(poses, model)
+    assert valid.any(axis=1).all()
+
+    # Every valid solution reaches the pose
+    reached = forward_kinematics(np.where(valid[..., None], solutions, 0.0).reshape(-1, 6), model)[:, -1]
+    errors = np.abs(reached.reshape(len(poses), 8, 4, 4) - poses[:, None])
+    assert errors[valid].max() < 1e-6
+
+    # One of them is the configuration the pose came from
+    difference = np.abs(_wrapped(solutions - joints[:, None])).max(axis=2)
+    assert np.where(valid, difference, np.inf).min(axis=1).max() < 1e-6
+
+
+@pytest.mark.parametrize("name", ["UR5", "COMAU NJ 60-2.2"])
+def test_solve_takes_closest_solution(name):
+    model = get_model(name)
+    joints = _random_joints(50, seed=1)
+    poses = forward_kinematics(joints, model)[:, -1]
+
+    for reference, pose, expected in zip(joints, poses, joints):
+        solved, reachable, refined = solve_target_sequence(pose, model, reference)
+        assert reachable[0] and not refined[0]
+        assert np.abs(_wrapped(solved[0] - expected)).max() < 1e-6
+
+
+def test_unreachable_pose():
+    model = get_model("UR5")
+    pose = np.eye(4)
+    pose[:3, 3] = [5000.0, 0.0, 0.0]
+    _, valid = inverse_kinematics(pose, model)
+    assert not valid.any()
+    _, reachable, _ = solve_target_sequence(pose, model)
+    assert not reachable.any()
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from strut_bvh import StrutBVH
+from capsule_collision import segment_distances
+
+
+@pytest.fixture(scope="module")
+def struts():
+    """Random struts inserted in small batches, with queries in between (like one assembly step at a time)."""
+    rng = np.random.default_rng(3)
+    centers = rng.uniform(0.0, 2000.0, (600, 3))
+    halves = rng.normal(size=(600, 3))
+    halves *= 150.0 / np.linalg.norm(halves, axis=1, keepdims=True)
+    tree = StrutBVH()
+    for i in range(0, 600, 3):
+        tree.insert(centers[i:i + 3] - halves[i:i + 3], centers[i:i + 3] + halves[i:i + 3], rng.uniform(5.0, 15.0))
+        if i % 150 == 0:
+            tree.within(centers[:5], centers[:5], 10.0, 50.0)
+    return tree
+
+
+@pytest.fixture(scope="module")
+def queries():
+    rng = np.random.default_rng(4)
+    centers = rng.uniform(0.0, 2000.0, (100, 3))
+    halves = rng.normal(size=(100, 3)) * 100.0
+    return centers - halves, centers + halves, rng.normal(size=(100, 3)) * 300.0
+
+
+def _brute_force(tree, starts, ends, radius):
+    strut_starts, strut_ends, strut_radii = tree.struts()
+    return (segment_distances(starts[:, None], ends[:, None], strut_starts[None], strut_ends[None])
+            - radius - strut_radii[None])
+
+
+def test_within(struts, queries):
+    starts, ends, _ = queries
+    distances = _brute_force(struts, starts, ends, 8.0)
+    query, strut, found = struts.within(starts, ends, 8.0, 60.0)
+
+    assert set(zip(query.tolist(), strut.tolist())) == set(zip(*np.nonzero(distances <= 60.0)))
+    assert np.allclose(found, distances[query, strut])
+    assert np.all(np.diff(query) >= 0)
+
+
+def test_nearest(struts, queries):
+    starts, ends, _ = queries
+    distances = _brute_force(struts, starts, ends, 8.0)
+    strut, found = struts.nearest(starts, ends, 8.0)
+
+    assert np.allclose(found, distances.min(axis=1))
+    assert np.allclose(distances[np.arange(len(starts)), strut], found)
+
+
+def test_nearest_max_distance(struts, queries):
+    starts, ends, _ = queries
+    distances = _brute_force(struts, starts, ends, 8.0)
+    strut, found = struts.nearest(starts, ends, 8.0, max_distance=20.0)
+
+    hit = distances.min(axis=1) <= 20.0
+    assert np.array_equal(strut >= 0, hit)
+    assert np.allclose(found[hit], distances.min(axis=1)[hit])
+    assert np.all(np.isinf(found[~hit]))
+
+
+def test_swept(struts, queries):
+    starts, ends, shifts = queries
+    query, strut, found = struts.swept(starts, ends, starts + shifts, ends + shifts, 8.0, 20.0)
+
+    # Densely sampled motion as the reference
+    dense = np.min([_brute_force(struts, starts + f * shifts, ends + f * shifts, 8.0)
+                    for f in np.linspace(0.0, 1.0, 201)], axis=0)
+    found_pairs = set(zip(query.tolist(), strut.tolist()))
+    assert set(zip(*np.nonzero(dense <= 20.0))) <= found_pairs
+    assert np.all(found <= dense[query, strut] + 1e-6)
+
+
+def test_empty_tree():
+    tree = StrutBVH()
+    starts = np.zeros((2, 3))
+    query, strut, distances = tree.within(starts, starts + 1.0, 1.0, 10.0)
+    assert len(query) == len(strut) == len(distances) == 0
+    strut, distances = tree.nearest(starts, starts + 1.0)
+    assert np.all(strut < 0) and np.all(np.isinf(distances))
@@ -0,0 +1,155 @@
+import numpy as np
+from robot_kinematics import rotation_vectors, invert_poses
+from move_planner import plan_moves
+
+# URScript output. Poses are written as p[x, y, z, rx, ry, rz] in meters and rotation vectors (axis * angle),
+# the format used by movej/movel and set_tcp on Universal Robots controllers. Lines are written to the file
+# as they are produced, so long programs never exist as one string in memory.
+
+# movej/movel speeds and accelerations written by default, in controller units (rad/s, rad/s^2, m/s, m/s^2)
+DEFAULT_JOINT_SPEED = 1.05
+DEFAULT_JOINT_ACCELERATION = 1.4
+DEFAULT_LINEAR_SPEED = 0.25
+DEFAULT_LINEAR_ACCELERATION = 1.2
+
+
+def poses_to_ur(poses):
+    """
+    UR pose vectors of a batch of homogeneous transforms in millimeters.
+
+    :param poses: Array of shape (N, 4, 4).
+    :return: Array of shape (N, 6): x, y, z in meters and the rotation vector.
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    return np.concatenate([poses[:, :3, 3] / 1000.0, rotation_vectors(poses[:, :3, :3])], axis=1)
+
+
+def format_pose(vector):
+    """p[...] literal of a UR pose vector."""
+    return "p[" + ", ".join(f"{value:.6f}" for value in vector) + "]"
+
+
+class URScriptWriter:
+    """Writes a URScript program line by line; use as a context manager so the program is closed."""
+
+    def __init__(self, path, program_name="Program"):
+        self.file = open(path, "w")
+        self.file.write(f"def {program_name}():\n")
+        self.moves = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def set_tcp(self, tcp):
+        """:param tcp: 4x4 TCP pose relative to the flange in millimeters."""
+        self.file.write(f"  set_tcp({format_pose(poses_to_ur(tcp)[0])})\n")
+
+    def movej(self, joints=None, vector=None, acceleration=1.4, speed=1.05, blend=0.0):
+        """
+        :param joints: Joint angles in radians, or
+        :param vector: UR pose vector (meters and rotation vector), solved by the controller.
+        """
+        literal = format_pose(vector) if joints is None else "[" + ", ".join(f"{q:.6f}" for q in joints) + "]"
+        self._move("movej", literal, acceleration, speed, blend)
+
+    def movel(self, vector, acceleration=1.2, speed=0.25, blend=0.0):
+        """:param vector: UR pose vector (meters and rotation vector)."""
+        self._move("movel", format_pose(vector), acceleration, speed, blend)
+
+    def _move(self, command, literal, acceleration, speed, blend):
+        blend_text = f", r={blend:.4f}" if blend > 0 else ""
+        self.file.write(f"  {command}({literal}, a={acceleration}, v={speed}{blend_text})\n")
+        self.moves += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.write("end\n")
+            self.file.close()
+
+
+def blend_radii(positions, blend_radius):
+    """
+    Blend radius per waypoint, reduced so that neighbouring blends never overlap (UR needs r <= half
+    the distance to the previous and to the next waypoint). The last waypoint is not blended.
+
+    :param positions: TCP positions in millimeters, shape (N, 3).
+    :param blend_radius: Requested blend radius in millimeters.
+    :return: Array of shape (N,) in millimeters.
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    if not blend_radius or len(positions) < 2:
+        return np.zeros(len(positions))
+    half = np.linalg.norm(np.diff(positions, axis=0), axis=1) / 2.0
+    radii = np.full(len(positions), float(blend_radius))
+    radii[1:] = np.minimum(radii[1:], half)
+    radii[:-1] = np.minimum(radii[:-1], half)
+    radii[-1] = 0.0
+    return radii
+
+
+def write_ur_script(path, poses, move_types, tcp=None, program_name="Program", joints=None, blend_radius=0.0,
+                    joint_speed=DEFAULT_JOINT_SPEED, joint_acceleration=DEFAULT_JOINT_ACCELERATION,
+                    linear_speed=DEFAULT_LINEAR_SPEED, linear_acceleration=DEFAULT_LINEAR_ACCELERATION, chunk_size=1024):
+    """
+    Write a URScript program moving through TCP poses given in the robot base frame. The program is
+    converted and written in chunks, so its text never has to fit in memory.
+
+    :param path: Output .script file.
+    :param poses: TCP poses in millimeters, shape (N, 4, 4).
+    :param move_types: "MoveJ" or "MoveL" per pose; poses with None are skipped.
+    :param tcp: Optional 4x4 TCP pose relative to the flange, written as set_tcp.
+    :param program_name: Name of the URScript function.
+    :param joints: Optional joint solutions in radians, shape (N, 6). Joint moves then use these instead of
+                   letting the controller pick an IK solution of the pose.
+    :param blend_radius: Blend radius in millimeters (reduced where waypoints are close).
+    :param joint_speed: movej speed in rad/s.
+    :param joint_acceleration: movej acceleration in rad/s^2.
+    :param linear_speed: movel speed in m/s.
+    :param linear_acceleration: movel acceleration in m/s^2.
+    :param chunk_size: Number of poses converted at a time.
+    :return: Number of move instructions written.
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    included = np.array([move_type is not None for move_type in move_types], dtype=bool)
+    radii = np.zeros(len(poses))
+    radii[included] = blend_radii(poses[included, :3, 3], blend_radius) / 1000.0
+
+    with URScriptWriter(path, program_name) as writer:
+        if tcp is not None:
+            writer.set_tcp(tcp)
+        for start in range(0, len(poses), chunk_size):
+            vectors = poses_to_ur(poses[start:start + chunk_size])
+            for offset, vector in enumerate(vectors):
+                i = start + offset
+                if move_types[i] == "MoveL":
+                    writer.movel(vector, linear_acceleration, linear_speed, radii[i])
+                elif move_types[i] is not None:
+                    if joints is not None and not np.isnan(joints[i]).any():
+                        writer.movej(joints=joints[i], acceleration=joint_acceleration, speed=joint_speed, blend=radii[i])
+                    else:
+                        writer.movej(vector=vector, acceleration=joint_acceleration, speed=joint_speed, blend=radii[i])
+        return writer.moves
+
+
+def write_offline_ur_program(path, poses, model, start_joints, tcp=None, near_singular=None, **options):
+    """
+    Plan and write a UR program without RoboDK: the MoveL-then-MoveJ decision of 241124_Linear.py is made
+    with the local kinematics (move_planner.plan_moves) and joint moves use the planned joint solutions.
+
+    :param path: Output .script file.
+    :param poses: TCP poses in the robot base frame in millimeters, shape (N, 4, 4).
+    :param model: The DHModel of the robot.
+    :param start_joints: Joints in radians the robot starts from, shape (6,).
+    :param tcp: Optional 4x4 TCP pose relative to the flange.
+    :param near_singular: Optional boolean mask of targets that must use MoveJ.
+    :param options: Further keyword arguments of write_ur_script (program_name, blend_radius, speeds).
+    :return: The MovePlan (move_types[i] is None for unreachable targets).
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 4, 4)
+    flange_poses = poses if tcp is None else poses @ invert_poses(tcp)
+    plan = plan_moves(flange_poses, model, start_joints, near_singular, tool=tcp)
+    write_ur_script(path, poses, plan.move_types, tcp, joints=plan.joints, **options)
+    return plan